@@ -0,0 +1,93 @@
+"""
+Microbenchmarks of the AD5693 voltage conversion and command encoding.
+
+Compares the original implementations, reproduced below, with the scalar
+fast path, the per-call frame encoding and the bulk frame conversion. Run
+from the repository root:
+
+    python benchmarks/convert_bench.py
+"""
+
+import timeit
+
+import numpy as np
+
+from speaker_test_bench.features.ad5693 import AD5693
+
+V_REF = 5.0
+N_BULK = 4096
+
+
+def legacy_convert(voltage, v_ref):
+    resolution = 16
+    return (np.array(voltage / v_ref) * ((2**resolution) - 1)).astype(int)
+
+
+def legacy_frame(data):
+    high_byte = (data >> 8) & 0xFF
+    low_byte = data & 0xFF
+    return bytearray([high_byte, low_byte])
+
+
+def encode_frame(data):
+    return ((data >> 8) & 0xFF, data & 0xFF)
+
+
+def rate(stmt, number):
+    """
+    Best of five runs, in calls per second.
+
+    :param stmt: Callable to time.
+    :param number: Number of calls per run.
+    :return: Calls per second.
+    """
+    return number / min(timeit.repeat(stmt, number=number, repeat=5))
+
+
+def main() -> None:
+    voltages = np.linspace(0, V_REF, N_BULK)
+    code = 0x8123
+    cases = [
+        (
+            "convert scalar",
+            lambda: legacy_convert(1.234, V_REF),
+            lambda: AD5693.convert_analog_to_digital(1.234, V_REF),
+            100_000,
+        ),
+        (
+            "encode frame",
+            lambda: legacy_frame(code),
+            lambda: encode_frame(code),
+            100_000,
+        ),
+        (
+            "set_voltage path",
+            lambda: legacy_frame(int(legacy_convert(1.234, V_REF))),
+            lambda: encode_frame(
+                AD5693.convert_analog_to_digital(1.234, V_REF)
+            ),
+            100_000,
+        ),
+        (
+            f"bulk {N_BULK} samples",
+            lambda: bytes(
+                b
+                for v in legacy_convert(voltages, V_REF)
+                for b in legacy_frame(int(v))
+            ),
+            lambda: AD5693.convert_voltages_to_frames(voltages, V_REF),
+            50,
+        ),
+    ]
+    print(f"{'case':<22}{'before/s':>14}{'after/s':>14}{'speedup':>10}")
+    for name, before, after, number in cases:
+        rate_before = rate(before, number)
+        rate_after = rate(after, number)
+        print(
+            f"{name:<22}{rate_before:>14,.0f}{rate_after:>14,.0f}"
+            f"{rate_after / rate_before:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Benchmark suite of the DAC output and utility hot paths, with baselines.
+
+Every benchmark reports a single figure, either a rate where higher is
+better or an error where lower is better. Results can be saved as a
+baseline and later runs compared against it; a figure worse than its
+baseline by more than the tolerance is flagged as a regression and makes
+the script exit with status 1, so the suite can gate dependency or Python
+upgrades. Run from the repository root:
+
+    python benchmarks/suite.py --save benchmarks/baseline.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json
+
+A missing ``--baseline`` file is created from the results of the run.
+
+Baselines are only meaningful on the machine that recorded them; the
+hardware is stored alongside the figures and a mismatch is reported. The
+Python and numpy versions are stored too, for reference.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Union
+
+import numpy as np
+
+# The helpers shared with the other scripts sit next to this one, importable
+# whatever the working directory
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from convert_bench import rate  # noqa: E402 pylint: disable=C0413
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.features.calibration import Calibration
+from speaker_test_bench.library.realtime import compare_jitter
+from speaker_test_bench.library.util import CustomEncoder, flatten
+
+V_REF = 5.0
+ADDRESS = 0x4C
+DEFAULT_TOLERANCE = 0.2
+
+
+@dataclass
+class Benchmark:
+    """
+    A registered benchmark.
+
+    :param name: Unique name, ``group/case``.
+    :param function: Returns the figure, takes the ``quick`` flag.
+    :param unit: Unit of the figure.
+    :param higher_is_better: Whether a larger figure is an improvement.
+    :param tolerance: Relative degradation allowed before flagging,
+     overriding the command line tolerance for noisy figures.
+    :param checked: Whether a degradation is flagged at all. Figures too
+     noisy for any tolerance are only reported.
+    :param floor: Absolute degradation allowed from a zero baseline, in the
+     unit of the figure, where a relative change is meaningless.
+    """
+
+    name: str
+    function: Callable[[bool], float]
+    unit: str
+    higher_is_better: bool = True
+    tolerance: Union[float, None] = None
+    checked: bool = True
+    floor: float = 0.0
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(
+    name: str,
+    unit: str,
+    higher_is_better: bool = True,
+    tolerance: Union[float, None] = None,
+    checked: bool = True,
+    floor: float = 0.0,
+) -> Callable:
+    """
+    Register a benchmark function.
+
+    :param name: Unique name, ``group/case``.
+    :param unit: Unit of the figure.
+    :param higher_is_better: Whether a larger figure is an improvement.
+    :param tolerance: Relative degradation allowed for this figure.
+    :param checked: Whether a degradation is flagged at all.
+    :param floor: Absolute degradation allowed from a zero baseline.
+    :return: Decorator.
+    """
+
+    def register(function: Callable[[bool], float]) -> Callable:
+        BENCHMARKS.append(
+            Benchmark(
+                name,
+                function,
+                unit,
+                higher_is_better,
+                tolerance,
+                checked,
+                floor,
+            )
+        )
+        return function
+
+    return register
+
+
+def simulated_dac(latency_s: float = 0.0, **kwargs) -> AD5693:
+    """
+    DAC on a simulated bus.
+
+    :param latency_s: Cost of each bus transaction in seconds.
+    :param kwargs: Options of :class:`AD5693`.
+    :return: The DAC.
+    """
+    bus = SimulatedBus([SimulatedAD5693(ADDRESS, V_REF)], latency_s=latency_s)
+    return AD5693(ADDRESS, v_ref=V_REF, bus=bus, **kwargs)
+
+
+def nested_results(n_runs: int) -> dict:
+    """
+    Measurement results shaped like a bench report.
+
+    :param n_runs: Number of runs in the report.
+    :return: Nested dictionary of lists, floats, NaNs and numpy scalars.
+    """
+    rng = np.random.default_rng(0)
+    return {
+        "bench": "speaker_test_bench",
+        "runs": [
+            {
+                "run": i,
+                "frequency": np.float64(100.0 * (i + 1)),
+                "levels": rng.normal(size=32).tolist(),
+                "thd": [float("nan"), 0.01, [0.02, [0.03]]],
+                "timing": {"n_late": np.int64(i % 3), "jitter_ns": 12.5},
+            }
+            for i in range(n_runs)
+        ],
+    }
+
+
+def calls(quick: bool) -> int:
+    """Calls per timing run of the per-call benchmarks."""
+    return 2_000 if quick else 20_000
+
+
+_playbacks: Dict[bool, object] = {}
+
+
+def play_simulated(quick: bool):
+    """
+    Play a sine on a bus with a realistic transaction cost, once per mode.
+
+    The timing benchmarks share the same playback.
+
+    :param quick: Play a shorter waveform.
+    :return: Playback report.
+    """
+    if quick not in _playbacks:
+        dac = simulated_dac(latency_s=20e-6)
+        waveform = dac.compile_sine_wave(
+            100, 0.25 if quick else 2.0, sample_rate=4000
+        )
+        _playbacks[quick] = dac.play(waveform)
+    return _playbacks[quick]
+
+
+@benchmark("dac/set_voltage", "calls/s")
+def bench_set_voltage(quick: bool) -> float:
+    dac = simulated_dac()
+    return rate(lambda: dac.set_voltage(1.234, force=True), calls(quick))
+
+
+@benchmark("dac/set_voltage_calibrated_table", "calls/s")
+def bench_set_voltage_calibrated_table(quick: bool) -> float:
+    calibration = Calibration(ADDRESS, gain=1.01, offset=-0.002)
+    dac = simulated_dac(calibration=calibration, bake_calibration=True)
+    return rate(lambda: dac.set_voltage(1.234, force=True), calls(quick))
+
+
+@benchmark("dac/send_command", "calls/s")
+def bench_send_command(quick: bool) -> float:
+    dac = simulated_dac()
+    register = dac.DATA_REGISTER_ADDR
+    return rate(lambda: dac.send_command(register, 0x8123), calls(quick))
+
+
+@benchmark("timing/rate_error", "%", higher_is_better=False, tolerance=1.0)
+def bench_rate_error(quick: bool) -> float:
+    report = play_simulated(quick)
+    return 100 * abs(report.achieved_rate / report.requested_rate - 1)
+
+
+@benchmark("timing/jitter", "us", higher_is_better=False, tolerance=1.0)
+def bench_jitter(quick: bool) -> float:
+    return play_simulated(quick).timing.jitter_ns / 1e3
+
+
+@benchmark(
+    "timing/late_samples",
+    "%",
+    higher_is_better=False,
+    tolerance=1.0,
+    floor=1.0,
+)
+def bench_late_samples(quick: bool) -> float:
+    stats = play_simulated(quick).timing
+    return 100 * stats.n_late / stats.n_scheduled
+
+
+# A ratio of two jitters swings several fold between runs on a shared
+# machine, whatever the number of trials, so it is only reported
+@benchmark("timing/realtime_jitter_gain", "x", checked=False)
+def bench_realtime_jitter_gain(quick: bool) -> float:
+    dac = simulated_dac(latency_s=20e-6)
+    waveform = dac.compile_sine_wave(
+        100, 0.1 if quick else 0.5, sample_rate=4000
+    )
+    comparison = compare_jitter(
+        lambda: dac.play(waveform).timing, n_trials=3 if quick else 7
+    )
+    if comparison.report.warnings:
+        print("  real-time mode:", "; ".join(comparison.report.warnings))
+    return comparison.jitter_gain
+
+
+@benchmark("convert/scalar", "calls/s")
+def bench_convert_scalar(quick: bool) -> float:
+    convert = AD5693.convert_analog_to_digital
+    return rate(lambda: convert(1.234, V_REF), calls(quick))
+
+
+@benchmark("convert/array", "samples/s")
+def bench_convert_array(quick: bool) -> float:
+    voltages = np.linspace(0, V_REF, 4096)
+    convert = AD5693.convert_analog_to_digital
+    number = 20 if quick else 200
+    return len(voltages) * rate(lambda: convert(voltages, V_REF), number)
+
+
+@benchmark("util/custom_encoder", "MB/s")
+def bench_custom_encoder(quick: bool) -> float:
+    results = nested_results(200 if quick else 2000)
+    size = len(json.dumps(results, cls=CustomEncoder)) / 1e6
+    return size * rate(lambda: json.dumps(results, cls=CustomEncoder), 3)
+
+
+@benchmark("util/flatten", "items/s")
+def bench_flatten(quick: bool) -> float:
+    nested = [
+        [i, [i + 1, (i + 2, [i + 3, "label"])], {"key": i}]
+        for i in range(2000 if quick else 20000)
+    ]
+    n_items = len(flatten(nested))
+    return n_items * rate(lambda: flatten(nested), 3)
+
+
+def machine() -> Dict[str, str]:
+    """Description of the hardware running the suite."""
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.system(),
+        "node": platform.node(),
+    }
+
+
+def versions() -> Dict[str, str]:
+    """Versions of the software under test, recorded for reference."""
+    return {"python": platform.python_version(), "numpy": np.__version__}
+
+
+def run(pattern: str = "*", quick: bool = False) -> Dict[str, dict]:
+    """
+    Run the registered benchmarks.
+
+    :param pattern: Shell pattern selecting benchmarks by name.
+    :param quick: Shorter runs, for smoke testing.
+    :return: Figure, unit and direction of each benchmark, by name.
+    """
+    results = {}
+    for bench in BENCHMARKS:
+        if not fnmatch.fnmatch(bench.name, pattern):
+            continue
+        start = time.perf_counter()
+        value = bench.function(quick)
+        results[bench.name] = {
+            "value": value,
+            "unit": bench.unit,
+            "higher_is_better": bench.higher_is_better,
+            "tolerance": bench.tolerance,
+            "checked": bench.checked,
+            "floor": bench.floor,
+        }
+        print(
+            f"{bench.name:<32}{value:>18,.3f} {bench.unit:<10}"
+            f"({time.perf_counter() - start:.1f} s)"
+        )
+    return results
+
+
+def compare(
+    results: Dict[str, dict],
+    baseline: Dict[str, dict],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """
+    Flag the figures worse than their baseline beyond the tolerance.
+
+    :param results: Output of :func:`run`.
+    :param baseline: Results saved by an earlier run.
+    :param tolerance: Relative degradation allowed, 0.2 for 20 %.
+    :return: Names of the regressed benchmarks.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<32}{'baseline':>18}{'current':>18}{'change':>10}")
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<32}{'-':>18}{result['value']:>18,.3f}   new")
+            continue
+        limit = result["tolerance"] or tolerance
+        before, after = reference["value"], result["value"]
+        if before:
+            change = (after - before) / before
+            shown = f"{change:>+9.1%}"
+        else:
+            # A relative change from 0 is infinite, so the absolute change
+            # is held to the floor instead, e.g. a few late samples
+            change = after - before
+            limit = result.get("floor", 0.0)
+            shown = f"{change:>+9.3f}"
+        worse = -change if result["higher_is_better"] else change
+        if not result["checked"]:
+            flag = "(not checked)"
+        else:
+            flag = "REGRESSION" if worse > limit else ""
+        print(f"{name:<32}{before:>18,.3f}{after:>18,.3f}{shown} {flag}")
+        if flag == "REGRESSION":
+            regressions.append(name)
+    return regressions
+
+
+def save(path: str, results: Dict[str, dict], quick: bool) -> None:
+    """
+    Save results as a baseline, with the machine and versions that ran them.
+
+    :param path: JSON file to write.
+    :param results: Output of :func:`run`.
+    :param quick: Whether the runs were shortened.
+    """
+    with open(path, "w") as file:
+        file.write(
+            json.dumps(
+                {
+                    "machine": machine(),
+                    "versions": versions(),
+                    "quick": quick,
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "results": results,
+                },
+                cls=CustomEncoder,
+                indent=2,
+            )
+        )
+
+
+def main(argv: Union[List[str], None] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("-k", "--filter", default="*", help="name pattern")
+    parser.add_argument("--quick", action="store_true", help="short runs")
+    parser.add_argument("--baseline", help="compare against this file")
+    parser.add_argument("--save", help="save the results as a baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="relative degradation flagged as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, quick=args.quick)
+    status = 0
+    if args.baseline and not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, saving these results")
+        save(args.baseline, results, args.quick)
+    elif args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["machine"] != machine():
+            print("\nWarning: baseline recorded on another machine")
+        if baseline.get("quick", False) != args.quick:
+            print("Warning: baseline recorded with another --quick setting")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s)")
+            status = 1
+    if args.save:
+        save(args.save, results, args.quick)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
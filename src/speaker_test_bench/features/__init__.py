@@ -9,7 +9,74 @@ Description of subpackage. (TBD)
 TBD
 
 """
-# Uncomment line after package initialization
-# from speaker_test_bench.features.module import *
+
+from speaker_test_bench.features.ad5693 import (
+    AD5693,
+    CompiledWaveform,
+    FrameEmitter,
+    Playback,
+    PlaybackChannel,
+    PlaybackReport,
+    ShadowRegisters,
+)
+from speaker_test_bench.features.aio import AsyncAD5693
+from speaker_test_bench.features.bus import (
+    BusBackend,
+    BusBusyError,
+    BusError,
+    BusTimeoutError,
+    NackError,
+    SimulatedAD5693,
+    SimulatedBus,
+    SMBusBackend,
+    classify,
+)
+from speaker_test_bench.features.calibration import (
+    Calibration,
+    CalibrationStore,
+)
+from speaker_test_bench.features.characterize import (
+    BusCharacterization,
+    Strategy,
+    StrategyResult,
+    characterize,
+)
+from speaker_test_bench.features.coordinator import (
+    MultiDACCoordinator,
+    SkewComparison,
+    UpdateReport,
+    bus_key,
+)
+from speaker_test_bench.features.disk_cache import (
+    DiskCacheStats,
+    WaveformDiskCache,
+)
+from speaker_test_bench.features.instrumentation import (
+    BusProxy,
+    Instrumentation,
+    InstrumentedBus,
+    TracedBus,
+)
+from speaker_test_bench.features.player import (
+    FrameRing,
+    PlayerStats,
+    WaveformPlayer,
+)
+from speaker_test_bench.features.pool import DEFAULT_POOL, BusPool, SharedBus
+from speaker_test_bench.features.process_player import (
+    ProcessPlayerStats,
+    ProcessWaveformPlayer,
+)
+from speaker_test_bench.features.readback import (
+    ReadbackPolicy,
+    ReadbackStats,
+    ReadbackVerifier,
+)
+from speaker_test_bench.features.stimulus import CacheStats, StimulusCache
+from speaker_test_bench.features.transport import (
+    ReliableBus,
+    RetryPolicy,
+    TransportStats,
+)
 
 __all__ = [s for s in dir() if not s.startswith("_")]
@@ -2,12 +2,452 @@
 Code for interface AD5693 analog device DAC
 """
 
+import contextlib
+import operator
+import threading
 from dataclasses import dataclass
-from typing import SupportsIndex, Union
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    ContextManager,
+    Iterable,
+    Iterator,
+    List,
+    SupportsIndex,
+    Union,
+)
 
 import numpy as np
-import smbus
-import time
+
+from speaker_test_bench.features.bus import (
+    BusBackend,
+    BusError,
+    classify,
+)
+from speaker_test_bench.features.calibration import Calibration
+from speaker_test_bench.features.instrumentation import (
+    Instrumentation,
+    InstrumentedBus,
+    TracedBus,
+    unwrap,
+)
+from speaker_test_bench.features.pool import DEFAULT_POOL, BusPool, SharedBus
+from speaker_test_bench.features.readback import (
+    ReadbackPolicy,
+    ReadbackVerifier,
+)
+from speaker_test_bench.features.transport import ReliableBus, RetryPolicy
+from speaker_test_bench.library.histogram import LatencyHistogram
+from speaker_test_bench.library.scheduler import (
+    DeadlineScheduler,
+    LatePolicy,
+    SchedulerStats,
+)
+from speaker_test_bench.library.pcm import PathLike, PCMFile
+from speaker_test_bench.library.realtime import (
+    RealtimeConfig,
+    RealtimeReport,
+    RealtimeSession,
+)
+from speaker_test_bench.library.sweep import SineSweep, SweepMethod
+from speaker_test_bench.library.trace import Tracer
+
+if TYPE_CHECKING:
+    from speaker_test_bench.features.player import PlayerStats, WaveformPlayer
+    from speaker_test_bench.features.process_player import (
+        ProcessWaveformPlayer,
+    )
+
+DAC_RESOLUTION = 16
+DAC_MAX_CODE = (2**DAC_RESOLUTION) - 1
+DEFAULT_SAMPLE_RATE = 8000.0
+PROFILED_METHODS = (
+    "convert_analog_to_digital",
+    "send_command",
+    "update_control_register",
+    "reset",
+)
+"""Methods of :class:`AD5693` wrapped in spans by :meth:`AD5693.profile`."""
+
+
+@dataclass(frozen=True)
+class CompiledWaveform:
+    """
+    Waveform synthesized once and stored as ready-to-send DAC frames.
+
+    :param codes: 16-bit DAC codes of one loop of the waveform.
+    :param frames: The same codes packed as big-endian byte pairs, as bytes
+     or as a memoryview on a shared buffer.
+    :param sample_rate: Requested output rate in samples per second.
+    :param repeat: Number of times the loop is played back to back.
+    :param frequency: Frequency actually synthesized, if periodic.
+    """
+
+    codes: np.ndarray
+    frames: Union[bytes, memoryview]
+    sample_rate: float
+    repeat: int = 1
+    frequency: Union[float, None] = None
+
+    @property
+    def n_samples(self) -> int:
+        """Total number of samples sent during playback."""
+        return len(self.codes) * self.repeat
+
+    @property
+    def duration(self) -> float:
+        """Nominal playback duration in seconds."""
+        return self.n_samples / self.sample_rate
+
+    @property
+    def pairs(self) -> List[List[int]]:
+        """Frames split as ``[high, low]`` lists, the shape smbus expects."""
+        frames = self.frames
+        return [list(frames[i : i + 2]) for i in range(0, len(frames), 2)]
+
+
+@dataclass(frozen=True)
+class PlaybackReport:
+    """
+    Outcome of a waveform playback.
+
+    :param requested_rate: Sample rate asked for, in samples per second.
+    :param achieved_rate: Sample rate measured over the whole playback.
+    :param n_samples: Number of samples written to the DAC.
+    :param elapsed: Wall-clock playback time in seconds.
+    :param timing: Late-sample counts and jitter of the playback schedule.
+    :param realtime: Real-time settings applied during the playback.
+    :param n_bus_dropped: Samples dropped by the fault-tolerant transport
+     after failed retries, not included in ``n_samples``.
+    """
+
+    requested_rate: float
+    achieved_rate: float
+    n_samples: int
+    elapsed: float
+    timing: Union[SchedulerStats, None] = None
+    realtime: Union[RealtimeReport, None] = None
+    n_bus_dropped: int = 0
+
+
+class FrameEmitter:
+    """
+    Write the frames of a compiled waveform, one schedule event at a time.
+
+    An event is a single sample, or a batch of ``batch_size`` consecutive
+    samples sent through :meth:`BusBackend.write_frames`. Calling the emitter
+    with an event index writes the matching frames; indices past the end of
+    the loop wrap around it.
+
+    :param bus: Bus backend to write to.
+    :param address: I2C address of the DAC.
+    :param register: Command byte of every frame.
+    :param waveform: Waveform to emit.
+    :param batch_size: Number of samples per event.
+    :param repeated: Send each batch as repeated data pairs after a single
+     command byte instead of one frame per sample.
+    :param transport: Fault-tolerant transport under ``bus``, whose dropped
+     samples are counted in :attr:`n_dropped` instead of :attr:`n_sent`.
+    """
+
+    def __init__(
+        self,
+        bus: BusBackend,
+        address: int,
+        register: int,
+        waveform: CompiledWaveform,
+        batch_size: int = 1,
+        repeated: bool = False,
+        transport: Union[ReliableBus, None] = None,
+    ) -> None:
+        self.batch_size = max(int(batch_size), 1)
+        self.n_total = waveform.n_samples
+        self.n_events = -(-self.n_total // self.batch_size)
+        self.event_rate = waveform.sample_rate / self.batch_size
+        self.n_sent = 0
+        self.n_dropped = 0
+        self._stats = None if transport is None else transport.stats
+        self._address = address
+        self._register = register
+        self._n_loop = len(waveform.codes)
+        self._repeated = repeated
+        if self.batch_size == 1:
+            self._write = bus.write_i2c_block_data
+            self._pairs = waveform.pairs
+        else:
+            self._write = bus.write_frames
+            if waveform.repeat == 1 or self._n_loop % self.batch_size == 0:
+                # No batch straddles the end of the loop, send in place
+                self._ring = memoryview(waveform.frames)
+            else:
+                # Room for one batch past the end of the loop, so that every
+                # batch is a contiguous slice even when it wraps around
+                self._ring = memoryview(
+                    bytes(waveform.frames)
+                    * (1 + -(-self.batch_size // self._n_loop))
+                )
+
+    def __call__(self, index: int) -> None:
+        stats = self._stats
+        if stats is not None:
+            n_dropped = stats.n_dropped
+        if self.batch_size == 1:
+            size = 1
+            self._write(
+                self._address,
+                self._register,
+                self._pairs[index % self._n_loop],
+            )
+        else:
+            start = index * self.batch_size
+            size = min(self.batch_size, self.n_total - start)
+            offset = 2 * (start % self._n_loop)
+            self._write(
+                self._address,
+                self._register,
+                self._ring[offset : offset + 2 * size],
+                self._repeated,
+            )
+        if stats is not None and stats.n_dropped != n_dropped:
+            self.n_dropped += size
+            return
+        self.n_sent += size
+
+
+class PlaybackChannel:
+    """
+    Waveform played on one DAC, with what the DAC has enabled.
+
+    Samples go through the readback verifier when there is one, and the
+    lateness of the schedule and its outcome are recorded through the
+    instrumentation. Samples sent through a fault-tolerant transport are
+    dropped when their retries miss the slot.
+
+    :param bus: Bus backend to write to.
+    :param address: I2C address of the DAC.
+    :param register: Command byte of every frame.
+    :param waveform: Waveform to play.
+    :param batch_size: Number of samples per event.
+    :param repeated: Send each batch as repeated data pairs.
+    :param metrics: Instrumentation of the DAC.
+    :param readback: Readback verifier of the DAC.
+    :param transport: Fault-tolerant transport of the DAC.
+    """
+
+    def __init__(
+        self,
+        bus: BusBackend,
+        address: int,
+        register: int,
+        waveform: CompiledWaveform,
+        batch_size: int = 1,
+        repeated: bool = False,
+        metrics: Union[Instrumentation, None] = None,
+        readback: Union[ReadbackVerifier, None] = None,
+        transport: Union[ReliableBus, None] = None,
+    ) -> None:
+        self.waveform = waveform
+        self.emitter = FrameEmitter(
+            bus,
+            address,
+            register,
+            waveform,
+            batch_size=batch_size,
+            repeated=repeated,
+            transport=transport,
+        )
+        self.emit: Callable[[int], None] = self.emitter
+        if readback is not None and readback.supported:
+            self.emit = readback.emitter(self.emitter, waveform)
+        self.metrics = metrics
+        self.transport = transport
+
+    @classmethod
+    def of(
+        cls,
+        dac: "AD5693",
+        waveform: CompiledWaveform,
+        batch_size: int = 1,
+        repeated: bool = False,
+    ) -> "PlaybackChannel":
+        """
+        Channel playing a waveform on a DAC, forgetting its output value.
+
+        :param dac: DAC to play on.
+        :param waveform: Waveform to play.
+        :param batch_size: Number of samples per event.
+        :param repeated: Send each batch as repeated data pairs.
+        :return: The channel.
+        """
+        dac.shadow.invalidate_data()
+        return cls(
+            dac.bus,
+            dac.device_address,
+            dac.DATA_REGISTER_ADDR,
+            waveform,
+            batch_size=batch_size,
+            repeated=repeated,
+            metrics=dac.metrics,
+            readback=dac.readback,
+            transport=dac.transport,
+        )
+
+    def report(
+        self,
+        stats: SchedulerStats,
+        realtime: Union[RealtimeReport, None] = None,
+    ) -> "PlaybackReport":
+        """
+        Outcome of the playback of the channel.
+
+        :param stats: Statistics of the schedule.
+        :param realtime: Real-time settings applied during the playback.
+        :return: The report.
+        """
+        elapsed = stats.elapsed_ns / 1e9
+        n_sent = self.emitter.n_sent
+        return PlaybackReport(
+            requested_rate=self.waveform.sample_rate,
+            achieved_rate=n_sent / elapsed if elapsed else 0.0,
+            n_samples=n_sent,
+            elapsed=elapsed,
+            timing=stats,
+            realtime=realtime,
+            n_bus_dropped=self.emitter.n_dropped,
+        )
+
+
+class Playback:
+    """
+    Channels paced by one deadline schedule, one event of each per tick.
+
+    Every player goes through it, so that playbacks record the same
+    metrics, spans and readback checks whichever way they are driven.
+    Channels shorter than the others stop at their last event.
+
+    Example:
+        playback = Playback([PlaybackChannel.of(dac, waveform)])
+        stats = playback.run()
+
+    :param channels: Channels to play, at the same sample rate.
+    :param policy: What to do with ticks that miss their deadline.
+    :param tracer: Tracer recording a span around every wait.
+    """
+
+    def __init__(
+        self,
+        channels: List[PlaybackChannel],
+        policy: Union[LatePolicy, str] = LatePolicy.CATCH_UP,
+        tracer: Union[Tracer, None] = None,
+    ) -> None:
+        self.channels = channels
+        self.n_events = max(c.emitter.n_events for c in channels)
+        self._metrics = list(
+            {
+                id(c.metrics): c.metrics
+                for c in channels
+                if c.metrics is not None
+            }.values()
+        )
+        self._transports = list(
+            {
+                id(c.transport): c.transport
+                for c in channels
+                if c.transport is not None
+            }.values()
+        )
+        histogram = None
+        if len(self._metrics) == 1:
+            histogram = self._metrics[0].lateness
+        elif self._metrics:
+            # Merged into each instrumentation after the run
+            histogram = LatencyHistogram()
+        self.scheduler = DeadlineScheduler(
+            channels[0].emitter.event_rate,
+            policy=policy,
+            histogram=histogram,
+            tracer=tracer,
+        )
+
+    def run(
+        self,
+        start_ns: Union[int, None] = None,
+        stop_event: Union[threading.Event, None] = None,
+    ) -> SchedulerStats:
+        """
+        Play the channels to their end, or until the stop event is set.
+
+        :param start_ns: Deadline of the first event, now by default.
+        :param stop_event: Event ending the playback early once set.
+        :return: Statistics of the schedule.
+        """
+        channels = self.channels
+        if len(channels) == 1:
+            emit = channels[0].emit
+        else:
+            pairs = [(c.emit, c.emitter.n_events) for c in channels]
+
+            def emit(index: int) -> None:
+                for channel_emit, n_events in pairs:
+                    if index < n_events:
+                        channel_emit(index)
+
+        for transport in self._transports:
+            transport.slot_ns = int(self.scheduler.period_ns)
+        try:
+            stats = self.scheduler.run(
+                self.n_events, emit, start_ns=start_ns, stop_event=stop_event
+            )
+        finally:
+            for transport in self._transports:
+                transport.slot_ns = None
+        for channel in channels:
+            if channel.emit is not channel.emitter:
+                channel.emit.finish()
+        histogram = self.scheduler.histogram
+        for metrics in self._metrics:
+            if histogram is not metrics.lateness:
+                metrics.lateness.merge(histogram)
+            metrics.record_schedule(stats)
+        return stats
+
+
+@dataclass
+class ShadowRegisters:
+    """
+    Host-side copy of the DAC registers, used to skip redundant writes.
+
+    A register set to None is unknown and the next write to it is always
+    sent.
+
+    :param control: Control register word.
+    :param input: Input register code.
+    :param dac: DAC register code.
+    :param n_written: Number of commands sent on the bus.
+    :param n_skipped: Number of commands skipped because they would not have
+     changed the device state.
+    """
+
+    control: Union[int, None] = None
+    input: Union[int, None] = None
+    dac: Union[int, None] = None
+    n_written: int = 0
+    n_skipped: int = 0
+
+    def invalidate(self) -> None:
+        """
+        Forget the register values, e.g. after raw writes to the device.
+        """
+        self.control = None
+        self.input = None
+        self.dac = None
+
+    def invalidate_data(self) -> None:
+        """
+        Forget the input and DAC register values.
+        """
+        self.input = None
+        self.dac = None
 
 
 @dataclass(init=False)
@@ -21,9 +461,50 @@ class AD5693:
         device_address: Union[int, SupportsIndex, str],
         bus_number: int = 1,
         v_ref: float = 5,
+        bus: Union[BusBackend, None] = None,
+        bake_calibration: bool = False,
+        calibration: Union[Calibration, None] = None,
+        retry: Union[RetryPolicy, None] = None,
+        readback: Union[ReadbackPolicy, None] = None,
+        pool: Union[BusPool, None] = None,
     ) -> None:
-
-        self.device_address = hex(device_address)
+        """
+        :param device_address: I2C address of the DAC, as an int or a string
+         such as ``"0x4C"``.
+        :param bus_number: Number of the I2C adapter, used when no ``bus`` is
+         given. Its handle is leased from ``pool`` and shared with the other
+         DACs on the same adapter, until :meth:`close`.
+        :param v_ref: Reference voltage of the DAC.
+        :param bus: Bus backend to use instead of opening ``bus_number``, for
+         instance a :class:`~speaker_test_bench.features.bus.SimulatedBus`.
+        :param bake_calibration: Bake the correction of the ``calibration``
+         into a lookup table of every code instead of correcting each
+         voltage.
+        :param calibration: Calibration profile of this DAC, applied to every
+         voltage converted.
+        :param retry: Retry transient bus errors through a
+         :class:`~speaker_test_bench.features.transport.ReliableBus`,
+         available as :attr:`transport`.
+        :param readback: Read the registers back from time to time through
+         a :class:`~speaker_test_bench.features.readback.ReadbackVerifier`,
+         available as :attr:`readback`.
+        :param pool: Pool the bus is leased from,
+         :data:`~speaker_test_bench.features.pool.DEFAULT_POOL` by default.
+        """
+        if isinstance(device_address, str):
+            self.device_address = int(device_address, 0)
+        else:
+            self.device_address = operator.index(device_address)
+        if (
+            calibration is not None
+            and calibration.address != self.device_address
+        ):
+            raise ValueError(
+                f"Calibration of device {calibration.address:#04x} cannot be"
+                f" used for device {self.device_address:#04x}"
+            )
+        if bake_calibration and calibration is None:
+            raise ValueError("Baking the calibration requires a calibration")
 
         self.NOP = 0x00
         """
@@ -63,22 +544,175 @@ class AD5693:
         self._gain = False
 
         self.v_ref = v_ref
-        self.bus = smbus.SMBus(bus_number)
-        try:
-            self.update_control_register(
-                mode=self._mode,
-                internal_ref=self._internal_ref,
-                gain=self._gain,
+        self.calibration = calibration
+        self.code_table = None
+        if bake_calibration:
+            self.code_table = calibration.code_table(v_ref)
+        self.lease: Union[SharedBus, None] = None
+        if bus is None:
+            pool = DEFAULT_POOL if pool is None else pool
+            bus = self.lease = pool.acquire(bus_number)
+        self.bus = bus
+        self.metrics: Union[Instrumentation, None] = None
+        self.tracer: Union[Tracer, None] = None
+        self.shadow = ShadowRegisters()
+        self.transport: Union[ReliableBus, None] = None
+        if retry is not None:
+            self.transport = ReliableBus(
+                self.bus, retry, on_recover=[self.shadow.invalidate]
             )
+            self.bus = self.transport
+        self.readback: Union[ReadbackVerifier, None] = None
+        if readback is not None:
+            self.readback = ReadbackVerifier(self, readback)
+        try:
+            self.resync()
         except OSError as error:
+            self.close()
             raise OSError(f"Failed to initialize AD569x, {error}") from error
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """
+        Release the bus leased from the pool, closing the adapter once no
+        other DAC uses it. A ``bus`` given to the constructor belongs to the
+        caller and is left open.
+        """
+        if self.lease is not None:
+            self.lease.close()
+            self.lease = None
+
+    def coalesce(self) -> ContextManager:
+        """
+        Gather the writes of a block, to this DAC and to the others sharing
+        its pooled bus, into one combined transfer.
+
+        Without a pooled bus the writes are sent as they come.
+
+        Example:
+            with left.coalesce():
+                left.set_voltage(1.0)
+                right.set_voltage(4.0)
+
+        :return: Context manager.
+        """
+        if self.lease is None:
+            return contextlib.nullcontext()
+        return self.lease.coalesce()
+
+    def __enter__(self) -> "AD5693":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
 
     @staticmethod
     def convert_analog_to_digital(
         voltage: Union[float, np.ndarray], v_ref: float
     ) -> Union[int, np.ndarray]:
-        resolution = 16
-        return (np.array(voltage / v_ref) * ((2**resolution) - 1)).astype(int)
+        """
+        Convert a voltage into a DAC code.
+
+        Values are rounded to the nearest code and clamped to the DAC range.
+        Python scalars take a pure-Python path, arrays are converted with
+        :meth:`convert_voltages_to_codes`.
+
+        :param voltage: Voltage to convert, in volts.
+        :param v_ref: Reference voltage of the DAC.
+        :return: The DAC code, or an array of codes.
+        """
+        if isinstance(voltage, (int, float)):
+            code = round(voltage * DAC_MAX_CODE / v_ref)
+            if code < 0:
+                return 0
+            return DAC_MAX_CODE if code > DAC_MAX_CODE else code
+        return AD5693.convert_voltages_to_codes(voltage, v_ref)
+
+    @staticmethod
+    def convert_voltages_to_codes(
+        voltages: Union[float, np.ndarray],
+        v_ref: float,
+        dtype: np.dtype = np.uint16,
+    ) -> np.ndarray:
+        """
+        Vectorized conversion of voltages into DAC codes.
+
+        Values are rounded to the nearest code and clamped to the DAC range.
+
+        :param voltages: Voltages to convert, in volts.
+        :param v_ref: Reference voltage of the DAC.
+        :param dtype: 16-bit integer type of the codes.
+        :return: Array of DAC codes.
+        """
+        codes = np.rint(
+            np.asarray(voltages, dtype=np.float64) * (DAC_MAX_CODE / v_ref)
+        )
+        return np.clip(codes, 0, DAC_MAX_CODE, out=codes).astype(dtype)
+
+    @staticmethod
+    def convert_voltages_to_frames(
+        voltages: Union[float, np.ndarray], v_ref: float
+    ) -> np.ndarray:
+        """
+        Vectorized conversion of voltages straight into bus frames.
+
+        Same rounding and clamping as :meth:`convert_voltages_to_codes`, the
+        result is cast once to big-endian words.
+
+        :param voltages: Voltages to convert, in volts.
+        :param v_ref: Reference voltage of the DAC.
+        :return: Array of ``>u2`` DAC codes, whose buffer holds the data
+         pairs sent on the bus.
+        """
+        return AD5693.convert_voltages_to_codes(voltages, v_ref, ">u2")
+
+    @staticmethod
+    def pack_codes(codes: np.ndarray) -> bytes:
+        """
+        Pack DAC codes into the big-endian byte pairs sent on the bus.
+
+        :param codes: 16-bit DAC codes.
+        :return: ``2 * len(codes)`` bytes, high byte first.
+        """
+        return np.asarray(codes, dtype=">u2").tobytes()
+
+    def voltage_to_code(self, voltage: float) -> int:
+        """
+        Code to send for an output voltage, calibration included.
+
+        :param voltage: Output voltage in volts.
+        :return: The DAC code.
+        """
+        if self.calibration is None:
+            return int(self.convert_analog_to_digital(voltage, self.v_ref))
+        if self.code_table is not None:
+            return self.code_table[
+                self.convert_analog_to_digital(voltage, self.v_ref)
+            ]
+        return int(
+            self.convert_analog_to_digital(
+                self.calibration.correct(voltage), self.v_ref
+            )
+        )
+
+    def voltages_to_frames(self, voltages: np.ndarray) -> np.ndarray:
+        """
+        Vectorized conversion of output voltages into bus frames,
+        calibration included.
+
+        The calibration is applied to the whole array at once before the
+        conversion of :meth:`convert_voltages_to_frames`.
+
+        :param voltages: Output voltages in volts.
+        :return: Array of ``>u2`` DAC codes.
+        """
+        if self.calibration is not None:
+            voltages = self.calibration.correct(
+                np.asarray(voltages, dtype=np.float64)
+            )
+        return self.convert_voltages_to_frames(voltages, self.v_ref)
 
     def send_command(self, register: int, data: int) -> None:
         """
@@ -87,27 +721,70 @@ class AD5693:
         This internal function prepares a 3-byte buffer containing the command and data,
         and writes it to the I2C device.
 
+        Transient bus failures are raised as a typed
+        :class:`~speaker_test_bench.features.bus.BusError`.
+
         :param register: The register address
         :param data: The 16-bit data to send.
         """
         try:
-            high_byte = (data >> 8) & 0xFF
-            low_byte = data & 0xFF
-            data = bytearray([high_byte, low_byte])
-            self.bus.write_i2c_block_data(self.device_address, register, data)
+            self.bus.write_i2c_block_data(
+                self.device_address,
+                register,
+                ((data >> 8) & 0xFF, data & 0xFF),
+            )
+            self.shadow.n_written += 1
+        except BusError:
+            raise
         except Exception as error:
+            if isinstance(error, OSError):
+                typed = classify(error, "Error sending command")
+                if isinstance(typed, BusError):
+                    raise typed from error
             raise Exception(f"Error sending command: {error}") from error
 
-    def update_control_register(
-        self, mode: int, internal_ref: bool, gain: bool
-    ) -> None:
-        self.reset()
-        # Prepare the high and low data bytes
+    @staticmethod
+    def control_word(mode: int, internal_ref: bool, gain: bool) -> int:
+        """
+        Build the control register word.
+
+        :param mode: Operating mode, D14 and D13.
+        :param internal_ref: Enable the internal reference, D12 is set when
+         the reference is disabled.
+        :param gain: Enable the x2 output gain, D11.
+        :return: The 16-bit control word.
+        """
         data = 0x0000
         data |= mode << 13  # Set D14 and D13 for the operating mode
-        data |= not internal_ref << 12  # Set D12 for internal_ref
-        data |= gain << 11  # Set D11 for the gain
+        data |= int(not internal_ref) << 12  # Set D12 for internal_ref
+        data |= int(gain) << 11  # Set D11 for the gain
+        return data
+
+    def update_control_register(
+        self, mode: int, internal_ref: bool, gain: bool, force: bool = False
+    ) -> None:
+        """
+        Write the control register.
+
+        The write is skipped when the register already holds the same
+        configuration. Changes are applied directly, without a software
+        reset, so the output does not glitch to zero-scale.
+
+        :param mode: Operating mode.
+        :param internal_ref: Enable the internal reference.
+        :param gain: Enable the x2 output gain.
+        :param force: Write even if the shadow copy says it is not needed.
+        """
+        data = self.control_word(mode, internal_ref, gain)
+        self._mode = mode
+        self._internal_ref = internal_ref
+        self._gain = gain
+        if not force and self.shadow.control == data:
+            self.shadow.n_skipped += 1
+            return
+        self.shadow.control = None
         self.send_command(register=self.CONTROL_REGISTER_ADDR, data=data)
+        self.shadow.control = data
 
     def reset(self) -> None:
         """
@@ -117,33 +794,442 @@ class AD5693:
         When the software reset has completed, the reset bit is cleared to 0 automatically.
         """
         reset_command = 0x8000
+        self.shadow.invalidate()
         try:
             self.send_command(
                 register=self.CONTROL_REGISTER_ADDR, data=reset_command
             )
         except Exception as error:
             raise Exception(f"Error during reset: {error}") from error
+        self.shadow.control = 0x0000
+        self.shadow.input = 0
+        self.shadow.dac = 0
+
+    def resync(self) -> None:
+        """
+        Bring the device back to a known state.
+
+        Performs a software reset and writes the current configuration to
+        the control register, whatever the shadow copy holds. Use it when the
+        device may have been written by another program or power cycled.
+        """
+        self.reset()
+        self.update_control_register(
+            mode=self._mode,
+            internal_ref=self._internal_ref,
+            gain=self._gain,
+            force=True,
+        )
 
-    def set_voltage(self, voltage: float) -> None:
-        data = self.convert_analog_to_digital(voltage=voltage, v_ref=self.v_ref)
+    def set_voltage(self, voltage: float, force: bool = False) -> None:
+        """
+        Set the output voltage.
+
+        The write is skipped when the output already holds the same code.
+
+        :param voltage: Output voltage in volts.
+        :param force: Write even if the shadow copy says it is not needed.
+        """
+        data = self.voltage_to_code(voltage)
+        shadow = self.shadow
+        if not force and shadow.dac == data and shadow.input == data:
+            shadow.n_skipped += 1
+            return
+        shadow.invalidate_data()
         self.send_command(register=self.DATA_REGISTER_ADDR, data=data)
+        shadow.input = shadow.dac = data
+        if self.readback is not None:
+            self.readback.tick()
+
+    def stage_voltage(self, voltage: float, force: bool = False) -> None:
+        """
+        Preload the input register without changing the output.
+
+        The output switches to the staged voltage on :meth:`update_output`.
+        The write is skipped when the input register already holds the same
+        code.
+
+        :param voltage: Voltage to stage, in volts.
+        :param force: Write even if the shadow copy says it is not needed.
+        """
+        data = self.voltage_to_code(voltage)
+        if not force and self.shadow.input == data:
+            self.shadow.n_skipped += 1
+            return
+        self.shadow.input = None
+        self.send_command(register=self.WRITE_INPUT_REGISTER_ADDR, data=data)
+        self.shadow.input = data
+        if self.readback is not None:
+            self.readback.tick()
+
+    def update_output(self) -> None:
+        """
+        Transfer the input register to the DAC register, updating the output.
+        """
+        self.shadow.dac = None
+        self.send_command(register=self.UPDATE_REGISTER_ADDR, data=0x0000)
+        self.shadow.dac = self.shadow.input
+
+    def compile_sine_wave(
+        self,
+        frequency: float,
+        duration: float,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        loop_period: bool = True,
+    ) -> CompiledWaveform:
+        """
+        Synthesize a full-scale sine wave once, ready to be played.
 
-    def generate_sine_wave(self, frequency: float, duration: float):
+        With ``loop_period`` only one period is synthesized and repeated to
+        cover ``duration``. The period is rounded to a whole number of
+        samples, so the synthesized frequency may differ slightly from the
+        requested one; it is reported in the returned waveform. Otherwise the
+        whole duration is synthesized at the exact frequency.
+
+        :param frequency: Frequency of the sine wave in Hertz.
+        :param duration: Duration of the waveform in seconds.
+        :param sample_rate: Output rate in samples per second.
+        :param loop_period: Synthesize a single period instead of the whole
+         duration.
+        :return: The compiled waveform.
+        """
+        if frequency <= 0 or duration <= 0 or sample_rate <= 0:
+            raise ValueError(
+                "Frequency, duration and sample rate must be positive"
+            )
+        n_total = max(int(round(duration * sample_rate)), 1)
+        if loop_period:
+            n_samples = max(int(round(sample_rate / frequency)), 1)
+            repeat = max(int(round(n_total / n_samples)), 1)
+            frequency = sample_rate / n_samples
+        else:
+            n_samples = n_total
+            repeat = 1
+        phase = (2.0 * np.pi * frequency / sample_rate) * np.arange(n_samples)
+        voltages = 0.5 * self.v_ref * (np.sin(phase) + 1.0)
+        codes = self.voltages_to_frames(voltages)
+        return CompiledWaveform(
+            codes=codes,
+            frames=codes.tobytes(),
+            sample_rate=sample_rate,
+            repeat=repeat,
+            frequency=frequency,
+        )
+
+    def compile_signal(
+        self, signal: np.ndarray, sample_rate: float
+    ) -> CompiledWaveform:
+        """
+        Encode a normalized signal, e.g. a chunk of a
+        :class:`~speaker_test_bench.library.dds.DDSEngine`.
+
+        The signal is centered on mid-scale, -1 and 1 map to 0 V and
+        ``v_ref``. Values outside are clamped.
+
+        :param signal: Samples in [-1, 1].
+        :param sample_rate: Output rate in samples per second.
+        :return: The compiled waveform.
+        """
+        half = 0.5 * self.v_ref
+        codes = self.voltages_to_frames(
+            half * (np.asarray(signal, dtype=np.float64) + 1.0)
+        )
+        return CompiledWaveform(
+            codes=codes, frames=codes.tobytes(), sample_rate=sample_rate
+        )
+
+    def compile_stream(
+        self, signals: Iterable[np.ndarray], sample_rate: float
+    ) -> Iterator[CompiledWaveform]:
+        """
+        Encode a stream of normalized signal chunks lazily.
+
+        :param signals: Chunks of samples in [-1, 1].
+        :param sample_rate: Output rate in samples per second.
+        :return: Iterator of compiled waveforms, one per chunk.
+        """
+        for signal in signals:
+            yield self.compile_signal(signal, sample_rate)
+
+    def play_stream(
+        self, waveforms: Iterable[CompiledWaveform], **kwargs
+    ) -> "PlayerStats":
+        """
+        Play a stream of waveforms back to back, without gaps.
+
+        The waveforms are pulled from the iterable as the output goes, so
+        memory use is bounded by the capacity of the player.
+
+        Example:
+            engine = DDSEngine(8000)
+            engine.set_tones([Tone(440, 0.5), Tone(660, 0.25)])
+            dac.play_stream(dac.compile_stream(engine.chunks(80000), 8000))
+
+        :param waveforms: Waveforms to play, in order.
+        :param kwargs: Options of :meth:`player`.
+        :return: Counters of the player.
+        """
+        with self.player(**kwargs) as player:
+            for waveform in waveforms:
+                player.queue(waveform)
+            player.wait()
+        return player.stats
+
+    def play(
+        self,
+        waveform: CompiledWaveform,
+        policy: Union[LatePolicy, str] = LatePolicy.CATCH_UP,
+        batch_size: int = 1,
+        repeated: bool = False,
+        stop_event: Union[threading.Event, None] = None,
+        realtime: Union[RealtimeConfig, None] = None,
+    ) -> PlaybackReport:
+        """
+        Play a compiled waveform on the DAC output.
+
+        Playback only walks over the precomputed frames, no conversion is
+        done per sample. Samples are paced by a :class:`DeadlineScheduler` so
+        bus latency does not make the output drift.
+
+        With ``batch_size`` above 1, consecutive samples are sent together
+        through :meth:`BusBackend.write_frames` and the schedule paces whole
+        batches; the samples of a batch go out at bus speed. The timing
+        statistics then count batches.
+
+        :param waveform: Waveform produced by one of the ``compile_*``
+         methods.
+        :param policy: What to do with samples that miss their deadline.
+        :param batch_size: Number of samples per bus transaction.
+        :param repeated: Send each batch as repeated data pairs after a
+         single command byte instead of one frame per sample.
+        :param stop_event: Event ending the playback early once set.
+        :param realtime: Real-time settings of the calling thread for the
+         duration of the playback, see
+         :class:`~speaker_test_bench.library.realtime.RealtimeConfig`.
+        :return: Requested and achieved sample rate of the playback.
+        """
+        channel = PlaybackChannel.of(
+            self, waveform, batch_size=batch_size, repeated=repeated
+        )
+        playback = Playback([channel], policy=policy, tracer=self.tracer)
+        session = (
+            contextlib.nullcontext()
+            if realtime is None
+            else RealtimeSession(realtime)
+        )
+        try:
+            with session as realtime_report:
+                stats = playback.run(stop_event=stop_event)
+        except BusError:
+            raise
+        except Exception as error:
+            raise Exception(f"Error during playback: {error}") from error
+        return channel.report(stats, realtime=realtime_report)
+
+    def instrument(
+        self,
+        enabled: bool = True,
+        metrics: Union[Instrumentation, None] = None,
+    ) -> Union[Instrumentation, None]:
+        """
+        Enable or disable the instrumentation of the I/O path.
+
+        Once enabled, every bus transaction is timed and counted, and
+        playbacks record the lateness of their samples. Disabling puts the
+        original bus back, so an uninstrumented DAC pays nothing.
+
+        :param enabled: Whether to measure the I/O of this DAC.
+        :param metrics: Where to record the measurements, shared between
+         several DACs for instance. A new instance by default, or the
+         current one when already enabled.
+        :return: The measurements, None once disabled.
+        """
+        self.bus = unwrap(self.bus, InstrumentedBus)
+        if not enabled:
+            self.metrics = None
+            if self.transport is not None:
+                self.transport.metrics = None
+            return None
+        if metrics is None:
+            metrics = self.metrics or Instrumentation()
+        self.metrics = metrics
+        if self.transport is not None:
+            # Retries happen below the instrumented layer, report them
+            self.transport.metrics = metrics
+        self.bus = InstrumentedBus(self.bus, metrics)
+        return metrics
+
+    def profile(
+        self, enabled: bool = True, tracer: Union[Tracer, None] = None
+    ) -> Union[Tracer, None]:
+        """
+        Enable or disable span profiling of the I/O path.
+
+        Once enabled, the :data:`PROFILED_METHODS`, every bus transaction
+        and the scheduler waits of playbacks record spans into the tracer,
+        so a glitch can be attributed to conversion, frame encoding, the bus
+        or the wait. The methods are wrapped on this instance only;
+        disabling removes the wrappers, so an unprofiled DAC pays nothing.
+
+        Example:
+            with Tracer("tone.trace.json") as tracer:
+                dac.profile(tracer=tracer)
+                dac.generate_sine_wave(440, 2)
+
+        :param enabled: Whether to profile this DAC.
+        :param tracer: Tracer receiving the spans, shared between several
+         DACs for instance. A new in-memory tracer by default, or the
+         current one when already enabled.
+        :return: The tracer, None once disabled.
+        """
+        for name in PROFILED_METHODS:
+            self.__dict__.pop(name, None)
+        self.bus = unwrap(self.bus, TracedBus)
+        if not enabled:
+            self.tracer = None
+            return None
+        if tracer is None:
+            tracer = self.tracer or Tracer()
+        self.tracer = tracer
+        for name in PROFILED_METHODS:
+            setattr(
+                self, name, tracer.wrap(f"ad5693.{name}", getattr(self, name))
+            )
+        self.bus = TracedBus(self.bus, tracer)
+        return tracer
+
+    def player(
+        self, process: bool = False, **kwargs
+    ) -> Union["WaveformPlayer", "ProcessWaveformPlayer"]:
+        """
+        Create a background player driving this DAC.
+
+        :param process: Run the DAC writer in a separate process instead of a
+         thread.
+        :param kwargs: Options of
+         :class:`~speaker_test_bench.features.player.WaveformPlayer` or
+         :class:`~speaker_test_bench.features.process_player.ProcessWaveformPlayer`.
+        :return: The player, not started yet.
+        """
+        if process:
+            from speaker_test_bench.features.process_player import (
+                ProcessWaveformPlayer,
+            )
+
+            return ProcessWaveformPlayer(self, **kwargs)
+        from speaker_test_bench.features.player import WaveformPlayer
+
+        return WaveformPlayer(self, **kwargs)
+
+    def generate_sine_wave(
+        self,
+        frequency: float,
+        duration: float,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        policy: Union[LatePolicy, str] = LatePolicy.CATCH_UP,
+    ) -> PlaybackReport:
         """
         Generate a sinusoidal waveform with the specified frequency and duration.
 
+        The waveform is compiled once with :meth:`compile_sine_wave` and then
+        played with :meth:`play`.
+
         :param frequency: Frequency of the sine wave in Hertz.
         :param duration: Duration of the waveform generation in seconds.
+        :param sample_rate: Output rate in samples per second.
+        :param policy: What to do with samples that miss their deadline.
+        :return: Requested and achieved sample rate of the playback.
         """
         try:
-            num_samples = int(self.v_ref * duration * frequency)
-            time_per_sample = 1.0 / (frequency * num_samples)
+            waveform = self.compile_sine_wave(
+                frequency=frequency, duration=duration, sample_rate=sample_rate
+            )
+            return self.play(waveform, policy=policy)
+        except BusError:
+            raise
+        except Exception as error:
+            raise Exception(
+                f"Error during sinusoidal waveform generation: {error}"
+            ) from error
+
+    def generate_sweep(
+        self,
+        f_start: float,
+        f_stop: float,
+        duration: float,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        method: Union[SweepMethod, str] = SweepMethod.EXPONENTIAL,
+        fade: float = 0.0,
+        **kwargs,
+    ) -> SineSweep:
+        """
+        Play a sine sweep, streamed chunk by chunk.
 
-            for i in range(num_samples):
-                angle = 2.0 * np.pi * frequency * i * time_per_sample
-                voltage = 0.5 * self.v_ref * np.sin(angle) + 0.5 * self.v_ref
-                self.set_voltage(voltage)
-                time.sleep(time_per_sample)
+        The sweep starts as soon as its first chunk is encoded and is never
+        held in memory as a whole.
 
+        :param f_start: Start frequency in Hertz.
+        :param f_stop: Stop frequency in Hertz.
+        :param duration: Duration of the sweep in seconds.
+        :param sample_rate: Output rate in samples per second.
+        :param method: Exponential or linear frequency law.
+        :param fade: Fade in and out duration in seconds.
+        :param kwargs: Options of :meth:`player`.
+        :return: The sweep played, whose :meth:`SineSweep.deconvolve` turns a
+         recording into an impulse response.
+        """
+        try:
+            sweep = SineSweep(
+                f_start,
+                f_stop,
+                duration,
+                sample_rate,
+                method=method,
+                fade=fade,
+            )
+            self.play_stream(
+                self.compile_stream(sweep.chunks(), sample_rate), **kwargs
+            )
+            return sweep
+        except BusError:
+            raise
+        except Exception as error:
+            raise Exception(
+                f"Error during sweep generation: {error}"
+            ) from error
+
+    def play_file(
+        self,
+        path: PathLike,
+        sample_rate: Union[float, None] = None,
+        channel: Union[int, None] = 0,
+        raw: Union[dict, None] = None,
+        **kwargs,
+    ) -> "PlayerStats":
+        """
+        Play a WAV or raw PCM file, streamed chunk by chunk.
+
+        The file is memory-mapped and converted one chunk at a time, so long
+        files play with constant memory.
+
+        :param path: File to play.
+        :param sample_rate: Output rate, the rate of the file by default.
+        :param channel: Channel to play, None for the mix of every channel.
+        :param raw: Options of :meth:`PCMFile.raw` for headerless files,
+         e.g. ``{"sample_rate": 8000, "dtype": "<i2"}``. The file is read as
+         a WAV file when omitted.
+        :param kwargs: Options of :meth:`player`.
+        :return: Counters of the player.
+        """
+        try:
+            pcm = (
+                PCMFile.open(path) if raw is None else PCMFile.raw(path, **raw)
+            )
+            rate = pcm.sample_rate if sample_rate is None else sample_rate
+            return self.play_stream(
+                self.compile_stream(pcm.chunks(rate, channel), rate), **kwargs
+            )
+        except BusError:
+            raise
         except Exception as error:
-            raise Exception(f"Error during sinusoidal waveform generation: {error}") from error
+            raise Exception(f"Error during file playback: {error}") from error
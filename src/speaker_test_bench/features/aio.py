@@ -0,0 +1,187 @@
+"""
+asyncio facade for the AD5693 DAC.
+
+Every blocking bus operation runs off the event loop, on a single-thread
+executor dedicated to the I2C adapter of the DAC. Operations on the same bus are
+therefore serialized while DACs on different buses run in parallel, and the
+event loop stays free to serve other requests.
+"""
+
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, Union
+
+from speaker_test_bench.features.ad5693 import (
+    AD5693,
+    DEFAULT_SAMPLE_RATE,
+    CompiledWaveform,
+    PlaybackReport,
+)
+from speaker_test_bench.features.bus import BusBackend
+from speaker_test_bench.features.coordinator import bus_key
+from speaker_test_bench.features.instrumentation import unwrap
+from speaker_test_bench.library.scheduler import LatePolicy
+
+_executors: Dict[Hashable, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def bus_executor(bus: BusBackend) -> ThreadPoolExecutor:
+    """
+    Single-thread executor dedicated to a physical bus.
+
+    Backends on the same I2C adapter share it, whichever wrappers, pool
+    leases or separately opened handles they go through, see
+    :func:`~speaker_test_bench.features.coordinator.bus_key`. The executor
+    of a backend without an adapter number goes away with the backend.
+
+    :param bus: Bus backend.
+    :return: The executor, created on first use.
+    """
+    key = bus_key(bus)
+    with _executors_lock:
+        executor = _executors.get(key)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="i2c-bus"
+            )
+            _executors[key] = executor
+            if not isinstance(key, tuple):
+                # Keyed by the identity of the backend, reused once it is gone
+                weakref.finalize(unwrap(bus), _discard_executor, key, executor)
+        return executor
+
+
+def _discard_executor(key: Hashable, executor: ThreadPoolExecutor) -> None:
+    with _executors_lock:
+        if _executors.get(key) is executor:
+            del _executors[key]
+    executor.shutdown(wait=False)
+
+
+class AsyncAD5693:
+    """
+    Awaitable interface to an :class:`AD5693`.
+
+    Cancelling a waveform playback stops it at the next sample and parks the
+    output at mid-scale before the cancellation propagates.
+
+    Example:
+        dac = AsyncAD5693(AD5693(0x4C))
+        await dac.set_voltage(1.2)
+        report = await dac.generate_sine_wave(440, 5)
+
+    :param dac: Synchronous driver to wrap.
+    """
+
+    def __init__(self, dac: AD5693) -> None:
+        self.dac = dac
+        self.executor = bus_executor(dac.bus)
+        self._playing = 0
+
+    @property
+    def playing(self) -> bool:
+        """True while a waveform is being played."""
+        return self._playing > 0
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def set_voltage(self, voltage: float) -> None:
+        """
+        Set the output voltage.
+
+        :param voltage: Output voltage in volts.
+        """
+        await self._run(self.dac.set_voltage, voltage)
+
+    async def reset(self) -> None:
+        """
+        Perform a software reset of the DAC.
+        """
+        await self._run(self.dac.reset)
+
+    async def update_control_register(
+        self, mode: int, internal_ref: bool, gain: bool
+    ) -> None:
+        """
+        Write the control register.
+
+        :param mode: Operating mode.
+        :param internal_ref: Enable the internal reference.
+        :param gain: Enable the x2 output gain.
+        """
+        await self._run(
+            self.dac.update_control_register,
+            mode=mode,
+            internal_ref=internal_ref,
+            gain=gain,
+        )
+
+    async def park(self) -> None:
+        """
+        Set the output at mid-scale.
+        """
+        await self._run(self.dac.set_voltage, self.dac.v_ref / 2)
+
+    async def play(
+        self, waveform: CompiledWaveform, **kwargs
+    ) -> PlaybackReport:
+        """
+        Play a compiled waveform without blocking the event loop.
+
+        :param waveform: Waveform to play.
+        :param kwargs: Options of :meth:`AD5693.play`.
+        :return: Requested and achieved sample rate of the playback.
+        """
+        stop_event = threading.Event()
+        future = asyncio.ensure_future(
+            self._run(self.dac.play, waveform, stop_event=stop_event, **kwargs)
+        )
+        self._playing += 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            stop_event.set()
+            # Let the writer finish its current sample before parking
+            try:
+                await future
+            finally:
+                await self.park()
+            raise
+        finally:
+            self._playing -= 1
+
+    async def generate_sine_wave(
+        self,
+        frequency: float,
+        duration: float,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        policy: Union[LatePolicy, str] = LatePolicy.CATCH_UP,
+    ) -> PlaybackReport:
+        """
+        Generate a sinusoidal waveform without blocking the event loop.
+
+        :param frequency: Frequency of the sine wave in Hertz.
+        :param duration: Duration of the waveform generation in seconds.
+        :param sample_rate: Output rate in samples per second.
+        :param policy: What to do with samples that miss their deadline.
+        :return: Requested and achieved sample rate of the playback.
+        """
+        loop = asyncio.get_running_loop()
+        waveform = await loop.run_in_executor(
+            None,
+            functools.partial(
+                self.dac.compile_sine_wave,
+                frequency=frequency,
+                duration=duration,
+                sample_rate=sample_rate,
+            ),
+        )
+        return await self.play(waveform, policy=policy)
@@ -0,0 +1,640 @@
+"""
+Bus backends used by the DAC drivers.
+
+A backend exposes the subset of the smbus API the drivers rely on, so the same
+driver code runs against a real I2C adapter or against the in-memory
+simulated AD5693 used for benchmarks and tests.
+"""
+
+import ctypes
+import errno
+import random
+import time
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+DAC_MAX_CODE = 0xFFFF
+SMBUS_BLOCK_MAX = 32
+"""Largest data block accepted by ``write_i2c_block_data``"""
+I2C_RDWR_MAX_MSGS = 42
+"""Largest number of messages accepted by one ``I2C_RDWR`` ioctl"""
+I2C_MSG_MAX_BYTES = 8192
+"""Largest message accepted by the Linux i2c-dev driver"""
+
+Buffer = Union[bytes, bytearray, memoryview, np.ndarray]
+Transaction = Tuple[int, int, Buffer]
+"""``(address, command, data)`` of a block write"""
+Read = Tuple[int, int, int]
+"""``(address, command, length)`` of a block read"""
+
+
+class BusError(OSError):
+    """
+    Transient failure of an I2C transaction, worth retrying.
+    """
+
+
+class NackError(BusError):
+    """
+    The device did not acknowledge its address or data.
+    """
+
+
+class BusTimeoutError(BusError):
+    """
+    The transaction did not complete in time, e.g. a slave stretching the
+    clock or holding SDA low.
+    """
+
+
+class BusBusyError(BusError):
+    """
+    The adapter is busy or lost arbitration to another master.
+    """
+
+
+ERRNO_ERRORS = {
+    errno.ENXIO: NackError,
+    errno.EREMOTEIO: NackError,
+    errno.EIO: NackError,
+    errno.ETIMEDOUT: BusTimeoutError,
+    errno.EAGAIN: BusBusyError,
+    errno.EBUSY: BusBusyError,
+}
+"""Typed error raised for each errno reported by I2C adapters."""
+
+
+def classify(error: OSError, context: Union[str, None] = None) -> OSError:
+    """
+    Turn an error of a bus backend into a typed :class:`BusError`.
+
+    :param error: Error raised by a backend.
+    :param context: Prefix of the message, e.g. the operation that failed.
+    :return: The typed error, or ``error`` itself when its errno is not a
+     known transient failure.
+    """
+    error_type = ERRNO_ERRORS.get(error.errno)
+    if error_type is None or (isinstance(error, BusError) and not context):
+        return error
+    message = error.strerror or str(error)
+    if context:
+        message = f"{context}: {message}"
+    return error_type(error.errno, message)
+
+
+def command_frames(command: int, data: Buffer) -> np.ndarray:
+    """
+    Interleave a command byte in front of each 16-bit word of a buffer.
+
+    :param command: Command byte repeated in every frame.
+    :param data: Packed big-endian 16-bit words.
+    :return: ``(n_words, 3)`` array of ``uint8`` frames.
+    """
+    words = np.frombuffer(data, dtype=np.uint8).reshape(-1, 2)
+    frames = np.empty((len(words), 3), dtype=np.uint8)
+    frames[:, 0] = command
+    frames[:, 1:] = words
+    return frames
+
+
+class BusBackend(ABC):
+    """
+    Interface of an I2C bus as seen by the DAC drivers.
+    """
+
+    @abstractmethod
+    def write_i2c_block_data(
+        self, address: int, register: int, data: Iterable[int]
+    ) -> None:
+        """
+        Write a command byte followed by a block of data bytes.
+
+        :param address: 7-bit I2C address of the device.
+        :param register: First byte of the transaction (command byte).
+        :param data: Data bytes following the command byte.
+        """
+
+    def write_frames(
+        self,
+        address: int,
+        command: int,
+        data: Buffer,
+        repeated: bool = False,
+    ) -> None:
+        """
+        Write many 16-bit words with the same command byte.
+
+        By default each word is sent as its own 3-byte command frame. With
+        ``repeated`` the command byte is sent once per transaction followed by
+        consecutive data pairs, which relies on the part latching each pair
+        as it is acknowledged.
+
+        Backends override this method to batch the frames into as few
+        transactions as possible; this fallback issues one block write per
+        frame, or per 32-byte block in repeated mode.
+
+        :param address: 7-bit I2C address of the device.
+        :param command: Command byte of every frame.
+        :param data: Packed big-endian 16-bit words, e.g. a slice of
+         :attr:`CompiledWaveform.frames`.
+        :param repeated: Use repeated data pairs after a single command byte.
+        """
+        view = memoryview(data).cast("B")
+        step = SMBUS_BLOCK_MAX if repeated else 2
+        for start in range(0, len(view), step):
+            self.write_i2c_block_data(
+                address, command, view[start : start + step].tolist()
+            )
+
+    def write_transactions(self, transactions: Sequence[Transaction]) -> None:
+        """
+        Write block transactions, possibly to different devices, as close
+        together as the backend allows.
+
+        Backends override this method to send all the transactions in a
+        single combined transfer; this fallback writes them one by one.
+
+        :param transactions: ``(address, command, data)`` of each write.
+        """
+        for address, command, data in transactions:
+            self.write_i2c_block_data(address, command, list(data))
+
+    def read_i2c_block_data(
+        self, address: int, register: int, length: int
+    ) -> List[int]:
+        """
+        Write a command byte, then read a block of data bytes after a
+        repeated start.
+
+        Backends that cannot read raise :class:`NotImplementedError`.
+
+        :param address: 7-bit I2C address of the device.
+        :param register: Command byte selecting what is read.
+        :param length: Number of bytes to read.
+        :return: The bytes read.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support reads"
+        )
+
+    def read_transactions(self, reads: Sequence[Read]) -> List[bytes]:
+        """
+        Read several blocks, possibly from different devices, as close
+        together as the backend allows.
+
+        Backends override this method to send all the reads in a single
+        combined transfer; this fallback reads them one by one.
+
+        :param reads: ``(address, command, length)`` of each read.
+        :return: The bytes of each read.
+        """
+        return [
+            bytes(self.read_i2c_block_data(address, command, length))
+            for address, command, length in reads
+        ]
+
+    def close(self) -> None:
+        """
+        Release the resources held by the backend.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SMBusBackend(BusBackend):
+    """
+    Backend on top of a Linux I2C adapter through ``smbus2`` or ``smbus``.
+
+    ``smbus2`` is preferred when installed, ``smbus`` is used otherwise.
+    With ``smbus2``, :meth:`write_frames` packs many frames into each
+    ``I2C_RDWR`` ioctl: the message table is filled with NumPy and points
+    straight into one payload buffer, so nothing is copied per sample.
+    """
+
+    def __init__(self, bus_number: int = 1) -> None:
+        try:
+            import smbus2 as smbus_module
+        except ImportError:
+            import smbus as smbus_module
+
+        self.bus_number = bus_number
+        self.module = smbus_module
+        self.bus = smbus_module.SMBus(bus_number)
+        self._rdwr = None
+        if hasattr(smbus_module, "i2c_msg"):
+            from fcntl import ioctl
+
+            from smbus2.smbus2 import (
+                I2C_RDWR,
+                i2c_msg,
+                i2c_rdwr_ioctl_data,
+            )
+
+            self._ioctl = ioctl
+            self._rdwr = (I2C_RDWR, i2c_msg, i2c_rdwr_ioctl_data)
+            self._msg_dtype = np.dtype(
+                {
+                    "names": ["addr", "flags", "len", "buf"],
+                    "formats": [np.uint16, np.uint16, np.uint16, np.uintp],
+                    "offsets": [
+                        i2c_msg.addr.offset,
+                        i2c_msg.flags.offset,
+                        i2c_msg.len.offset,
+                        i2c_msg.buf.offset,
+                    ],
+                    "itemsize": ctypes.sizeof(i2c_msg),
+                }
+            )
+
+    def write_i2c_block_data(
+        self, address: int, register: int, data: Iterable[int]
+    ) -> None:
+        if self._rdwr is None and not isinstance(data, list):
+            # smbus wants a list, smbus2 copies any bytes-like buffer as is
+            data = list(data)
+        self.bus.write_i2c_block_data(address, register, data)
+
+    def write_frames(
+        self,
+        address: int,
+        command: int,
+        data: Buffer,
+        repeated: bool = False,
+    ) -> None:
+        if self._rdwr is None:
+            super().write_frames(address, command, data, repeated)
+            return
+        if repeated:
+            words = np.frombuffer(data, dtype=np.uint8)
+            max_data = (I2C_MSG_MAX_BYTES - 1) & ~1
+            starts = np.arange(0, len(words), max_data)
+            payload = np.insert(words, starts, command)
+            lengths = np.diff(np.append(starts, len(words))) + 1
+            offsets = starts + np.arange(len(starts))
+        else:
+            payload = command_frames(command, data).reshape(-1)
+            lengths = np.full(len(payload) // 3, 3)
+            offsets = np.arange(0, len(payload), 3)
+        self._transfer(address, payload, offsets, lengths)
+
+    def write_transactions(self, transactions: Sequence[Transaction]) -> None:
+        if self._rdwr is None:
+            super().write_transactions(transactions)
+            return
+        messages = [
+            bytes([command]) + bytes(data) for _, command, data in transactions
+        ]
+        lengths = np.array([len(message) for message in messages])
+        self._transfer(
+            np.array([address for address, _, _ in transactions]),
+            np.frombuffer(b"".join(messages), dtype=np.uint8),
+            np.cumsum(lengths) - lengths,
+            lengths,
+        )
+
+    def read_i2c_block_data(
+        self, address: int, register: int, length: int
+    ) -> List[int]:
+        return self.bus.read_i2c_block_data(address, register, length)
+
+    def read_transactions(self, reads: Sequence[Read]) -> List[bytes]:
+        if self._rdwr is None:
+            return super().read_transactions(reads)
+        i2c_msg = self._rdwr[1]
+        results = []
+        # A write of the command byte and a read per register
+        step = I2C_RDWR_MAX_MSGS // 2
+        for start in range(0, len(reads), step):
+            messages = []
+            for address, command, length in reads[start : start + step]:
+                messages.append(i2c_msg.write(address, [command]))
+                messages.append(i2c_msg.read(address, length))
+            self.bus.i2c_rdwr(*messages)
+            results.extend(bytes(message) for message in messages[1::2])
+        return results
+
+    def _transfer(
+        self,
+        address: Union[int, np.ndarray],
+        payload: np.ndarray,
+        offsets: np.ndarray,
+        lengths: np.ndarray,
+    ) -> None:
+        i2c_rdwr, i2c_msg, i2c_rdwr_ioctl_data = self._rdwr
+        msgs = np.zeros(len(offsets), dtype=self._msg_dtype)
+        msgs["addr"] = address
+        msgs["len"] = lengths
+        msgs["buf"] = payload.ctypes.data + offsets
+        base = msgs.ctypes.data
+        for start in range(0, len(msgs), I2C_RDWR_MAX_MSGS):
+            ioctl_data = i2c_rdwr_ioctl_data(
+                msgs=ctypes.cast(
+                    base + start * msgs.itemsize, ctypes.POINTER(i2c_msg)
+                ),
+                nmsgs=min(I2C_RDWR_MAX_MSGS, len(msgs) - start),
+            )
+            self._ioctl(self.bus.fd, i2c_rdwr, ioctl_data)
+
+    def reopen(self) -> None:
+        """
+        Close and reopen the adapter, to recover from a bus fault.
+        """
+        try:
+            self.bus.close()
+        except OSError:
+            pass
+        self.bus = self.module.SMBus(self.bus_number)
+
+    def close(self) -> None:
+        self.bus.close()
+
+
+class SimulatedAD5693:
+    """
+    In-memory model of an AD5693 decoding the 3-byte command frames.
+
+    Each frame is a command byte followed by the high and low data bytes.
+    Further data pairs after the first one repeat the command. The model keeps
+    the input, DAC and control registers and records every change of the DAC
+    register with its ``perf_counter_ns`` timestamp.
+
+    :param address: I2C address the device answers to.
+    :param v_ref: Reference voltage of the DAC.
+    """
+
+    NOP = 0x00
+    WRITE_INPUT_REGISTER = 0x10
+    UPDATE_REGISTER = 0x20
+    WRITE_AND_UPDATE_REGISTER = 0x30
+    CONTROL_REGISTER = 0x40
+    RESET_BIT = 0x8000
+    CONTROL_MASK = 0x7800
+    GAIN_BIT = 0x0800
+    POWER_DOWN_MASK = 0x6000
+
+    def __init__(self, address: int = 0x4C, v_ref: float = 5) -> None:
+        self.address = address
+        self.v_ref = v_ref
+        self.input_register = 0
+        self.dac_register = 0
+        self.control_register = 0
+        self.n_frames = 0
+        self.n_reads = 0
+        self._timestamps = array("q")
+        self._codes = array("H")
+
+    def handle(self, command: int, data: Iterable[int]) -> None:
+        """
+        Apply one command frame to the registers.
+
+        :param command: Command byte of the frame.
+        :param data: High and low data bytes, optionally followed by more
+         pairs.
+        """
+        data = list(data)
+        if len(data) < 2 or len(data) % 2:
+            raise OSError(errno.EREMOTEIO, "Incomplete data frame")
+        for index in range(0, len(data), 2):
+            self.apply(command, (data[index] << 8) | data[index + 1])
+
+    def apply(self, command: int, value: int) -> None:
+        """
+        Apply one command with its 16-bit data word.
+
+        :param command: Command byte.
+        :param value: Data word.
+        """
+        command &= 0xF0
+        self.n_frames += 1
+        if command == self.WRITE_INPUT_REGISTER:
+            self.input_register = value
+        elif command == self.UPDATE_REGISTER:
+            self._latch(self.input_register)
+        elif command == self.WRITE_AND_UPDATE_REGISTER:
+            self.input_register = value
+            self._latch(value)
+        elif command == self.CONTROL_REGISTER:
+            if value & self.RESET_BIT:
+                self.input_register = 0
+                self.control_register = 0
+                self._latch(0)
+            else:
+                self.control_register = value & self.CONTROL_MASK
+        elif command != self.NOP:
+            raise OSError(errno.EREMOTEIO, f"Unknown command {command:#04x}")
+
+    def read(self, command: int) -> int:
+        """
+        Read back a register.
+
+        The command byte selects the register: the input register for a
+        write to the input register, the DAC register for an update or a
+        write and update, the control register otherwise.
+
+        :param command: Command byte written before the read.
+        :return: The 16-bit register word.
+        """
+        command &= 0xF0
+        self.n_reads += 1
+        if command == self.WRITE_INPUT_REGISTER:
+            return self.input_register
+        if command in (self.UPDATE_REGISTER, self.WRITE_AND_UPDATE_REGISTER):
+            return self.dac_register
+        return self.control_register
+
+    def _latch(self, code: int) -> None:
+        self.dac_register = code
+        self._timestamps.append(time.perf_counter_ns())
+        self._codes.append(code)
+
+    def code_to_voltage(self, code: Union[int, np.ndarray]):
+        """
+        Output voltage for a DAC code with the current gain setting.
+
+        :param code: DAC code(s).
+        :return: Output voltage(s) in volts.
+        """
+        gain = 2 if self.control_register & self.GAIN_BIT else 1
+        return np.asarray(code) * (gain * self.v_ref / DAC_MAX_CODE)
+
+    @property
+    def voltage(self) -> float:
+        """Current output voltage, 0 when powered down."""
+        if self.control_register & self.POWER_DOWN_MASK:
+            return 0.0
+        return float(self.code_to_voltage(self.dac_register))
+
+    @property
+    def timeline(self) -> Dict[str, np.ndarray]:
+        """
+        Recorded DAC register updates.
+
+        :return: ``time_ns``, ``code`` and ``voltage`` arrays.
+        """
+        codes = np.frombuffer(self._codes, dtype=np.uint16).copy()
+        return {
+            "time_ns": np.frombuffer(self._timestamps, dtype=np.int64).copy(),
+            "code": codes,
+            "voltage": self.code_to_voltage(codes),
+        }
+
+    def clear_timeline(self) -> None:
+        """
+        Forget the recorded updates.
+        """
+        self._timestamps = array("q")
+        self._codes = array("H")
+
+
+class SimulatedBus(BusBackend):
+    """
+    In-memory I2C bus hosting simulated devices.
+
+    Each transaction costs ``latency_s`` plus ``byte_time_s`` per byte on the
+    wire, address byte included, spent busy-waiting so that the timing is
+    reproducible at microsecond scale. Writes to an address without a device
+    fail like a NACK on a real bus.
+
+    :param devices: Devices attached to the bus.
+    :param latency_s: Fixed cost of a transaction in seconds.
+    :param byte_time_s: Cost of each byte in seconds, 9 bit times at the bus
+     clock (22.5 us at 400 kHz).
+    :param error_rate: Probability that a transaction fails with a NACK
+     (``EREMOTEIO``) before reaching the device, to exercise error handling.
+    :param seed: Seed of the fault injection.
+    """
+
+    def __init__(
+        self,
+        devices: Iterable[SimulatedAD5693] = (),
+        latency_s: float = 0.0,
+        byte_time_s: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Union[int, None] = None,
+    ) -> None:
+        self.devices: Dict[int, SimulatedAD5693] = {}
+        self.latency_ns = int(latency_s * 1e9)
+        self.byte_time_ns = int(byte_time_s * 1e9)
+        self.error_rate = error_rate
+        self.n_transactions = 0
+        self.n_faults = 0
+        self._random = random.Random(seed)
+        for device in devices:
+            self.attach(device)
+
+    def attach(self, device: SimulatedAD5693) -> SimulatedAD5693:
+        """
+        Attach a simulated device to the bus.
+
+        :param device: Device to attach, keyed by its address.
+        :return: The attached device.
+        """
+        self.devices[device.address] = device
+        return device
+
+    def _device(self, address: int) -> SimulatedAD5693:
+        try:
+            return self.devices[address]
+        except KeyError as error:
+            raise OSError(
+                errno.ENXIO, f"No device at address {address:#04x}"
+            ) from error
+
+    @staticmethod
+    def _spin(cost_ns: int) -> None:
+        if cost_ns:
+            deadline = time.perf_counter_ns() + cost_ns
+            while time.perf_counter_ns() < deadline:
+                pass
+
+    def _transfer(self, n_bytes: int) -> None:
+        self.n_transactions += 1
+        self._spin(self.latency_ns + n_bytes * self.byte_time_ns)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.n_faults += 1
+            raise OSError(errno.EREMOTEIO, "Simulated NACK")
+
+    def write_i2c_block_data(
+        self, address: int, register: int, data: Iterable[int]
+    ) -> None:
+        device = self._device(address)
+        if not hasattr(data, "__len__"):
+            data = list(data)
+        self._transfer(len(data) + 2)
+        device.handle(register, data)
+
+    def write_frames(
+        self,
+        address: int,
+        command: int,
+        data: Buffer,
+        repeated: bool = False,
+    ) -> None:
+        """
+        Batched write, modelled as one transaction per ``I2C_RDWR`` ioctl.
+
+        The fixed latency is paid once per ioctl and the byte time for every
+        message, so the timeline shows each frame when it would land.
+        """
+        device = self._device(address)
+        words = np.frombuffer(data, dtype=">u2").tolist()
+        byte_time_ns = self.byte_time_ns
+        if repeated:
+            max_words = (I2C_MSG_MAX_BYTES - 1) // 2
+            for start in range(0, len(words), max_words):
+                self._transfer(2)
+                for value in words[start : start + max_words]:
+                    self._spin(2 * byte_time_ns)
+                    device.apply(command, value)
+            return
+        for start in range(0, len(words), I2C_RDWR_MAX_MSGS):
+            self._transfer(0)
+            for value in words[start : start + I2C_RDWR_MAX_MSGS]:
+                self._spin(4 * byte_time_ns)
+                device.apply(command, value)
+
+    def write_transactions(self, transactions: Sequence[Transaction]) -> None:
+        """
+        Combined transfer, modelled as one transaction per ``I2C_RDWR``
+        ioctl like :meth:`write_frames`.
+        """
+        for start in range(0, len(transactions), I2C_RDWR_MAX_MSGS):
+            self._transfer(0)
+            for address, command, data in transactions[
+                start : start + I2C_RDWR_MAX_MSGS
+            ]:
+                device = self._device(address)
+                data = list(data)
+                self._spin((len(data) + 2) * self.byte_time_ns)
+                device.handle(command, data)
+
+    def read_i2c_block_data(
+        self, address: int, register: int, length: int
+    ) -> List[int]:
+        device = self._device(address)
+        self._transfer(length + 3)
+        return list(device.read(register).to_bytes(2, "big")[:length])
+
+    def read_transactions(self, reads: Sequence[Read]) -> List[bytes]:
+        """
+        Combined transfer, a write of the command byte and a read per
+        register, modelled as one transaction per ``I2C_RDWR`` ioctl.
+        """
+        results = []
+        step = I2C_RDWR_MAX_MSGS // 2
+        for start in range(0, len(reads), step):
+            self._transfer(0)
+            for address, command, length in reads[start : start + step]:
+                device = self._device(address)
+                self._spin((length + 3) * self.byte_time_ns)
+                results.append(
+                    device.read(command).to_bytes(2, "big")[:length]
+                )
+        return results
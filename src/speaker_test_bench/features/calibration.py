@@ -0,0 +1,203 @@
+"""
+Per-device calibration of the AD5693 output.
+
+A profile describes how the voltage measured on a board differs from the
+voltage requested, either with a gain and offset or with a piecewise-linear
+table of measured points for boards with visible integral non-linearity.
+Profiles are kept in a JSON file indexed by bus number and device address,
+and :class:`~speaker_test_bench.features.ad5693.AD5693` applies them while
+converting voltages to codes, so the correction costs nothing per sample at
+playback time.
+"""
+
+import json
+import os
+from array import array
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from speaker_test_bench.features.bus import DAC_MAX_CODE
+from speaker_test_bench.library.util import CustomEncoder
+
+
+@dataclass(frozen=True)
+class Calibration:
+    """
+    Calibration profile of one DAC.
+
+    With measured points the correction interpolates them linearly and the
+    gain and offset are ignored; requests outside the measured range are
+    extrapolated from the closest segment. Otherwise the output is modelled
+    as ``measured = gain * requested + offset``.
+
+    :param address: I2C address of the DAC.
+    :param bus_number: I2C adapter of the DAC, None if it does not matter.
+    :param gain: Gain error of the output.
+    :param offset: Offset error of the output, in volts.
+    :param requested: Voltages requested during the measurement, ascending.
+    :param measured: Voltages measured for each request.
+    """
+
+    address: int
+    bus_number: Union[int, None] = None
+    gain: float = 1.0
+    offset: float = 0.0
+    requested: Tuple[float, ...] = field(default=())
+    measured: Tuple[float, ...] = field(default=())
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "requested", tuple(self.requested))
+        object.__setattr__(self, "measured", tuple(self.measured))
+        if len(self.requested) != len(self.measured):
+            raise ValueError("Expected one measurement per requested voltage")
+        if self.requested:
+            if len(self.requested) < 2:
+                raise ValueError("A calibration table needs two points")
+            if np.any(np.diff(self.measured) <= 0) or np.any(
+                np.diff(self.requested) <= 0
+            ):
+                raise ValueError("Calibration points must be increasing")
+        elif self.gain <= 0:
+            raise ValueError("Gain must be positive")
+
+    @classmethod
+    def fit(
+        cls,
+        address: int,
+        requested: Sequence[float],
+        measured: Sequence[float],
+        bus_number: Union[int, None] = None,
+    ) -> "Calibration":
+        """
+        Least-squares gain and offset of a set of measurements.
+
+        :param address: I2C address of the DAC.
+        :param requested: Voltages requested.
+        :param measured: Voltages measured for each request.
+        :param bus_number: I2C adapter of the DAC.
+        :return: Linear profile.
+        """
+        gain, offset = np.polyfit(requested, measured, 1)
+        return cls(address, bus_number, gain=float(gain), offset=float(offset))
+
+    @property
+    def key(self) -> Tuple[Union[int, None], int]:
+        """Bus number and address identifying the DAC."""
+        return self.bus_number, self.address
+
+    def correct(
+        self, voltages: Union[float, np.ndarray]
+    ) -> Union[float, np.ndarray]:
+        """
+        Voltage to request so that the output measures ``voltages``.
+
+        :param voltages: Target output voltages.
+        :return: Corrected requests, a float for a float input.
+        """
+        if not self.requested:
+            return (voltages - self.offset) / self.gain
+        measured = np.asarray(self.measured)
+        requested = np.asarray(self.requested)
+        corrected = np.interp(voltages, measured, requested)
+        # np.interp holds the end values, extend the end segments instead
+        slopes = np.diff(requested) / np.diff(measured)
+        corrected = np.where(
+            voltages < measured[0],
+            requested[0] + (voltages - measured[0]) * slopes[0],
+            corrected,
+        )
+        corrected = np.where(
+            voltages > measured[-1],
+            requested[-1] + (voltages - measured[-1]) * slopes[-1],
+            corrected,
+        )
+        return float(corrected) if np.ndim(corrected) == 0 else corrected
+
+    def code_table(self, v_ref: float) -> array:
+        """
+        Corrected code of every ideal code.
+
+        Indexing the table with the code of a voltage, as computed without
+        calibration, gives the code to send. The input is quantized before
+        the correction, which adds up to half a code of error.
+
+        :param v_ref: Reference voltage of the DAC.
+        :return: 65,536 ``uint16`` codes.
+        """
+        ideal = np.arange(DAC_MAX_CODE + 1) * (v_ref / DAC_MAX_CODE)
+        codes = np.rint(self.correct(ideal) * (DAC_MAX_CODE / v_ref))
+        return array("H", np.clip(codes, 0, DAC_MAX_CODE).astype(np.uint16))
+
+    def as_dict(self) -> dict:
+        """Serializable copy of the profile."""
+        out = asdict(self)
+        out["requested"] = list(self.requested)
+        out["measured"] = list(self.measured)
+        return out
+
+
+class CalibrationStore:
+    """
+    JSON file of calibration profiles, indexed by bus and address.
+
+    Example:
+        store = CalibrationStore("calibration.json")
+        store.put(Calibration.fit(0x4C, requested, measured))
+        store.save()
+        dac = AD5693(0x4C, calibration=store.get(0x4C))
+
+    :param path: File of the profiles, read if it exists.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        self.path = os.fspath(path)
+        self.profiles: Dict[Tuple[Union[int, None], int], Calibration] = {}
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                for profile in json.load(file):
+                    self.put(Calibration(**profile))
+
+    def get(
+        self, address: int, bus_number: Union[int, None] = None
+    ) -> Union[Calibration, None]:
+        """
+        Profile of a DAC.
+
+        A profile stored without bus number matches the address on any bus.
+
+        :param address: I2C address of the DAC.
+        :param bus_number: I2C adapter of the DAC.
+        :return: The profile, None if the DAC is not calibrated.
+        """
+        profile = self.profiles.get((bus_number, address))
+        if profile is None:
+            profile = self.profiles.get((None, address))
+        return profile
+
+    def put(self, calibration: Calibration) -> None:
+        """
+        Add or replace a profile.
+
+        :param calibration: The profile.
+        """
+        self.profiles[calibration.key] = calibration
+
+    def save(self) -> None:
+        """
+        Write the profiles to the file.
+        """
+        profiles: List[dict] = [
+            profile.as_dict() for profile in self.profiles.values()
+        ]
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as file:
+            file.write(json.dumps(profiles, cls=CustomEncoder, indent=2))
+        os.replace(temporary, self.path)
+
+    def __iter__(self) -> Iterable[Calibration]:
+        return iter(self.profiles.values())
+
+    def __len__(self) -> int:
+        return len(self.profiles)
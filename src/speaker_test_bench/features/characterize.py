@@ -0,0 +1,396 @@
+"""
+Throughput characterization of an I2C bus and AD5693 DAC.
+
+Writes are issued back to back, without pacing, with several payload
+strategies: one frame per transaction, batches of frames, and batches of
+repeated data pairs after a single command byte. Each strategy is timed
+through an :class:`~speaker_test_bench.features.instrumentation.InstrumentedBus`,
+and the slowest transactions bound the sample rate it can sustain. The
+highest rate among the strategies with an acceptable error rate is
+recommended for waveform playback.
+
+The DAC output follows a small sine around mid-scale during the
+measurement. The ``stb-characterize`` command works on the simulated
+backend as well as on a real adapter::
+
+    stb-characterize --simulated
+    stb-characterize --bus 1 --address 0x4C --json bus1.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import List, Sequence, Union
+
+import numpy as np
+
+from speaker_test_bench.features.ad5693 import (
+    AD5693,
+    CompiledWaveform,
+    FrameEmitter,
+)
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.features.instrumentation import (
+    Instrumentation,
+    InstrumentedBus,
+)
+from speaker_test_bench.library.scheduler import NS_PER_S
+from speaker_test_bench.library.util import CustomEncoder
+
+LOOP_SAMPLES = 512
+PROBE_AMPLITUDE = 0.01
+MAX_CONSECUTIVE_ERRORS = 100
+
+
+@dataclass(frozen=True)
+class Strategy:
+    """
+    Payload strategy of the writes.
+
+    :param name: Label of the strategy.
+    :param batch_size: Number of samples per write.
+    :param repeated: Send repeated data pairs after a single command byte
+     instead of one 3-byte frame per sample.
+    """
+
+    name: str
+    batch_size: int = 1
+    repeated: bool = False
+
+
+DEFAULT_STRATEGIES = (
+    Strategy("single"),
+    Strategy("batch-8", 8),
+    Strategy("batch-32", 32),
+    Strategy("batch-128", 128),
+    Strategy("repeated-16", 16, repeated=True),
+    Strategy("repeated-128", 128, repeated=True),
+)
+"""Strategies measured by default, matching the ``batch_size`` and
+``repeated`` options of :meth:`AD5693.play`."""
+
+
+@dataclass
+class StrategyResult:
+    """
+    Measurements of one payload strategy.
+
+    :param strategy: Strategy measured.
+    :param n_writes: Writes attempted.
+    :param n_errors: Writes that failed.
+    :param n_samples: Samples written successfully.
+    :param elapsed: Measurement time in seconds.
+    :param latency_ns: Summary of the write latency histogram.
+    :param max_sample_rate: Sample rate sustained by the slow writes, after
+     the headroom, in samples per second.
+    :param reliable: Whether the error rate is acceptable.
+    """
+
+    strategy: Strategy
+    n_writes: int = 0
+    n_errors: int = 0
+    n_samples: int = 0
+    elapsed: float = 0.0
+    latency_ns: dict = field(default_factory=dict)
+    max_sample_rate: float = 0.0
+    reliable: bool = False
+
+    @property
+    def error_rate(self) -> float:
+        """Share of the writes that failed."""
+        return self.n_errors / self.n_writes if self.n_writes else 0.0
+
+    @property
+    def writes_per_s(self) -> float:
+        """Writes completed per second, back to back."""
+        n_done = self.n_writes - self.n_errors
+        return n_done / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def samples_per_s(self) -> float:
+        """Samples written per second, back to back."""
+        return self.n_samples / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        """Serializable copy of the measurements."""
+        out = asdict(self)
+        out["error_rate"] = self.error_rate
+        out["writes_per_s"] = self.writes_per_s
+        out["samples_per_s"] = self.samples_per_s
+        return out
+
+
+@dataclass
+class BusCharacterization:
+    """
+    Outcome of a characterization.
+
+    :param results: Measurements of each strategy.
+    :param percentile: Latency percentile the rates are derived from.
+    :param headroom: Share of the measured capacity used by the
+     recommendation.
+    :param max_error_rate: Error rate above which a strategy is unreliable.
+    """
+
+    results: List[StrategyResult]
+    percentile: float
+    headroom: float
+    max_error_rate: float
+
+    @property
+    def best(self) -> Union[StrategyResult, None]:
+        """Reliable strategy sustaining the highest sample rate."""
+        reliable = [result for result in self.results if result.reliable]
+        if not reliable:
+            return None
+        return max(reliable, key=lambda result: result.max_sample_rate)
+
+    @property
+    def recommended_rate(self) -> float:
+        """Highest reliable waveform sample rate, 0 if none is reliable."""
+        best = self.best
+        return 0.0 if best is None else best.max_sample_rate
+
+    def as_dict(self) -> dict:
+        """Serializable copy of the characterization."""
+        best = self.best
+        return {
+            "percentile": self.percentile,
+            "headroom": self.headroom,
+            "max_error_rate": self.max_error_rate,
+            "recommended_rate": self.recommended_rate,
+            "recommended_strategy": (
+                None if best is None else asdict(best.strategy)
+            ),
+            "results": [result.as_dict() for result in self.results],
+        }
+
+
+def measure(
+    dac: AD5693,
+    strategy: Strategy,
+    duration: float,
+    percentile: float = 99.0,
+    headroom: float = 0.8,
+    max_error_rate: float = 1e-3,
+) -> StrategyResult:
+    """
+    Write back to back with one strategy for a while.
+
+    Failed writes are counted and the measurement goes on, unless every
+    write keeps failing.
+
+    :param dac: DAC to write to.
+    :param strategy: Payload strategy.
+    :param duration: Measurement time in seconds.
+    :param percentile: Latency percentile bounding the sample rate.
+    :param headroom: Share of that rate kept in the recommendation.
+    :param max_error_rate: Error rate above which the strategy is
+     unreliable.
+    :return: The measurements.
+    """
+    t = np.arange(LOOP_SAMPLES) / LOOP_SAMPLES
+    probe = dac.compile_signal(
+        PROBE_AMPLITUDE * np.sin(2 * np.pi * t), LOOP_SAMPLES
+    )
+    waveform = CompiledWaveform(
+        codes=probe.codes,
+        frames=probe.frames,
+        sample_rate=LOOP_SAMPLES,
+        repeat=1 << 30,
+    )
+    metrics = Instrumentation()
+    emitter = FrameEmitter(
+        InstrumentedBus(dac.bus, metrics),
+        dac.device_address,
+        dac.DATA_REGISTER_ADDR,
+        waveform,
+        batch_size=strategy.batch_size,
+        repeated=strategy.repeated,
+    )
+    result = StrategyResult(strategy)
+    n_consecutive = 0
+    dac.shadow.invalidate_data()
+    start = time.perf_counter_ns()
+    deadline = start + int(duration * NS_PER_S)
+    index = 0
+    while time.perf_counter_ns() < deadline:
+        try:
+            emitter(index)
+            n_consecutive = 0
+        except Exception:
+            n_consecutive += 1
+        index += 1
+        if n_consecutive >= MAX_CONSECUTIVE_ERRORS:
+            break
+    result.elapsed = (time.perf_counter_ns() - start) / NS_PER_S
+    result.n_writes = index
+    result.n_errors = metrics.n_errors
+    result.n_samples = metrics.n_samples
+    result.latency_ns = metrics.latency.as_dict(
+        sorted({50.0, 90.0, percentile})
+    )
+    slow_ns = metrics.latency.percentile(percentile)
+    if slow_ns:
+        result.max_sample_rate = (
+            headroom * strategy.batch_size * NS_PER_S / slow_ns
+        )
+    result.reliable = bool(
+        metrics.n_transactions and result.error_rate <= max_error_rate
+    )
+    return result
+
+
+def characterize(
+    dac: AD5693,
+    duration: float = 1.0,
+    strategies: Sequence[Strategy] = DEFAULT_STRATEGIES,
+    percentile: float = 99.0,
+    headroom: float = 0.8,
+    max_error_rate: float = 1e-3,
+) -> BusCharacterization:
+    """
+    Measure every strategy and recommend a waveform sample rate.
+
+    A strategy sustains ``batch_size`` samples per write, so its sample rate
+    is bounded by ``batch_size`` over the latency percentile of its writes.
+    Batched strategies reach higher rates, but the samples of a batch go
+    out at bus speed rather than on their own deadline; play with the
+    ``batch_size`` and ``repeated`` of the recommended strategy.
+
+    :param dac: DAC to characterize, on a real or simulated bus.
+    :param duration: Measurement time of each strategy in seconds.
+    :param strategies: Payload strategies to compare.
+    :param percentile: Latency percentile the rates are derived from.
+    :param headroom: Share of the measured capacity to recommend.
+    :param max_error_rate: Error rate above which a strategy is unreliable.
+    :return: Measurements and recommendation.
+    """
+    if not 0 < headroom <= 1:
+        raise ValueError("Headroom must be in (0, 1]")
+    results = [
+        measure(dac, strategy, duration, percentile, headroom, max_error_rate)
+        for strategy in strategies
+    ]
+    return BusCharacterization(results, percentile, headroom, max_error_rate)
+
+
+def report(characterization: BusCharacterization) -> str:
+    """
+    Human-readable table of a characterization.
+
+    :param characterization: Outcome of :func:`characterize`.
+    :return: The table and the recommendation.
+    """
+    p = f"p{characterization.percentile:g}"
+    lines = [
+        f"{'strategy':<14}{'writes/s':>12}{'samples/s':>12}{'p50 us':>9}"
+        f"{p + ' us':>9}{'errors':>9}{'max rate':>12}"
+    ]
+    for result in characterization.results:
+        percentiles = result.latency_ns.get("percentiles", {})
+        lines.append(
+            f"{result.strategy.name:<14}{result.writes_per_s:>12,.0f}"
+            f"{result.samples_per_s:>12,.0f}"
+            f"{percentiles.get('p50', 0) / 1e3:>9.1f}"
+            f"{percentiles.get(p, 0) / 1e3:>9.1f}"
+            f"{result.error_rate:>9.2%}"
+            f"{result.max_sample_rate:>12,.0f}"
+            f"{'' if result.reliable else ' unreliable'}"
+        )
+    best = characterization.best
+    if best is None:
+        lines.append("\nNo reliable strategy")
+    else:
+        lines.append(
+            f"\nRecommended sample rate: {best.max_sample_rate:,.0f} Hz with"
+            f" batch_size={best.strategy.batch_size},"
+            f" repeated={best.strategy.repeated}"
+        )
+    return "\n".join(lines)
+
+
+def run(argv: Union[Sequence[str], None] = None) -> BusCharacterization:
+    """
+    Characterize the bus given on the command line and print the report.
+
+    :param argv: Arguments, ``sys.argv`` by default.
+    :return: The characterization.
+    """
+    parser = argparse.ArgumentParser(
+        description="Characterize the throughput of an I2C bus and AD5693."
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--bus", type=int, default=1, help="I2C adapter")
+    target.add_argument(
+        "--simulated", action="store_true", help="use the simulated bus"
+    )
+    parser.add_argument("--address", default="0x4C", help="DAC address")
+    parser.add_argument("--v-ref", type=float, default=5.0)
+    parser.add_argument(
+        "--duration", type=float, default=1.0, help="seconds per strategy"
+    )
+    parser.add_argument("--percentile", type=float, default=99.0)
+    parser.add_argument("--headroom", type=float, default=0.8)
+    parser.add_argument("--max-error-rate", type=float, default=1e-3)
+    parser.add_argument(
+        "--latency-us",
+        type=float,
+        default=50.0,
+        help="simulated cost of a transaction",
+    )
+    parser.add_argument(
+        "--byte-time-us",
+        type=float,
+        default=22.5,
+        help="simulated cost of a byte, 22.5 us at 400 kHz",
+    )
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    bus = None
+    if args.simulated:
+        bus = SimulatedBus(
+            [SimulatedAD5693(int(args.address, 0), args.v_ref)],
+            latency_s=args.latency_us * 1e-6,
+            byte_time_s=args.byte_time_us * 1e-6,
+        )
+    dac = AD5693(args.address, args.bus, v_ref=args.v_ref, bus=bus)
+    try:
+        characterization = characterize(
+            dac,
+            duration=args.duration,
+            percentile=args.percentile,
+            headroom=args.headroom,
+            max_error_rate=args.max_error_rate,
+        )
+    finally:
+        dac.close()
+        if bus is not None:
+            bus.close()
+    print(report(characterization))
+    if args.json:
+        with open(args.json, "w") as file:
+            file.write(
+                json.dumps(
+                    characterization.as_dict(), cls=CustomEncoder, indent=2
+                )
+            )
+    return characterization
+
+
+def main(argv: Union[Sequence[str], None] = None) -> int:
+    """
+    Command line entry point, ``stb-characterize``.
+
+    :param argv: Arguments, ``sys.argv`` by default.
+    :return: Exit status, 0 on success.
+    """
+    run(argv)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+Coordinated playback and updates on several AD5693 DACs.
+
+DACs are grouped by bus. Each group is driven by its own worker thread so
+that buses run concurrently, the bus ioctls releasing the GIL. Within a group
+the channels are interleaved in a single transaction stream: at every tick of
+the schedule each channel writes its next sample in turn. All groups share
+the same start timestamp.
+
+Static outputs can be switched together with staged updates: the input
+registers of every DAC are preloaded first, then the update commands are sent
+back to back, in a single combined transfer per bus when the backend
+supports it.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from speaker_test_bench.features.ad5693 import (
+    AD5693,
+    CompiledWaveform,
+    Playback,
+    PlaybackChannel,
+    PlaybackReport,
+)
+from speaker_test_bench.features.bus import (
+    BusBackend,
+    BusError,
+    Transaction,
+)
+from speaker_test_bench.features.instrumentation import BusProxy
+from speaker_test_bench.library.scheduler import (
+    LatePolicy,
+    wait_until,
+)
+
+
+def bus_key(bus: BusBackend) -> Hashable:
+    """
+    Identify the physical bus behind a backend.
+
+    Backends opened on the same I2C adapter share a key, other backends are
+    identified by the object itself. Instrumentation and profiling wrappers
+    are looked through.
+
+    :param bus: Bus backend.
+    :return: Hashable key.
+    """
+    while isinstance(bus, BusProxy):
+        bus = bus.bus
+    bus_number = getattr(bus, "bus_number", None)
+    return ("i2c", bus_number) if bus_number is not None else id(bus)
+
+
+@dataclass(frozen=True)
+class UpdateReport:
+    """
+    Timing of a multi-channel output update.
+
+    The window spans from the start of the first update command to the
+    completion of the last one, as seen from the host. It bounds the skew
+    between the channels.
+
+    :param n_channels: Number of channels updated.
+    :param window_ns: Update window in nanoseconds.
+    """
+
+    n_channels: int
+    window_ns: int
+
+
+@dataclass(frozen=True)
+class SkewComparison:
+    """
+    Median update windows of the naive and the staged approaches.
+
+    :param n_trials: Number of updates measured for each approach.
+    :param sequential_ns: Window of sequential ``set_voltage`` calls.
+    :param staged_ns: Window of the commit of staged updates.
+    """
+
+    n_trials: int
+    sequential_ns: float
+    staged_ns: float
+
+    @property
+    def improvement(self) -> float:
+        """Ratio of the sequential window over the staged one."""
+        return self.sequential_ns / self.staged_ns if self.staged_ns else 0.0
+
+
+class MultiDACCoordinator:
+    """
+    Drive several DACs together.
+
+    :meth:`play` plays one waveform per DAC from a shared start timestamp.
+    Channels sharing a bus must use the same sample rate, since they are
+    interleaved on a common schedule. :meth:`set_voltages` switches static
+    outputs together with staged updates.
+
+    Example:
+        coordinator = MultiDACCoordinator([left, right, sub])
+        reports = coordinator.play([tone, tone, None])
+        coordinator.set_voltages([2.5, 2.5, 0.0])
+
+    :param dacs: DACs to drive, in channel order.
+    :param policy: What to do with ticks that miss their deadline.
+    :param batch_size: Number of samples per channel and bus transaction.
+    :param repeated: Send batches as repeated data pairs.
+    """
+
+    def __init__(
+        self,
+        dacs: Sequence[AD5693],
+        policy: Union[LatePolicy, str] = LatePolicy.CATCH_UP,
+        batch_size: int = 1,
+        repeated: bool = False,
+    ) -> None:
+        self.dacs = list(dacs)
+        self.policy = LatePolicy(policy)
+        self.batch_size = batch_size
+        self.repeated = repeated
+        self.groups: Dict[Hashable, List[int]] = {}
+        for channel, dac in enumerate(self.dacs):
+            self.groups.setdefault(bus_key(dac.bus), []).append(channel)
+
+    def play(
+        self,
+        waveforms: Sequence[Union[CompiledWaveform, None]],
+        start_delay: float = 0.01,
+        stop_event: Union[threading.Event, None] = None,
+    ) -> List[Union[PlaybackReport, None]]:
+        """
+        Play the waveforms, one per channel, starting together.
+
+        :param waveforms: Waveform of each channel, None to leave a channel
+         untouched.
+        :param start_delay: Delay before the shared start, in seconds, so
+         that every worker is ready.
+        :param stop_event: Event ending the playback early once set.
+        :return: Playback report of each channel, None for idle channels.
+        """
+        if len(waveforms) != len(self.dacs):
+            raise ValueError("Expected one waveform per DAC")
+        jobs = []
+        for channels in self.groups.values():
+            active = [c for c in channels if waveforms[c] is not None]
+            if not active:
+                continue
+            rates = {waveforms[c].sample_rate for c in active}
+            if len(rates) > 1:
+                raise ValueError(
+                    "Channels sharing a bus must use the same sample rate"
+                )
+            jobs.append(active)
+        reports: List[Union[PlaybackReport, None]] = [None] * len(self.dacs)
+        if not jobs:
+            return reports
+        start_ns = time.perf_counter_ns() + int(start_delay * 1e9)
+        with ThreadPoolExecutor(
+            max_workers=len(jobs), thread_name_prefix="dac-group"
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self._play_group, channels, waveforms, start_ns, stop_event
+                )
+                for channels in jobs
+            ]
+            for future in futures:
+                for channel, report in future.result().items():
+                    reports[channel] = report
+        return reports
+
+    def _play_group(
+        self,
+        channels: List[int],
+        waveforms: Sequence[Union[CompiledWaveform, None]],
+        start_ns: int,
+        stop_event: Union[threading.Event, None],
+    ) -> Dict[int, PlaybackReport]:
+        playback_channels = [
+            PlaybackChannel.of(
+                self.dacs[c],
+                waveforms[c],
+                batch_size=self.batch_size,
+                repeated=self.repeated,
+            )
+            for c in channels
+        ]
+        tracers = [self.dacs[c].tracer for c in channels]
+        playback = Playback(
+            playback_channels,
+            policy=self.policy,
+            tracer=next((t for t in tracers if t is not None), None),
+        )
+        try:
+            stats = playback.run(start_ns=start_ns, stop_event=stop_event)
+        except BusError:
+            raise
+        except Exception as error:
+            raise Exception(f"Error during playback: {error}") from error
+        return {
+            channel: playback_channel.report(stats)
+            for channel, playback_channel in zip(channels, playback_channels)
+        }
+
+    def set_voltages_sequential(
+        self, voltages: Sequence[Union[float, None]], force: bool = False
+    ) -> UpdateReport:
+        """
+        Set the output voltages one DAC after the other.
+
+        This is the naive approach, kept as the reference for
+        :meth:`compare_skew`.
+
+        :param voltages: Voltage of each channel, None to skip a channel.
+        :param force: Write even the outputs already at their voltage.
+        :return: Update window of the channels.
+        """
+        channels = self._channels(voltages)
+        start = time.perf_counter_ns()
+        for channel in channels:
+            self.dacs[channel].set_voltage(voltages[channel], force=force)
+        return UpdateReport(len(channels), time.perf_counter_ns() - start)
+
+    def stage(
+        self, voltages: Sequence[Union[float, None]], force: bool = False
+    ) -> None:
+        """
+        Preload the input registers without changing the outputs.
+
+        :param voltages: Voltage of each channel, None to skip a channel.
+        :param force: Write even the input registers already holding their
+         voltage.
+        """
+        for channel in self._channels(voltages):
+            self.dacs[channel].stage_voltage(voltages[channel], force=force)
+
+    def commit(
+        self,
+        channels: Union[Sequence[int], None] = None,
+        start_delay: float = 0.002,
+    ) -> UpdateReport:
+        """
+        Update the outputs from their staged input registers.
+
+        The update commands of a bus are sent in a single combined transfer
+        when the backend supports it, or one transfer per backend object when
+        the DACs of a bus are wrapped differently. Buses are committed
+        concurrently from a shared start timestamp.
+
+        :param channels: Channels to update, all of them by default.
+        :param start_delay: Delay before the shared start when several buses
+         are involved, in seconds, so that every worker is ready.
+        :return: Update window of the channels.
+        """
+        if channels is None:
+            channels = range(len(self.dacs))
+        selected = set(channels)
+        jobs = [
+            [c for c in group if c in selected]
+            for group in self.groups.values()
+        ]
+        jobs = [job for job in jobs if job]
+        if not jobs:
+            return UpdateReport(0, 0)
+        if len(jobs) == 1:
+            start, end = self._commit_group(jobs[0], None)
+            return UpdateReport(len(selected), end - start)
+        start_ns = time.perf_counter_ns() + int(start_delay * 1e9)
+        with ThreadPoolExecutor(
+            max_workers=len(jobs), thread_name_prefix="dac-group"
+        ) as executor:
+            spans = list(
+                executor.map(
+                    lambda job: self._commit_group(job, start_ns), jobs
+                )
+            )
+        return UpdateReport(
+            len(selected),
+            max(end for _, end in spans) - min(start for start, _ in spans),
+        )
+
+    def set_voltages(
+        self, voltages: Sequence[Union[float, None]], force: bool = False
+    ) -> UpdateReport:
+        """
+        Switch several outputs together with staged updates.
+
+        :param voltages: Voltage of each channel, None to skip a channel.
+        :param force: Write even the input registers already holding their
+         voltage.
+        :return: Update window of the commit.
+        """
+        self.stage(voltages, force=force)
+        return self.commit(self._channels(voltages))
+
+    def compare_skew(
+        self, voltages: Sequence[Union[float, None]], n_trials: int = 20
+    ) -> SkewComparison:
+        """
+        Measure the update window of sequential writes against staged
+        updates.
+
+        :param voltages: Voltage of each channel, None to skip a channel.
+        :param n_trials: Number of updates measured for each approach.
+        :return: Median windows of both approaches.
+        """
+        # Forced writes, the shadow registers would skip repeated updates
+        sequential = [
+            self.set_voltages_sequential(voltages, force=True).window_ns
+            for _ in range(n_trials)
+        ]
+        staged = [
+            self.set_voltages(voltages, force=True).window_ns
+            for _ in range(n_trials)
+        ]
+        return SkewComparison(
+            n_trials=n_trials,
+            sequential_ns=float(np.median(sequential)),
+            staged_ns=float(np.median(staged)),
+        )
+
+    def _channels(self, voltages: Sequence[Union[float, None]]) -> List[int]:
+        if len(voltages) != len(self.dacs):
+            raise ValueError("Expected one voltage per DAC")
+        return [c for c, voltage in enumerate(voltages) if voltage is not None]
+
+    def _commit_group(
+        self, channels: List[int], start_ns: Union[int, None]
+    ) -> Tuple[int, int]:
+        dacs = [self.dacs[c] for c in channels]
+        # DACs wrapped differently, e.g. only one of them instrumented, go
+        # through their own layers
+        batches: Dict[int, Tuple[BusBackend, List[Transaction]]] = {}
+        for dac in dacs:
+            _, transactions = batches.setdefault(id(dac.bus), (dac.bus, []))
+            transactions.append(
+                (dac.device_address, dac.UPDATE_REGISTER_ADDR, b"\x00\x00")
+            )
+        if start_ns is not None:
+            wait_until(start_ns)
+        start = time.perf_counter_ns()
+        for dac in dacs:
+            dac.shadow.dac = None
+        try:
+            for bus, transactions in batches.values():
+                bus.write_transactions(transactions)
+        except BusError:
+            raise
+        except Exception as error:
+            raise Exception(f"Error during update: {error}") from error
+        end = time.perf_counter_ns()
+        for dac in dacs:
+            dac.shadow.dac = dac.shadow.input
+        return start, end
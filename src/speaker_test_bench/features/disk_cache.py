@@ -0,0 +1,312 @@
+"""
+Persistent on-disk cache of compiled waveforms.
+
+Each waveform is stored as two files named after a digest of its cache key:
+the raw big-endian DAC frames (``.u2``) and a small JSON header. Cached
+frames are loaded with ``np.memmap``, so playback reads them straight from
+the page cache without copying or decoding.
+
+Several bench processes can share a cache directory. Files are written to a
+temporary name and moved into place atomically, so readers only ever see
+complete entries; the frames are moved before the header that makes the
+entry visible. Eviction is serialized with an advisory lock file where the
+platform supports it, and tolerates entries vanishing under its feet.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Callable, Hashable, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+
+from speaker_test_bench.features.ad5693 import CompiledWaveform
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+DEFAULT_MAX_BYTES = 1 << 30
+FRAMES_SUFFIX = ".u2"
+HEADER_SUFFIX = ".json"
+LOCK_NAME = ".lock"
+
+
+@dataclass
+class DiskCacheStats:
+    """
+    Counters of a disk cache, for the current process.
+
+    :param n_hits: Requests served from disk.
+    :param n_misses: Requests that found no entry.
+    :param n_writes: Entries written.
+    :param n_evictions: Entries removed to stay under the size limit.
+    """
+
+    n_hits: int = 0
+    n_misses: int = 0
+    n_writes: int = 0
+    n_evictions: int = 0
+
+    def as_dict(self) -> dict:
+        """Serializable copy of the counters."""
+        return asdict(self)
+
+
+class WaveformDiskCache:
+    """
+    Content-addressed directory of compiled waveforms.
+
+    Keys are any value with a stable ``repr``, typically
+    :meth:`StimulusCache.key`; they should include everything the frames
+    depend on, such as the reference voltage and the calibration. Entries
+    are evicted least recently used first once the directory exceeds
+    ``max_bytes``; reading an entry refreshes its modification time.
+
+    Example:
+        disk = WaveformDiskCache("~/.cache/speaker_test_bench")
+        sweep = disk.get_or_compile(key, lambda: dac.compile_signal(x, fs))
+        dac.play(sweep)
+
+    :param directory: Cache directory, created if needed.
+    :param max_bytes: Size limit of the stored frames.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, os.PathLike],
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.directory = os.path.abspath(
+            os.path.expanduser(os.fspath(directory))
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats = DiskCacheStats()
+
+    @staticmethod
+    def digest(key: Hashable) -> str:
+        """
+        Name of the entry of a key.
+
+        :param key: Cache key.
+        :return: Hexadecimal SHA-256 of the key representation.
+        """
+        return hashlib.sha256(repr(key).encode()).hexdigest()
+
+    def _path(self, digest: str, suffix: str) -> str:
+        return os.path.join(self.directory, digest + suffix)
+
+    def get(self, key: Hashable) -> Union[CompiledWaveform, None]:
+        """
+        Load a cached waveform.
+
+        :param key: Cache key.
+        :return: The waveform, memory-mapped, or None if it is not cached.
+        """
+        waveform = self._load(self.digest(key))
+        if waveform is None:
+            self.stats.n_misses += 1
+        else:
+            self.stats.n_hits += 1
+        return waveform
+
+    def _load(self, digest: str) -> Union[CompiledWaveform, None]:
+        try:
+            with open(self._path(digest, HEADER_SUFFIX)) as file:
+                header = json.load(file)
+            frames_path = self._path(digest, FRAMES_SUFFIX)
+            codes = np.memmap(frames_path, dtype=">u2", mode="r")
+            os.utime(frames_path)
+        except (OSError, ValueError):
+            return None
+        return CompiledWaveform(
+            codes=codes,
+            frames=memoryview(codes).cast("B"),
+            sample_rate=header["sample_rate"],
+            repeat=header["repeat"],
+            frequency=header["frequency"],
+        )
+
+    def put(
+        self, key: Hashable, waveform: CompiledWaveform
+    ) -> CompiledWaveform:
+        """
+        Store a waveform.
+
+        :param key: Cache key.
+        :param waveform: Waveform to store.
+        :return: The stored waveform, memory-mapped from the cache, or the
+         waveform itself if it exceeds the size limit.
+        """
+        if len(waveform.frames) > self.max_bytes:
+            return waveform
+        return self.put_stream(
+            key,
+            [waveform],
+            waveform.sample_rate,
+            repeat=waveform.repeat,
+            frequency=waveform.frequency,
+        )
+
+    def put_stream(
+        self,
+        key: Hashable,
+        waveforms: Iterable[CompiledWaveform],
+        sample_rate: float,
+        repeat: int = 1,
+        frequency: Union[float, None] = None,
+    ) -> CompiledWaveform:
+        """
+        Store a stream of waveforms as a single entry, chunk by chunk.
+
+        Long stimuli such as sweeps are written without being held in memory
+        as a whole.
+
+        :param key: Cache key.
+        :param waveforms: Chunks of the waveform, in order, e.g. from
+         :meth:`AD5693.compile_stream`.
+        :param sample_rate: Output rate in samples per second.
+        :param repeat: Number of times the waveform is played back to back.
+        :param frequency: Frequency of a periodic waveform.
+        :return: The stored waveform, memory-mapped from the cache.
+        """
+        digest = self.digest(key)
+        n_bytes = 0
+        with self._temporary(digest, FRAMES_SUFFIX) as file:
+            for waveform in waveforms:
+                file.write(waveform.frames)
+                n_bytes += len(waveform.frames)
+            if not n_bytes:
+                raise ValueError("Cannot cache an empty waveform")
+            file.flush()
+            # Mapped before the move so that the returned waveform outlives
+            # an eviction by a concurrent process
+            codes = np.memmap(file, dtype=">u2", mode="r")
+        header = {
+            "key": repr(key),
+            "sample_rate": sample_rate,
+            "repeat": repeat,
+            "frequency": frequency,
+            "n_bytes": n_bytes,
+            "created": time.time(),
+        }
+        with self._temporary(digest, HEADER_SUFFIX) as file:
+            file.write(json.dumps(header).encode())
+        self.stats.n_writes += 1
+        self.evict()
+        return CompiledWaveform(
+            codes=codes,
+            frames=memoryview(codes).cast("B"),
+            sample_rate=sample_rate,
+            repeat=repeat,
+            frequency=frequency,
+        )
+
+    def get_or_compile(
+        self, key: Hashable, compile_waveform: Callable[[], CompiledWaveform]
+    ) -> CompiledWaveform:
+        """
+        Load a cached waveform, compiling and storing it on a miss.
+
+        :param key: Cache key.
+        :param compile_waveform: Builds the waveform on a miss.
+        :return: The waveform, memory-mapped from the cache.
+        """
+        waveform = self.get(key)
+        if waveform is None:
+            waveform = self.put(key, compile_waveform())
+        return waveform
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """
+        List the stored entries.
+
+        :return: Last use time, frame size and digest of each entry, least
+         recently used first.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(FRAMES_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append(
+                (stat.st_mtime, stat.st_size, name[: -len(FRAMES_SUFFIX)])
+            )
+        return sorted(entries)
+
+    @property
+    def n_bytes(self) -> int:
+        """Size of the stored frames."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes: Union[int, None] = None) -> int:
+        """
+        Remove the least recently used entries above a size limit.
+
+        :param max_bytes: Size limit, ``max_bytes`` of the cache by default.
+        :return: Number of entries removed.
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        n_evicted = 0
+        with self._lock():
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, digest in entries:
+                if total <= limit:
+                    break
+                # Header first, so the entry disappears before its frames
+                for suffix in (HEADER_SUFFIX, FRAMES_SUFFIX):
+                    try:
+                        os.unlink(self._path(digest, suffix))
+                    except FileNotFoundError:
+                        pass
+                    except OSError:
+                        # Mapped by another process on Windows, keep it
+                        break
+                total -= size
+                n_evicted += 1
+        self.stats.n_evictions += n_evicted
+        return n_evicted
+
+    def clear(self) -> None:
+        """
+        Remove every entry.
+        """
+        self.evict(0)
+
+    @contextmanager
+    def _temporary(self, digest: str, suffix: str) -> Iterator:
+        descriptor, temporary = tempfile.mkstemp(
+            prefix=f".{digest}.", suffix=".tmp", dir=self.directory
+        )
+        try:
+            with os.fdopen(descriptor, "w+b") as file:
+                yield file
+            os.replace(temporary, self._path(digest, suffix))
+        except BaseException:
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            raise
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, LOCK_NAME), "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
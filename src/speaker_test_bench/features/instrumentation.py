@@ -0,0 +1,383 @@
+"""
+Opt-in instrumentation of the AD5693 I/O path.
+
+Instrumentation is enabled per DAC with :meth:`AD5693.instrument`, which
+wraps the bus backend in an :class:`InstrumentedBus`, and profiling with
+:meth:`AD5693.profile`, which wraps it in a :class:`TracedBus`. When they
+are disabled the DAC talks to its backend directly, so the disabled mode
+costs nothing on the transaction path; playback only checks once per
+waveform whether a lateness histogram or a tracer should be fed.
+
+Everything is kept in fixed memory: counters and
+:class:`~speaker_test_bench.library.histogram.LatencyHistogram` instances.
+:meth:`Instrumentation.as_dict` exports plain Python values that
+:class:`~speaker_test_bench.library.util.CustomEncoder` serializes.
+"""
+
+import time
+from collections import Counter
+from typing import Dict, List, Sequence, Union
+
+from speaker_test_bench.features.bus import (
+    Buffer,
+    BusBackend,
+    Read,
+    Transaction,
+)
+from speaker_test_bench.library.histogram import LatencyHistogram
+from speaker_test_bench.library.scheduler import NS_PER_S, SchedulerStats
+from speaker_test_bench.library.trace import Tracer
+
+
+class Instrumentation:
+    """
+    Metrics of the transactions and schedules of one or several DACs.
+
+    Counters are updated without locking: when several threads share an
+    instance, a few increments may be lost, which is acceptable for
+    monitoring.
+
+    Example:
+        metrics = dac.instrument()
+        dac.generate_sine_wave(440, 5)
+        json.dumps(metrics.as_dict(), cls=CustomEncoder)
+    """
+
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram()
+        """Duration of each bus transaction, in nanoseconds."""
+        self.lateness = LatencyHistogram()
+        """Delay of each scheduled sample after its deadline, in
+        nanoseconds."""
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forget every measurement.
+        """
+        self.latency.reset()
+        self.lateness.reset()
+        self.n_transactions = 0
+        self.n_samples = 0
+        self.n_bytes = 0
+        self.n_errors = 0
+        self.n_retries = 0
+        self.errors: Counter = Counter()
+        self.n_scheduled = 0
+        self.n_late = 0
+        self.n_dropped = 0
+        self.n_verified = 0
+        self.n_mismatches = 0
+        self.mismatches: Counter = Counter()
+        self.last_mismatch: Union[dict, None] = None
+        self.first_ns: Union[int, None] = None
+        self.last_ns: Union[int, None] = None
+
+    def record_transaction(
+        self, start_ns: int, end_ns: int, n_samples: int, n_bytes: int
+    ) -> None:
+        """
+        Account for one completed bus transaction.
+
+        :param start_ns: ``perf_counter_ns`` before the transaction.
+        :param end_ns: ``perf_counter_ns`` after the transaction.
+        :param n_samples: Number of 16-bit words written.
+        :param n_bytes: Number of bytes on the bus, command bytes included.
+        """
+        self.latency.record(end_ns - start_ns)
+        self.n_transactions += 1
+        self.n_samples += n_samples
+        self.n_bytes += n_bytes
+        if self.first_ns is None:
+            self.first_ns = start_ns
+        self.last_ns = end_ns
+
+    def record_error(self, error: BaseException) -> None:
+        """
+        Account for one failed bus transaction.
+
+        :param error: The error raised by the backend.
+        """
+        self.n_errors += 1
+        self.errors[type(error).__name__] += 1
+
+    def record_retry(self) -> None:
+        """
+        Account for one transaction retried after an error.
+        """
+        self.n_retries += 1
+
+    def record_readback(
+        self, register: str, expected: int, actual: int
+    ) -> None:
+        """
+        Account for one register read back and compared to the value written.
+
+        :param register: Name of the register, e.g. ``"dac"``.
+        :param expected: Value the host wrote last.
+        :param actual: Value read from the device.
+        """
+        self.n_verified += 1
+        if actual != expected:
+            self.n_mismatches += 1
+            self.mismatches[register] += 1
+            self.last_mismatch = {
+                "register": register,
+                "expected": expected,
+                "actual": actual,
+                "time_ns": time.perf_counter_ns(),
+            }
+
+    def record_schedule(self, stats: SchedulerStats) -> None:
+        """
+        Account for the outcome of a playback schedule.
+
+        The lateness of each sample is recorded by the scheduler itself
+        through :attr:`lateness`.
+
+        :param stats: Statistics returned by the scheduler.
+        """
+        self.n_scheduled += stats.n_scheduled
+        self.n_late += stats.n_late
+        self.n_dropped += stats.n_dropped
+
+    @property
+    def elapsed_ns(self) -> int:
+        """Time from the first transaction to the end of the last one."""
+        if self.first_ns is None:
+            return 0
+        return self.last_ns - self.first_ns
+
+    @property
+    def throughput(self) -> Dict[str, float]:
+        """Transactions, samples and bytes per second."""
+        elapsed = self.elapsed_ns / NS_PER_S
+        if not elapsed:
+            return {"transactions": 0.0, "samples": 0.0, "bytes": 0.0}
+        return {
+            "transactions": self.n_transactions / elapsed,
+            "samples": self.n_samples / elapsed,
+            "bytes": self.n_bytes / elapsed,
+        }
+
+    def as_dict(self) -> dict:
+        """
+        Serializable snapshot of the metrics.
+
+        :return: Nested dictionary of plain Python values.
+        """
+        return {
+            "n_transactions": self.n_transactions,
+            "n_samples": self.n_samples,
+            "n_bytes": self.n_bytes,
+            "n_errors": self.n_errors,
+            "n_retries": self.n_retries,
+            "errors": dict(self.errors),
+            "elapsed_ns": self.elapsed_ns,
+            "throughput": self.throughput,
+            "latency_ns": self.latency.as_dict(),
+            "timing": {
+                "n_scheduled": self.n_scheduled,
+                "n_late": self.n_late,
+                "n_dropped": self.n_dropped,
+                "jitter_ns": self.lateness.stddev,
+                "lateness_ns": self.lateness.as_dict(),
+            },
+            "readback": {
+                "n_verified": self.n_verified,
+                "n_mismatches": self.n_mismatches,
+                "mismatches": dict(self.mismatches),
+                "last_mismatch": self.last_mismatch,
+            },
+        }
+
+
+class BusProxy(BusBackend):
+    """
+    Bus backend forwarding every call to another backend.
+
+    Base of the backends that observe the I/O of a DAC. Attributes not
+    defined here, such as ``bus_number``, are read from the wrapped backend.
+
+    :param bus: Backend to wrap.
+    """
+
+    def __init__(self, bus: BusBackend) -> None:
+        self.bus = bus
+
+    def __getattr__(self, name: str):
+        return getattr(self.__dict__["bus"], name)
+
+    def write_i2c_block_data(
+        self, address: int, register: int, data: Buffer
+    ) -> None:
+        self.bus.write_i2c_block_data(address, register, data)
+
+    def write_frames(
+        self,
+        address: int,
+        command: int,
+        data: Buffer,
+        repeated: bool = False,
+    ) -> None:
+        self.bus.write_frames(address, command, data, repeated)
+
+    def write_transactions(self, transactions: Sequence[Transaction]) -> None:
+        self.bus.write_transactions(transactions)
+
+    def read_i2c_block_data(
+        self, address: int, register: int, length: int
+    ) -> List[int]:
+        return self.bus.read_i2c_block_data(address, register, length)
+
+    def read_transactions(self, reads: Sequence[Read]) -> List[bytes]:
+        return self.bus.read_transactions(reads)
+
+    def close(self) -> None:
+        self.bus.close()
+
+
+def unwrap(bus: BusBackend, kind: type = BusProxy) -> BusBackend:
+    """
+    Remove proxies from a chain of backends.
+
+    :param bus: Outermost backend.
+    :param kind: Type of the proxies to remove, every proxy by default.
+    :return: The chain without the proxies of that type.
+    """
+    if isinstance(bus, kind):
+        return unwrap(bus.bus, kind)
+    if isinstance(bus, BusProxy):
+        bus.bus = unwrap(bus.bus, kind)
+    return bus
+
+
+class InstrumentedBus(BusProxy):
+    """
+    Bus backend measuring every transaction of another backend.
+
+    :param bus: Backend to wrap.
+    :param metrics: Where the measurements go.
+    """
+
+    def __init__(self, bus: BusBackend, metrics: Instrumentation) -> None:
+        super().__init__(bus)
+        self.metrics = metrics
+
+    def write_i2c_block_data(
+        self, address: int, register: int, data: Buffer
+    ) -> None:
+        if not hasattr(data, "__len__"):
+            # Iterators could not be counted once consumed by the write
+            data = list(data)
+        start = time.perf_counter_ns()
+        try:
+            self.bus.write_i2c_block_data(address, register, data)
+        except Exception as error:
+            self.metrics.record_error(error)
+            raise
+        self.metrics.record_transaction(
+            start, time.perf_counter_ns(), len(data) // 2, len(data) + 1
+        )
+
+    def write_frames(
+        self,
+        address: int,
+        command: int,
+        data: Buffer,
+        repeated: bool = False,
+    ) -> None:
+        start = time.perf_counter_ns()
+        try:
+            self.bus.write_frames(address, command, data, repeated)
+        except Exception as error:
+            self.metrics.record_error(error)
+            raise
+        n_data = memoryview(data).nbytes
+        n_samples = n_data // 2
+        self.metrics.record_transaction(
+            start,
+            time.perf_counter_ns(),
+            n_samples,
+            n_data + (1 if repeated else n_samples),
+        )
+
+    def write_transactions(self, transactions: Sequence[Transaction]) -> None:
+        start = time.perf_counter_ns()
+        try:
+            self.bus.write_transactions(transactions)
+        except Exception as error:
+            self.metrics.record_error(error)
+            raise
+        n_data = sum(len(data) for _, _, data in transactions)
+        self.metrics.record_transaction(
+            start,
+            time.perf_counter_ns(),
+            n_data // 2,
+            n_data + len(transactions),
+        )
+
+
+class TracedBus(BusProxy):
+    """
+    Bus backend recording a span around every transaction of another
+    backend.
+
+    The spans are named ``bus.write``, ``bus.write_frames``,
+    ``bus.write_transactions`` and ``bus.read_transactions``.
+
+    :param bus: Backend to wrap.
+    :param tracer: Tracer receiving the spans.
+    """
+
+    def __init__(self, bus: BusBackend, tracer: Tracer) -> None:
+        super().__init__(bus)
+        self.tracer = tracer
+        # The inner backend is looked up on every call, so that the layers
+        # below can be removed with unwrap
+        self._write = tracer.name_id("bus.write")
+        self._write_frames = tracer.name_id("bus.write_frames")
+        self._write_transactions = tracer.name_id("bus.write_transactions")
+        self._read_transactions = tracer.name_id("bus.read_transactions")
+
+    def write_i2c_block_data(
+        self, address: int, register: int, data: Buffer
+    ) -> None:
+        start = time.perf_counter_ns()
+        try:
+            self.bus.write_i2c_block_data(address, register, data)
+        finally:
+            self.tracer.log.record(self._write, start, time.perf_counter_ns())
+
+    def write_frames(
+        self,
+        address: int,
+        command: int,
+        data: Buffer,
+        repeated: bool = False,
+    ) -> None:
+        start = time.perf_counter_ns()
+        try:
+            self.bus.write_frames(address, command, data, repeated)
+        finally:
+            self.tracer.log.record(
+                self._write_frames, start, time.perf_counter_ns()
+            )
+
+    def write_transactions(self, transactions: Sequence[Transaction]) -> None:
+        start = time.perf_counter_ns()
+        try:
+            self.bus.write_transactions(transactions)
+        finally:
+            self.tracer.log.record(
+                self._write_transactions, start, time.perf_counter_ns()
+            )
+
+    def read_transactions(self, reads: Sequence[Read]) -> List[bytes]:
+        start = time.perf_counter_ns()
+        try:
+            return self.bus.read_transactions(reads)
+        finally:
+            self.tracer.log.record(
+                self._read_transactions, start, time.perf_counter_ns()
+            )
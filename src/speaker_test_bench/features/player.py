@@ -0,0 +1,320 @@
+"""
+Background waveform player for the AD5693 DAC.
+
+The player runs the output on a dedicated thread so that the caller can keep
+acquiring or analysing data while a waveform plays. Compiled waveforms are
+queued in a small ring of pre-encoded segments: the producer fills the next
+slot while the current one is being played, and consecutive segments are
+scheduled back to back on a single timeline so transitions are gapless.
+"""
+
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Union
+
+from speaker_test_bench.features.ad5693 import (
+    AD5693,
+    CompiledWaveform,
+    Playback,
+    PlaybackChannel,
+)
+from speaker_test_bench.features.bus import BusError
+from speaker_test_bench.library.realtime import (
+    RealtimeConfig,
+    RealtimeReport,
+    RealtimeSession,
+)
+from speaker_test_bench.library.scheduler import LatePolicy
+
+
+class FrameRing:
+    """
+    Bounded single-producer single-consumer ring of compiled waveforms.
+
+    Slots are handed over with two semaphores counting the free and the filled
+    slots, so the producer and the consumer never share a lock on the data.
+    With the default capacity of 2 the ring is a double buffer.
+
+    :param capacity: Number of slots in the ring.
+    """
+
+    def __init__(self, capacity: int = 2) -> None:
+        if capacity < 1:
+            raise ValueError("Ring capacity must be at least 1")
+        self.capacity = capacity
+        self._slots: List[Union[CompiledWaveform, None]] = [None] * capacity
+        self._head = 0
+        self._tail = 0
+        self._free = threading.Semaphore(capacity)
+        self._filled = threading.Semaphore(0)
+
+    def put(
+        self, waveform: CompiledWaveform, timeout: Union[float, None] = None
+    ) -> bool:
+        """
+        Store a waveform in the next free slot.
+
+        :param waveform: Waveform to queue.
+        :param timeout: Maximum time to wait for a free slot, in seconds.
+        :return: False if no slot freed up in time.
+        """
+        if not self._free.acquire(timeout=timeout):
+            return False
+        self._slots[self._tail] = waveform
+        self._tail = (self._tail + 1) % self.capacity
+        self._filled.release()
+        return True
+
+    def get(
+        self, timeout: Union[float, None] = None
+    ) -> Union[CompiledWaveform, None]:
+        """
+        Take the oldest waveform out of the ring.
+
+        :param timeout: Maximum time to wait for a waveform, in seconds.
+        :return: The waveform, or None if the ring stayed empty.
+        """
+        if not self._filled.acquire(timeout=timeout):
+            return None
+        waveform = self._slots[self._head]
+        self._slots[self._head] = None
+        self._head = (self._head + 1) % self.capacity
+        self._free.release()
+        return waveform
+
+
+@dataclass
+class PlayerStats:
+    """
+    Counters of a waveform player.
+
+    :param n_segments: Number of waveforms played to completion.
+    :param n_samples: Number of samples written to the DAC.
+    :param n_underruns: Number of times the ring ran dry while more waveforms
+     were expected, leaving a gap in the output.
+    :param n_late: Number of late schedule events.
+    :param n_dropped: Number of schedule events dropped.
+    :param n_bus_dropped: Number of samples dropped by the fault-tolerant
+     transport after failed retries, not included in ``n_samples``.
+    """
+
+    n_segments: int = 0
+    n_samples: int = 0
+    n_underruns: int = 0
+    n_late: int = 0
+    n_dropped: int = 0
+    n_bus_dropped: int = 0
+
+    def as_dict(self) -> dict:
+        """Serializable copy of the counters."""
+        return asdict(self)
+
+
+class WaveformPlayer:
+    """
+    Play compiled waveforms on an :class:`AD5693` from a background thread.
+
+    Waveforms are queued with :meth:`queue` and played in order, each one
+    starting exactly where the previous one ends. When the ring runs dry the
+    output holds its last value; unless :meth:`wait` was called to mark the
+    end of the stream, this counts as an underrun and the next waveform
+    starts as soon as it is queued.
+
+    Example:
+        with dac.player() as player:
+            player.queue(dac.compile_sine_wave(440, 5))
+            ...  # acquire and analyse while the tone plays
+            player.wait()
+
+    :param dac: DAC to drive.
+    :param capacity: Number of waveforms that can be queued ahead.
+    :param policy: What to do with samples that miss their deadline.
+    :param batch_size: Number of samples per bus transaction.
+    :param repeated: Send batches as repeated data pairs.
+    :param realtime: Real-time settings of the output thread. The settings
+     applied are in :attr:`realtime_report` once the thread runs.
+    """
+
+    def __init__(
+        self,
+        dac: AD5693,
+        capacity: int = 2,
+        policy: Union[LatePolicy, str] = LatePolicy.CATCH_UP,
+        batch_size: int = 1,
+        repeated: bool = False,
+        realtime: Union[RealtimeConfig, None] = None,
+    ) -> None:
+        self.dac = dac
+        self.policy = LatePolicy(policy)
+        self.batch_size = batch_size
+        self.repeated = repeated
+        self.realtime = realtime
+        self.realtime_report: Union[RealtimeReport, None] = None
+        self.stats = PlayerStats()
+        self._ring = FrameRing(capacity)
+        self._stop = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._draining = False
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._error: Union[BaseException, None] = None
+        self._thread: Union[threading.Thread, None] = None
+
+    @property
+    def running(self) -> bool:
+        """True while the output thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "WaveformPlayer":
+        """
+        Start the output thread.
+
+        :return: The player itself.
+        """
+        if self.running:
+            return self
+        self._stop.clear()
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._run, name="ad5693-player", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def queue(
+        self, waveform: CompiledWaveform, timeout: Union[float, None] = None
+    ) -> bool:
+        """
+        Queue a waveform after the ones already queued.
+
+        Blocks while the ring is full.
+
+        :param waveform: Waveform to play.
+        :param timeout: Maximum time to wait for a free slot, in seconds.
+        :return: False if the ring stayed full.
+        """
+        self._raise_error()
+        with self._pending_lock:
+            self._pending += 1
+            self._draining = False
+            self._idle.clear()
+        if self._ring.put(waveform, timeout=timeout):
+            return True
+        self._segment_done()
+        return False
+
+    def wait(self, timeout: Union[float, None] = None) -> bool:
+        """
+        Wait until every queued waveform has been played.
+
+        This also marks the end of the stream: the ring running dry after
+        the last waveform is not counted as an underrun.
+
+        :param timeout: Maximum time to wait, in seconds.
+        :return: False if the waveforms were still playing at the timeout.
+        """
+        self._draining = True
+        done = self._idle.wait(timeout)
+        self._raise_error()
+        return done
+
+    def stop(self, timeout: Union[float, None] = None) -> None:
+        """
+        Stop the output, dropping the waveforms still queued.
+
+        :param timeout: Maximum time to wait for the thread, in seconds.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        while self._ring.get(timeout=0) is not None:
+            self._segment_done()
+        self._raise_error()
+
+    def __enter__(self) -> "WaveformPlayer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            if isinstance(error, BusError):
+                # Typed bus errors reach the caller as AD5693.play raises them
+                raise error
+            raise Exception(f"Error during playback: {error}") from error
+
+    def _segment_done(self) -> None:
+        with self._pending_lock:
+            self._pending -= 1
+            if self._pending <= 0:
+                self._pending = 0
+                self._idle.set()
+
+    def _run(self) -> None:
+        if self.realtime is None:
+            self._loop()
+            return
+        with RealtimeSession(self.realtime) as report:
+            self.realtime_report = report
+            self._loop()
+
+    def _loop(self) -> None:
+        next_start = None
+        ended_ns = None
+        while not self._stop.is_set():
+            waveform = self._ring.get(timeout=0.01)
+            fetched_ns = time.perf_counter_ns()
+            if waveform is None:
+                if next_start is not None and not self._draining:
+                    self.stats.n_underruns += 1
+                next_start = None
+                continue
+            try:
+                next_start = self._play(
+                    waveform, next_start, ended_ns, fetched_ns
+                )
+                ended_ns = time.perf_counter_ns()
+            except Exception as error:  # pylint: disable=broad-except
+                self._error = error
+                self._stop.set()
+            finally:
+                self._segment_done()
+
+    def _play(
+        self, waveform: CompiledWaveform, start_ns, ended_ns, fetched_ns
+    ) -> int:
+        channel = PlaybackChannel.of(
+            self.dac,
+            waveform,
+            batch_size=self.batch_size,
+            repeated=self.repeated,
+        )
+        playback = Playback(
+            [channel], policy=self.policy, tracer=self.dac.tracer
+        )
+        scheduler = playback.scheduler
+        now = time.perf_counter_ns()
+        tolerance_ns = scheduler.late_tolerance_ns
+        if start_ns is None or now - start_ns > tolerance_ns:
+            # Only an underrun if the waveform itself came late, not if the
+            # previous segment overran its schedule or the setup took long
+            if (
+                start_ns is not None
+                and fetched_ns - max(ended_ns, start_ns) > tolerance_ns
+            ):
+                self.stats.n_underruns += 1
+            start_ns = now
+        try:
+            timing = playback.run(start_ns=start_ns, stop_event=self._stop)
+        finally:
+            self.stats.n_bus_dropped += channel.emitter.n_dropped
+        if not self._stop.is_set():
+            self.stats.n_segments += 1
+        self.stats.n_samples += channel.emitter.n_sent
+        self.stats.n_late += timing.n_late
+        self.stats.n_dropped += timing.n_dropped
+        return start_ns + int(playback.n_events * scheduler.period_ns)
@@ -0,0 +1,258 @@
+"""
+Pool of shared I2C bus handles.
+
+Opening an adapter per DAC costs a file descriptor per instance and
+scatters the writes to one bus over several handles. A :class:`BusPool`
+keeps a single backend per bus number and hands out :class:`SharedBus`
+leases on it, counted; the backend is closed when the last lease is
+closed. :class:`AD5693` takes its bus from :data:`DEFAULT_POOL` when no
+backend is given, and releases it on :meth:`AD5693.close`.
+
+Every lease of a bus takes the same lock around each transaction, and
+around the reopening of the backend, so threads driving DACs on the same
+bus can share it safely. Within
+:meth:`SharedBus.coalesce`, the block writes of every DAC on the bus are
+gathered and sent as a single combined transfer.
+"""
+
+import contextlib
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Sequence, Union
+
+from speaker_test_bench.features.bus import (
+    Buffer,
+    BusBackend,
+    Read,
+    SMBusBackend,
+    Transaction,
+)
+from speaker_test_bench.features.instrumentation import BusProxy
+
+
+@dataclass
+class _Entry:
+    backend: BusBackend
+    lock: threading.RLock = field(default_factory=threading.RLock)
+    n_leases: int = 0
+    pending: Union[List[Transaction], None] = None
+
+
+class SharedBus(BusProxy):
+    """
+    Lease on a backend shared through a :class:`BusPool`.
+
+    Transactions hold the lock of the bus, shared by every lease on it.
+    Closing the lease releases it; the backend stays open for the other
+    leases.
+
+    :param pool: Pool the lease comes from.
+    :param bus_number: Number of the I2C adapter.
+    :param entry: Pool entry of the bus.
+    """
+
+    def __init__(
+        self, pool: "BusPool", bus_number: int, entry: _Entry
+    ) -> None:
+        super().__init__(entry.backend)
+        self.pool = pool
+        self.pool_key = bus_number
+        self.lock = entry.lock
+        """Lock held around every transaction on the bus, reentrant."""
+        self.closed = False
+        self._entry = entry
+
+    def write_i2c_block_data(
+        self, address: int, register: int, data: Buffer
+    ) -> None:
+        with self.lock:
+            pending = self._entry.pending
+            if pending is not None:
+                pending.append((address, register, bytes(data)))
+                return
+            self.bus.write_i2c_block_data(address, register, data)
+
+    def write_frames(
+        self,
+        address: int,
+        command: int,
+        data: Buffer,
+        repeated: bool = False,
+    ) -> None:
+        with self.lock:
+            self._flush()
+            self.bus.write_frames(address, command, data, repeated)
+
+    def write_transactions(self, transactions: Sequence[Transaction]) -> None:
+        with self.lock:
+            pending = self._entry.pending
+            if pending is not None:
+                pending.extend(transactions)
+                return
+            self.bus.write_transactions(transactions)
+
+    def read_i2c_block_data(
+        self, address: int, register: int, length: int
+    ) -> List[int]:
+        with self.lock:
+            self._flush()
+            return self.bus.read_i2c_block_data(address, register, length)
+
+    def read_transactions(self, reads: Sequence[Read]) -> List[bytes]:
+        with self.lock:
+            self._flush()
+            return self.bus.read_transactions(reads)
+
+    @contextlib.contextmanager
+    def coalesce(self) -> Iterator["SharedBus"]:
+        """
+        Gather the block writes to this bus into one combined transfer.
+
+        The bus is locked for the whole block, and the writes of every
+        lease on it are sent together on exit, in order. Frame batches and
+        reads flush the writes gathered so far first. Blocks nest, the
+        outermost one sends.
+
+        Example:
+            with left.coalesce():
+                left.set_voltage(1.0)
+                right.set_voltage(4.0)
+
+        :return: The lease itself.
+        """
+        with self.lock:
+            entry = self._entry
+            if entry.pending is not None:
+                yield self
+                return
+            entry.pending = []
+            try:
+                yield self
+            finally:
+                self._flush()
+                entry.pending = None
+
+    def reopen(self) -> None:
+        """
+        Reopen the backend of the bus for every lease, see
+        :meth:`BusPool.reopen`.
+        """
+        self.pool.reopen(self.pool_key)
+
+    def close(self) -> None:
+        """
+        Release the lease, closing the backend if it was the last one.
+        """
+        if not self.closed:
+            self.closed = True
+            self.pool.release(self)
+
+    def _flush(self) -> None:
+        pending = self._entry.pending
+        if pending:
+            self._entry.pending = []
+            self.bus.write_transactions(pending)
+
+
+class BusPool:
+    """
+    Registry of the open I2C buses, one backend per bus number.
+
+    Example:
+        pool = BusPool()
+        with pool.acquire(1) as bus:
+            dac = AD5693(0x4C, bus=bus)
+
+    :param factory: Opens the backend of a bus number.
+    """
+
+    def __init__(
+        self, factory: Callable[[int], BusBackend] = SMBusBackend
+    ) -> None:
+        self.factory = factory
+        self._entries: Dict[int, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, bus_number: int) -> SharedBus:
+        """
+        Lease the backend of a bus, opening it on first use.
+
+        :param bus_number: Number of the I2C adapter.
+        :return: A new lease, to be closed once done.
+        """
+        with self._lock:
+            entry = self._entries.get(bus_number)
+            if entry is None:
+                entry = _Entry(self.factory(bus_number))
+                self._entries[bus_number] = entry
+            entry.n_leases += 1
+            return SharedBus(self, bus_number, entry)
+
+    def release(self, lease: SharedBus) -> None:
+        """
+        Give a lease back, closing the backend when no lease is left.
+
+        Called by :meth:`SharedBus.close`.
+
+        :param lease: Lease from :meth:`acquire`.
+        """
+        with self._lock:
+            entry = self._entries.get(lease.pool_key)
+            if entry is not lease._entry:
+                # Already closed by close_all
+                return
+            entry.n_leases -= 1
+            if entry.n_leases:
+                return
+            del self._entries[lease.pool_key]
+        with entry.lock:
+            entry.backend.close()
+
+    def reopen(self, bus_number: int) -> None:
+        """
+        Reopen the backend of a bus, e.g. to recover from a bus fault.
+
+        The lock of the bus is held meanwhile, so that no lease is in the
+        middle of a transaction and every lease uses the new handle from its
+        next one. Nothing is done when the bus is not open or its backend
+        cannot be reopened.
+
+        :param bus_number: Number of the I2C adapter.
+        """
+        with self._lock:
+            entry = self._entries.get(bus_number)
+        if entry is None:
+            return
+        with entry.lock:
+            reopen = getattr(entry.backend, "reopen", None)
+            if reopen is not None:
+                reopen()
+
+    def n_leases(self, bus_number: int) -> int:
+        """
+        Number of open leases on a bus.
+
+        :param bus_number: Number of the I2C adapter.
+        :return: 0 when the bus is not open.
+        """
+        with self._lock:
+            entry = self._entries.get(bus_number)
+            return 0 if entry is None else entry.n_leases
+
+    def close_all(self) -> None:
+        """
+        Close every backend, whatever leases are still open.
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            with entry.lock:
+                entry.backend.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+DEFAULT_POOL = BusPool()
+"""Pool of the DACs created without a bus backend."""
@@ -0,0 +1,501 @@
+"""
+Process-isolated waveform player for the AD5693 DAC.
+
+The DAC writer runs in a separate process so that heavy analysis in the main
+process, and the GIL contention it brings, cannot delay the output. Encoded
+frames are copied once into slots of a ``multiprocessing.shared_memory``
+block and the writer plays them in place; only small control messages go
+through a pipe. The high-level API is the one of
+:class:`~speaker_test_bench.features.player.WaveformPlayer`.
+"""
+
+import functools
+import multiprocessing
+import pickle
+import queue as queue_module
+import time
+from collections import deque
+from contextlib import ExitStack
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Callable, Union
+
+import numpy as np
+
+from speaker_test_bench.features.ad5693 import (
+    AD5693,
+    CompiledWaveform,
+    Playback,
+    PlaybackChannel,
+)
+from speaker_test_bench.features.bus import (
+    BusBackend,
+    BusError,
+    SMBusBackend,
+)
+from speaker_test_bench.features.instrumentation import Instrumentation
+from speaker_test_bench.features.player import PlayerStats
+from speaker_test_bench.features.transport import ReliableBus, RetryPolicy
+from speaker_test_bench.library.realtime import (
+    RealtimeConfig,
+    RealtimeReport,
+    RealtimeSession,
+)
+from speaker_test_bench.library.scheduler import LatePolicy
+
+DEFAULT_SLOT_BYTES = 1 << 20
+
+
+@dataclass
+class ProcessPlayerStats(PlayerStats):
+    """
+    Counters of a process player.
+
+    Handoff latency is the delay between a segment being queued, or the
+    writer becoming ready for it if that happened later, and the writer
+    process receiving its control message.
+
+    :param n_handoffs: Number of segments received by the writer.
+    :param mean_handoff_ns: Mean cross-process handoff latency.
+    :param max_handoff_ns: Largest cross-process handoff latency.
+    """
+
+    n_handoffs: int = 0
+    mean_handoff_ns: float = 0.0
+    max_handoff_ns: int = 0
+
+    def record_handoff(self, handoff_ns: int) -> None:
+        """
+        Add one handoff latency to the statistics.
+
+        :param handoff_ns: Latency in nanoseconds.
+        """
+        self.n_handoffs += 1
+        self.mean_handoff_ns += (
+            handoff_ns - self.mean_handoff_ns
+        ) / self.n_handoffs
+        self.max_handoff_ns = max(self.max_handoff_ns, handoff_ns)
+
+
+def _writer(
+    bus_factory: Callable[[], BusBackend],
+    address: int,
+    register: int,
+    shm: shared_memory.SharedMemory,
+    slot_bytes: int,
+    commands,
+    events,
+    stop_event,
+    policy: str,
+    batch_size: int,
+    repeated: bool,
+    realtime: Union[RealtimeConfig, None] = None,
+    retry: Union[RetryPolicy, None] = None,
+    instrumented: bool = False,
+) -> None:
+    """
+    Body of the writer process.
+
+    Commands received from the pipe:
+
+    - ``("play", slot, n_bytes, repeat, sample_rate, sent_ns)``
+    - ``("drain",)`` marks the end of the stream.
+
+    Events put on the queue for the parent:
+
+    - ``("done", slot, completed, n_samples, n_late, n_dropped, underrun,
+      handoff_ns, n_bus_dropped, timing, lateness)``, the lateness histogram
+      of the segment when ``instrumented``, None otherwise.
+    - ``("underrun",)`` when the pipe ran dry in the middle of a stream.
+    - ``("realtime", report)`` with the real-time settings applied.
+    - ``("error", error)`` with the exception raised, or a generic one with
+      its message when it cannot be pickled.
+    """
+    bus = None
+    next_start = None
+    draining = False
+    resources = ExitStack()
+    try:
+        bus = bus_factory()
+        transport = None if retry is None else ReliableBus(bus, retry)
+        if realtime is not None:
+            report = resources.enter_context(RealtimeSession(realtime))
+            events.put(("realtime", report.as_dict()))
+        ready_ns = time.perf_counter_ns()
+        while not stop_event.is_set():
+            if not commands.poll(0.01):
+                if next_start is not None and not draining:
+                    events.put(("underrun",))
+                next_start = None
+                continue
+            command = commands.recv()
+            received_ns = time.perf_counter_ns()
+            if command[0] == "drain":
+                draining = True
+                continue
+            _, slot, n_bytes, repeat, sample_rate, sent_ns = command
+            draining = False
+            offset = slot * slot_bytes
+            frames = shm.buf[offset : offset + n_bytes]
+            channel = PlaybackChannel(
+                bus if transport is None else transport,
+                address,
+                register,
+                CompiledWaveform(
+                    codes=np.frombuffer(frames, dtype=">u2"),
+                    frames=frames,
+                    sample_rate=sample_rate,
+                    repeat=repeat,
+                ),
+                batch_size=batch_size,
+                repeated=repeated,
+                metrics=Instrumentation() if instrumented else None,
+                transport=transport,
+            )
+            playback = Playback([channel], policy=policy)
+            scheduler = playback.scheduler
+            underrun = False
+            now = time.perf_counter_ns()
+            tolerance_ns = scheduler.late_tolerance_ns
+            if next_start is None or now - next_start > tolerance_ns:
+                # Only an underrun if the segment itself came late, not if
+                # the previous one overran its schedule, as in WaveformPlayer
+                underrun = (
+                    next_start is not None
+                    and received_ns - max(ready_ns, next_start) > tolerance_ns
+                )
+                next_start = now
+            try:
+                timing = playback.run(
+                    start_ns=next_start, stop_event=stop_event
+                )
+            finally:
+                # Release every view on the shared block before it is reused
+                n_sent = channel.emitter.n_sent
+                n_bus_dropped = channel.emitter.n_dropped
+                metrics = channel.metrics
+                del channel, playback
+                frames.release()
+            next_start += int(timing.n_scheduled * scheduler.period_ns)
+            events.put(
+                (
+                    "done",
+                    slot,
+                    not stop_event.is_set(),
+                    n_sent,
+                    timing.n_late,
+                    timing.n_dropped,
+                    underrun,
+                    received_ns - max(sent_ns, ready_ns),
+                    n_bus_dropped,
+                    timing,
+                    None if metrics is None else metrics.lateness,
+                )
+            )
+            ready_ns = time.perf_counter_ns()
+    except Exception as error:  # pylint: disable=broad-except
+        try:
+            pickle.dumps(error)
+        except Exception:  # pylint: disable=broad-except
+            error = Exception(f"{type(error).__name__}: {error}")
+        events.put(("error", error))
+    finally:
+        resources.close()
+        if bus is not None:
+            bus.close()
+        shm.close()
+
+
+class ProcessWaveformPlayer:
+    """
+    Play compiled waveforms on an :class:`AD5693` from a separate process.
+
+    The writer process opens its own bus through ``bus_factory``; by default
+    it opens the same I2C adapter as the DAC. The DAC object itself should
+    not be used while the player is running.
+
+    The writer retries with the policy of the DAC transport, and the
+    lateness and schedule counts of each segment are recorded through the
+    instrumentation of the DAC. Readback checks and spans need the DAC
+    itself and are not available in the writer process.
+
+    Example:
+        with dac.player(process=True) as player:
+            player.queue(dac.compile_sine_wave(440, 5))
+            ...  # heavy analysis does not disturb the output
+            player.wait()
+
+    :param dac: DAC to drive.
+    :param capacity: Number of shared memory slots, i.e. segments that can be
+     queued ahead.
+    :param policy: What to do with samples that miss their deadline.
+    :param batch_size: Number of samples per bus transaction.
+    :param repeated: Send batches as repeated data pairs.
+    :param slot_bytes: Size of each shared memory slot. Longer waveforms are
+     split over several slots.
+    :param bus_factory: Picklable callable creating the bus backend in the
+     writer process.
+    :param realtime: Real-time settings of the writer process. The settings
+     applied are in :attr:`realtime_report` once the writer runs.
+    """
+
+    def __init__(
+        self,
+        dac: AD5693,
+        capacity: int = 2,
+        policy: Union[LatePolicy, str] = LatePolicy.CATCH_UP,
+        batch_size: int = 1,
+        repeated: bool = False,
+        slot_bytes: int = DEFAULT_SLOT_BYTES,
+        bus_factory: Union[Callable[[], BusBackend], None] = None,
+        realtime: Union[RealtimeConfig, None] = None,
+    ) -> None:
+        if bus_factory is None:
+            # Looks through instrumentation and profiling wrappers
+            bus_number = getattr(dac.bus, "bus_number", None)
+            if bus_number is None:
+                raise ValueError(
+                    "A bus_factory is required when the DAC does not use an"
+                    " SMBusBackend"
+                )
+            bus_factory = functools.partial(SMBusBackend, bus_number)
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.dac = dac
+        self.capacity = capacity
+        self.policy = LatePolicy(policy)
+        self.batch_size = max(int(batch_size), 1)
+        self.repeated = repeated
+        self.slot_bytes = slot_bytes & ~1
+        self.bus_factory = bus_factory
+        self.realtime = realtime
+        self.realtime_report: Union[RealtimeReport, None] = None
+        self.stats = ProcessPlayerStats()
+        self._free = deque()
+        self._pending = 0
+        self._error: Union[BaseException, None] = None
+        self._process = None
+        self._shm = None
+        self._commands = None
+        self._events = None
+        self._stop = None
+
+    @property
+    def running(self) -> bool:
+        """True while the writer process is alive."""
+        return self._process is not None and self._process.is_alive()
+
+    def start(self) -> "ProcessWaveformPlayer":
+        """
+        Start the writer process.
+
+        :return: The player itself.
+        """
+        if self.running:
+            return self
+        self._error = None
+        self._pending = 0
+        self._free = deque(range(self.capacity))
+        self.dac.shadow.invalidate_data()
+        transport = self.dac.transport
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=self.capacity * self.slot_bytes
+        )
+        receiver, self._commands = multiprocessing.Pipe(duplex=False)
+        self._events = multiprocessing.Queue()
+        self._stop = multiprocessing.Event()
+        self._process = multiprocessing.Process(
+            target=_writer,
+            name="ad5693-writer",
+            args=(
+                self.bus_factory,
+                self.dac.device_address,
+                self.dac.DATA_REGISTER_ADDR,
+                self._shm,
+                self.slot_bytes,
+                receiver,
+                self._events,
+                self._stop,
+                self.policy.value,
+                self.batch_size,
+                self.repeated,
+                self.realtime,
+                None if transport is None else transport.policy,
+                self.dac.metrics is not None,
+            ),
+            daemon=True,
+        )
+        self._process.start()
+        receiver.close()
+        return self
+
+    def queue(
+        self, waveform: CompiledWaveform, timeout: Union[float, None] = None
+    ) -> bool:
+        """
+        Queue a waveform after the ones already queued.
+
+        Blocks while every shared memory slot is in use.
+
+        :param waveform: Waveform to play.
+        :param timeout: Maximum time to wait for a free slot, in seconds.
+        :return: False if no slot freed up in time.
+        """
+        self._raise_error()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        frames = memoryview(waveform.frames).cast("B")
+        if len(frames) <= self.slot_bytes:
+            chunks = [(frames, waveform.repeat)]
+        else:
+            chunks = [
+                (frames[start : start + self.slot_bytes], 1)
+                for _ in range(waveform.repeat)
+                for start in range(0, len(frames), self.slot_bytes)
+            ]
+        for chunk, repeat in chunks:
+            slot = self._acquire_slot(deadline)
+            if slot is None:
+                return False
+            offset = slot * self.slot_bytes
+            self._shm.buf[offset : offset + len(chunk)] = chunk
+            self._pending += 1
+            self._commands.send(
+                (
+                    "play",
+                    slot,
+                    len(chunk),
+                    repeat,
+                    waveform.sample_rate,
+                    time.perf_counter_ns(),
+                )
+            )
+        return True
+
+    def wait(self, timeout: Union[float, None] = None) -> bool:
+        """
+        Wait until every queued waveform has been played.
+
+        This also marks the end of the stream: the writer running dry after
+        the last waveform is not counted as an underrun.
+
+        :param timeout: Maximum time to wait, in seconds.
+        :return: False if the waveforms were still playing at the timeout.
+        """
+        if self.running:
+            self._commands.send(("drain",))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._pending and self.running:
+            if not self._poll_events(deadline):
+                break
+        self._poll_events(time.monotonic())
+        self._raise_error()
+        return self._pending == 0
+
+    def stop(self, timeout: Union[float, None] = None) -> None:
+        """
+        Stop the output, dropping the waveforms still queued, and release
+        the shared memory.
+
+        :param timeout: Maximum time to wait for the process, in seconds.
+        """
+        if self._process is None:
+            return
+        self._stop.set()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        while self._poll_events(time.monotonic()):
+            pass
+        self._commands.close()
+        self._events.close()
+        self._shm.close()
+        self._shm.unlink()
+        self._process = None
+        self._pending = 0
+        self._raise_error()
+
+    def __enter__(self) -> "ProcessWaveformPlayer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            if isinstance(error, BusError):
+                # Typed bus errors reach the caller as AD5693.play raises them
+                raise error
+            raise Exception(f"Error during playback: {error}") from error
+
+    def _acquire_slot(self, deadline: Union[float, None]) -> Union[int, None]:
+        while not self._free:
+            if not self.running:
+                self._poll_events(time.monotonic())
+                self._raise_error()
+                raise Exception("Player is not running")
+            if not self._poll_events(deadline):
+                return None
+        return self._free.popleft()
+
+    def _poll_events(self, deadline: Union[float, None]) -> bool:
+        """
+        Process the events sent by the writer.
+
+        :param deadline: ``time.monotonic`` limit for the first event.
+        :return: False if no event arrived before the deadline.
+        """
+        try:
+            if deadline is None:
+                event = self._events.get(timeout=0.1)
+            else:
+                event = self._events.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                )
+        except queue_module.Empty:
+            return deadline is None
+        while event is not None:
+            self._handle(event)
+            try:
+                event = self._events.get_nowait()
+            except queue_module.Empty:
+                event = None
+        return True
+
+    def _handle(self, event: tuple) -> None:
+        kind = event[0]
+        if kind == "done":
+            (
+                _,
+                slot,
+                completed,
+                n_samples,
+                n_late,
+                n_dropped,
+                underrun,
+                handoff_ns,
+                n_bus_dropped,
+                timing,
+                lateness,
+            ) = event
+            self._free.append(slot)
+            self._pending -= 1
+            self.stats.n_segments += int(completed)
+            self.stats.n_samples += n_samples
+            self.stats.n_late += n_late
+            self.stats.n_dropped += n_dropped
+            self.stats.n_underruns += int(underrun)
+            self.stats.record_handoff(handoff_ns)
+            self.stats.n_bus_dropped += n_bus_dropped
+            metrics = self.dac.metrics
+            if metrics is not None:
+                if lateness is not None:
+                    metrics.lateness.merge(lateness)
+                metrics.record_schedule(timing)
+        elif kind == "underrun":
+            self.stats.n_underruns += 1
+        elif kind == "realtime":
+            self.realtime_report = RealtimeReport(**event[1])
+        elif kind == "error":
+            self._error = event[1]
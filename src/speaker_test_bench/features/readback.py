@@ -0,0 +1,284 @@
+"""
+Sampled readback verification of the AD5693 registers.
+
+Reading the registers back after every write would halve the throughput
+of the bus. A :class:`ReadbackVerifier` instead reads the input, DAC and
+control registers every N samples and at the end of each playback
+segment, in one combined transfer, and compares them with what the host
+wrote last. Mismatches are counted in :class:`ReadbackStats` and, when the
+DAC is instrumented, recorded through
+:meth:`~speaker_test_bench.features.instrumentation.Instrumentation.record_readback`.
+
+Verification never interrupts the output: a read that fails is counted
+and the samples keep going out, and a backend that cannot read disables
+the checks. Each check costs one bus transaction,
+taken from the slot of the sample it follows during playback.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Sequence, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from speaker_test_bench.features.ad5693 import (
+        AD5693,
+        CompiledWaveform,
+        FrameEmitter,
+    )
+
+REGISTERS = ("input", "dac", "control")
+"""Registers of the AD5693 that can be read back."""
+
+
+@dataclass(frozen=True)
+class ReadbackPolicy:
+    """
+    When and what to read back.
+
+    :param every: Samples written between two checks, 0 to only check at
+     segment boundaries.
+    :param at_boundaries: Check once at the end of every playback and of
+     every waveform played by a background player.
+    :param registers: Registers compared, among :data:`REGISTERS`.
+    """
+
+    every: int = 1000
+    at_boundaries: bool = True
+    registers: Sequence[str] = REGISTERS
+
+    def __post_init__(self) -> None:
+        unknown = set(self.registers) - set(REGISTERS)
+        if unknown:
+            raise ValueError(f"Unknown registers {sorted(unknown)}")
+        if self.every < 0:
+            raise ValueError("every must be positive or 0")
+
+
+@dataclass
+class ReadbackStats:
+    """
+    Outcome of the checks of a verifier.
+
+    :param n_reads: Combined reads issued.
+    :param n_checked: Registers compared.
+    :param n_mismatches: Registers that did not hold the value written.
+    :param n_read_errors: Reads that failed, their registers unchecked.
+    :param mismatches: Mismatches by register.
+    :param last_mismatch: Register, expected and actual value of the latest
+     mismatch.
+    """
+
+    n_reads: int = 0
+    n_checked: int = 0
+    n_mismatches: int = 0
+    n_read_errors: int = 0
+    mismatches: Counter = field(default_factory=Counter)
+    last_mismatch: Union[dict, None] = None
+
+    def as_dict(self) -> dict:
+        """Serializable copy of the counters."""
+        return {
+            "n_reads": self.n_reads,
+            "n_checked": self.n_checked,
+            "n_mismatches": self.n_mismatches,
+            "n_read_errors": self.n_read_errors,
+            "mismatches": dict(self.mismatches),
+            "last_mismatch": self.last_mismatch,
+        }
+
+
+class ReadbackVerifier:
+    """
+    Read back the registers of a DAC from time to time.
+
+    Example:
+        dac = AD5693(0x4C, readback=ReadbackPolicy(every=500))
+        dac.generate_sine_wave(440, 2)
+        print(dac.readback.stats.as_dict())
+
+    :param dac: DAC to verify.
+    :param policy: When and what to read back.
+    """
+
+    def __init__(
+        self, dac: "AD5693", policy: Union[ReadbackPolicy, None] = None
+    ) -> None:
+        self.dac = dac
+        self.policy = ReadbackPolicy() if policy is None else policy
+        self.stats = ReadbackStats()
+        commands = {
+            "input": dac.WRITE_INPUT_REGISTER_ADDR,
+            "dac": dac.DATA_REGISTER_ADDR,
+            "control": dac.CONTROL_REGISTER_ADDR,
+        }
+        self._reads = [
+            (dac.device_address, commands[name], 2)
+            for name in self.policy.registers
+        ]
+        self._n_pending = 0
+        self.supported = True
+        """False once the bus turned out unable to read, which disables the
+        checks."""
+
+    def read(self) -> Dict[str, int]:
+        """
+        Read the registers of the policy in one combined transfer.
+
+        :return: Word of each register, by name.
+        """
+        blocks = self.dac.bus.read_transactions(self._reads)
+        self.stats.n_reads += 1
+        return {
+            name: int.from_bytes(block, "big")
+            for name, block in zip(self.policy.registers, blocks)
+        }
+
+    def verify(self, expected: Dict[str, Union[int, None]]) -> int:
+        """
+        Read the registers back and compare them with the values written.
+
+        :param expected: Value of each register, None when unknown.
+        :return: Number of mismatches.
+        """
+        if not self.supported:
+            return 0
+        try:
+            actual = self.read()
+        except NotImplementedError:
+            self.supported = False
+            return 0
+        except OSError as error:
+            self.stats.n_read_errors += 1
+            if self.dac.metrics is not None:
+                self.dac.metrics.record_error(error)
+            return 0
+        stats = self.stats
+        metrics = self.dac.metrics
+        n_mismatches = 0
+        for name, value in actual.items():
+            if expected.get(name) is None:
+                continue
+            stats.n_checked += 1
+            if metrics is not None:
+                metrics.record_readback(name, expected[name], value)
+            if value != expected[name]:
+                n_mismatches += 1
+                stats.mismatches[name] += 1
+                stats.last_mismatch = {
+                    "register": name,
+                    "expected": expected[name],
+                    "actual": value,
+                }
+        stats.n_mismatches += n_mismatches
+        return n_mismatches
+
+    def verify_shadow(self) -> int:
+        """
+        Compare the registers with the shadow copy of the DAC.
+
+        :return: Number of mismatches.
+        """
+        shadow = self.dac.shadow
+        return self.verify(
+            {
+                "input": shadow.input,
+                "dac": shadow.dac,
+                "control": shadow.control,
+            }
+        )
+
+    def tick(self, n_samples: int = 1) -> None:
+        """
+        Account for samples written outside playback, checking the shadow
+        copy every :attr:`ReadbackPolicy.every` samples.
+
+        :param n_samples: Samples just written.
+        """
+        every = self.policy.every
+        if not every or not self.supported:
+            return
+        self._n_pending += n_samples
+        if self._n_pending >= every:
+            self._n_pending = 0
+            self.verify_shadow()
+
+    def emitter(
+        self, emitter: "FrameEmitter", waveform: "CompiledWaveform"
+    ) -> "VerifiedEmitter":
+        """
+        Wrap the emitter of a playback to check the registers on the way.
+
+        :param emitter: Emitter of the playback.
+        :param waveform: Waveform it emits.
+        :return: Callable to schedule instead of ``emitter``.
+        """
+        return VerifiedEmitter(self, emitter, waveform)
+
+
+class VerifiedEmitter:
+    """
+    Schedule callback writing through a frame emitter and reading the
+    registers back every :attr:`ReadbackPolicy.every` samples.
+
+    :param verifier: Verifier doing the reads.
+    :param emitter: Emitter writing the frames.
+    :param waveform: Waveform it emits.
+    """
+
+    def __init__(
+        self,
+        verifier: ReadbackVerifier,
+        emitter: "FrameEmitter",
+        waveform: "CompiledWaveform",
+    ) -> None:
+        self.verifier = verifier
+        self.emitter = emitter
+        self._codes: np.ndarray = waveform.codes
+        self._every = verifier.policy.every
+        self._next = self._every
+        self._index: Union[int, None] = None
+
+    def __call__(self, index: int) -> None:
+        n_sent = self.emitter.n_sent
+        self.emitter(index)
+        if self.emitter.n_sent == n_sent:
+            # Dropped by the transport, the registers hold the last sample
+            return
+        self._index = index
+        if self._every and self.emitter.n_sent >= self._next:
+            self._next = self.emitter.n_sent + self._every
+            self.check()
+
+    @property
+    def last_code(self) -> Union[int, None]:
+        """Code of the last sample written, None before the first one."""
+        if self._index is None:
+            return None
+        emitter = self.emitter
+        last = min((self._index + 1) * emitter.batch_size, emitter.n_total)
+        return int(self._codes[(last - 1) % len(self._codes)])
+
+    def check(self) -> int:
+        """
+        Compare the registers with the last sample written.
+
+        :return: Number of mismatches.
+        """
+        code = self.last_code
+        return self.verifier.verify(
+            {
+                "input": code,
+                "dac": code,
+                "control": self.verifier.dac.shadow.control,
+            }
+        )
+
+    def finish(self) -> None:
+        """
+        Check the registers at the end of the segment, when the policy asks
+        for it and a sample was written.
+        """
+        if self.verifier.policy.at_boundaries and self._index is not None:
+            self.check()
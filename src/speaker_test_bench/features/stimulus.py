@@ -0,0 +1,225 @@
+"""
+Cached library of test stimuli for the AD5693 DAC.
+
+Stimuli are synthesized with :mod:`speaker_test_bench.library.signals` and
+encoded once into DAC frames. Encoded waveforms are kept in a
+least-recently-used cache keyed on the stimulus type, its parameters, the
+sample rate, the reference voltage and the calibration of the DAC, so
+protocol steps that repeat a stimulus reuse its frames instead of
+synthesizing it again.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Hashable, Tuple, Union
+
+import numpy as np
+
+from speaker_test_bench.features.ad5693 import AD5693, CompiledWaveform
+from speaker_test_bench.features.calibration import Calibration
+from speaker_test_bench.features.disk_cache import WaveformDiskCache
+from speaker_test_bench.library.signals import (
+    multitone,
+    pink_noise,
+    tone_burst,
+    white_noise,
+)
+
+DEFAULT_MAX_BYTES = 64 << 20
+
+GENERATORS: Dict[str, Callable[..., np.ndarray]] = {
+    "multitone": multitone,
+    "tone_burst": tone_burst,
+    "white_noise": white_noise,
+    "pink_noise": pink_noise,
+}
+"""Stimulus types, each one a generator called with its parameters and the
+``sample_rate`` keyword, returning samples in [-1, 1]."""
+
+
+def freeze(value) -> Hashable:
+    """
+    Turn a parameter value into a hashable cache key component.
+
+    :param value: Parameter value, lists, tuples, arrays and dicts included.
+    :return: Hashable equivalent.
+    """
+    if isinstance(value, np.ndarray):
+        return tuple(value.tolist())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(
+            sorted((key, freeze(item)) for key, item in value.items())
+        )
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters of a stimulus cache.
+
+    :param n_hits: Requests served from the cache.
+    :param n_misses: Requests that synthesized the stimulus.
+    :param n_evictions: Waveforms evicted to stay under the memory cap.
+    :param n_bytes: Memory held by the cached waveforms.
+    :param n_entries: Number of cached waveforms.
+    """
+
+    n_hits: int = 0
+    n_misses: int = 0
+    n_evictions: int = 0
+    n_bytes: int = 0
+    n_entries: int = 0
+
+    def as_dict(self) -> dict:
+        """Serializable copy of the counters."""
+        return asdict(self)
+
+
+class StimulusCache:
+    """
+    Synthesize and encode stimuli, keeping the most recently used ones.
+
+    Waveforms larger than the memory cap are returned without being cached.
+    The cache is safe to share between threads; a stimulus requested by two
+    threads at once may be synthesized twice, only one copy is kept.
+
+    With a ``disk`` cache, memory misses are looked up on disk before
+    synthesizing, and synthesized stimuli are stored there for the next
+    runs; the memory cache then holds the memory-mapped waveforms.
+
+    Example:
+        cache = StimulusCache(max_bytes=32 << 20)
+        noise = cache.get(dac, "pink_noise", sample_rate=8000, duration=5)
+        dac.play(noise)
+
+    :param max_bytes: Memory cap of the cached waveforms.
+    :param disk: Persistent cache shared between runs and processes.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        disk: Union[WaveformDiskCache, None] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, CompiledWaveform]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        kind: str,
+        sample_rate: float,
+        v_ref: float,
+        calibration: Union[Calibration, None] = None,
+        **params,
+    ) -> Tuple[Hashable, ...]:
+        """
+        Cache key of a stimulus.
+
+        :param kind: Stimulus type, one of :data:`GENERATORS`.
+        :param sample_rate: Output rate in samples per second.
+        :param v_ref: Reference voltage of the DAC.
+        :param calibration: Calibration profile of the DAC.
+        :param params: Parameters of the generator.
+        :return: The key.
+        """
+        return (
+            kind,
+            freeze(params),
+            float(sample_rate),
+            float(v_ref),
+            calibration,
+        )
+
+    @staticmethod
+    def size(waveform: CompiledWaveform) -> int:
+        """
+        Memory held by a waveform.
+
+        :param waveform: Compiled waveform.
+        :return: Size in bytes of its codes and frames, which may share
+         the same buffer.
+        """
+        if isinstance(waveform.frames, memoryview):
+            return waveform.frames.nbytes
+        return waveform.codes.nbytes + len(waveform.frames)
+
+    def get(
+        self, dac: AD5693, kind: str, sample_rate: float, **params
+    ) -> CompiledWaveform:
+        """
+        Compiled stimulus for a DAC, from the cache when possible.
+
+        :param dac: DAC the stimulus is encoded for.
+        :param kind: Stimulus type, one of :data:`GENERATORS`.
+        :param sample_rate: Output rate in samples per second.
+        :param params: Parameters of the generator.
+        :return: The compiled waveform.
+        """
+        if kind not in GENERATORS:
+            raise ValueError(f"Unknown stimulus type {kind}")
+        key = self.key(
+            kind, sample_rate, dac.v_ref, calibration=dac.calibration, **params
+        )
+        with self._lock:
+            waveform = self._entries.get(key)
+            if waveform is not None:
+                self._entries.move_to_end(key)
+                self.stats.n_hits += 1
+                return waveform
+            self.stats.n_misses += 1
+        waveform = None if self.disk is None else self.disk.get(key)
+        if waveform is None:
+            signal = GENERATORS[kind](sample_rate=sample_rate, **params)
+            waveform = dac.compile_signal(signal, sample_rate)
+            if self.disk is not None:
+                waveform = self.disk.put(key, waveform)
+        self.put(key, waveform)
+        return waveform
+
+    def put(self, key: Hashable, waveform: CompiledWaveform) -> None:
+        """
+        Store a waveform, evicting the least recently used ones as needed.
+
+        :param key: Cache key, see :meth:`key`.
+        :param waveform: Compiled waveform.
+        """
+        size = self.size(waveform)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.stats.n_bytes -= self.size(previous)
+            while self._entries and self.stats.n_bytes + size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.stats.n_bytes -= self.size(evicted)
+                self.stats.n_evictions += 1
+            self._entries[key] = waveform
+            self.stats.n_bytes += size
+            self.stats.n_entries = len(self._entries)
+
+    def clear(self) -> None:
+        """
+        Drop every cached waveform.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.stats.n_bytes = 0
+            self.stats.n_entries = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
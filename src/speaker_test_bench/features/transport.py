@@ -0,0 +1,248 @@
+"""
+Fault-tolerant I2C transport for the AD5693 DAC.
+
+A :class:`ReliableBus` wraps a bus backend and retries the transactions that
+fail with a transient :class:`~speaker_test_bench.features.bus.BusError`,
+backing off between attempts. After several failures in a row it runs
+recovery actions: reopening the adapter and invalidating the cached state
+of the DAC.
+
+During playback the transport knows the length of a sample slot. A retry
+that would not complete within the slot is not attempted; the sample is
+dropped instead, so one bad transaction does not delay every sample after
+it and long runs finish on schedule. Dropped samples are not counted as
+written. Only a long run of dropped samples,
+which means the bus is gone, ends the playback with an error.
+"""
+
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Sequence, Union
+
+from speaker_test_bench.features.bus import (
+    Buffer,
+    BusBackend,
+    BusError,
+    Transaction,
+    classify,
+)
+from speaker_test_bench.features.instrumentation import (
+    BusProxy,
+    Instrumentation,
+)
+from speaker_test_bench.library.scheduler import wait_until
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Bounds of the retries of a transaction.
+
+    :param max_retries: Attempts after the first one.
+    :param backoff_ns: Wait before the first retry.
+    :param backoff_factor: Growth of the wait at each retry.
+    :param max_backoff_ns: Longest wait between two attempts.
+    :param recover_after: Failed attempts in a row before the recovery
+     actions run, 0 to never recover.
+    :param max_consecutive_drops: Samples dropped in a row before a playback
+     gives up.
+    """
+
+    max_retries: int = 3
+    backoff_ns: int = 20_000
+    backoff_factor: float = 2.0
+    max_backoff_ns: int = 1_000_000
+    recover_after: int = 4
+    max_consecutive_drops: int = 1000
+
+    def backoff(self, retry: int) -> int:
+        """
+        Wait before a retry.
+
+        :param retry: Index of the retry, from 0.
+        :return: Wait in nanoseconds.
+        """
+        return int(
+            min(
+                self.backoff_ns * self.backoff_factor**retry,
+                self.max_backoff_ns,
+            )
+        )
+
+
+@dataclass
+class TransportStats:
+    """
+    Counters of a fault-tolerant transport.
+
+    :param n_writes: Transactions requested.
+    :param n_retries: Attempts repeated after a failure.
+    :param n_recovered: Transactions that succeeded after a retry.
+    :param n_dropped: Scheduled transactions abandoned at the end of their
+     slot.
+    :param n_failed: Transactions whose error was raised to the caller.
+    :param n_recoveries: Times the recovery actions ran.
+    :param errors: Failed attempts by error type.
+    """
+
+    n_writes: int = 0
+    n_retries: int = 0
+    n_recovered: int = 0
+    n_dropped: int = 0
+    n_failed: int = 0
+    n_recoveries: int = 0
+    errors: Counter = field(default_factory=Counter)
+
+    def as_dict(self) -> dict:
+        """Serializable copy of the counters."""
+        return {
+            "n_writes": self.n_writes,
+            "n_retries": self.n_retries,
+            "n_recovered": self.n_recovered,
+            "n_dropped": self.n_dropped,
+            "n_failed": self.n_failed,
+            "n_recoveries": self.n_recoveries,
+            "errors": dict(self.errors),
+        }
+
+
+class ReliableBus(BusProxy):
+    """
+    Bus backend retrying the transient failures of another backend.
+
+    Errors that are not transient, such as a closed adapter, are raised at
+    once. Transient errors are raised as typed
+    :class:`~speaker_test_bench.features.bus.BusError` once the retries are
+    exhausted, except during a playback slot where the sample is dropped.
+
+    Example:
+        dac = AD5693(0x4C, retry=RetryPolicy(max_retries=5))
+        dac.generate_sine_wave(440, 1800)
+        print(dac.transport.stats.as_dict())
+
+    :param bus: Backend to wrap.
+    :param policy: Bounds of the retries.
+    :param on_recover: Callbacks run after the adapter is reopened, e.g. to
+     invalidate the cached registers of the DAC.
+    """
+
+    def __init__(
+        self,
+        bus: BusBackend,
+        policy: Union[RetryPolicy, None] = None,
+        on_recover: Iterable[Callable[[], None]] = (),
+    ) -> None:
+        super().__init__(bus)
+        self.policy = RetryPolicy() if policy is None else policy
+        self.on_recover: List[Callable[[], None]] = list(on_recover)
+        self.stats = TransportStats()
+        self.metrics: Union[Instrumentation, None] = None
+        self._n_failures = 0
+        self._n_drops = 0
+        self._local = threading.local()
+
+    @property
+    def slot_ns(self) -> Union[int, None]:
+        """
+        Time budget of the transactions of the calling thread, set during
+        playback to the sample period; None outside playback, where only the
+        retry count bounds the attempts.
+
+        The slot belongs to the thread running the playback: writes from
+        other threads meanwhile are retried and raised as usual, never
+        dropped.
+        """
+        return getattr(self._local, "slot_ns", None)
+
+    @slot_ns.setter
+    def slot_ns(self, slot_ns: Union[int, None]) -> None:
+        self._local.slot_ns = slot_ns
+
+    def write_i2c_block_data(
+        self, address: int, register: int, data: Buffer
+    ) -> None:
+        if not hasattr(data, "__len__"):
+            # Iterators would be consumed by the first attempt
+            data = list(data)
+        self._write(self.bus.write_i2c_block_data, address, register, data)
+
+    def write_frames(
+        self,
+        address: int,
+        command: int,
+        data: Buffer,
+        repeated: bool = False,
+    ) -> None:
+        self._write(self.bus.write_frames, address, command, data, repeated)
+
+    def write_transactions(self, transactions: Sequence[Transaction]) -> None:
+        self._write(self.bus.write_transactions, transactions)
+
+    def recover(self) -> None:
+        """
+        Reopen the adapter when the backend supports it, then run the
+        recovery callbacks.
+
+        A pooled bus is reopened through its
+        :class:`~speaker_test_bench.features.pool.BusPool`, under the lock
+        shared by every lease on it.
+        """
+        self.stats.n_recoveries += 1
+        reopen = getattr(self.bus, "reopen", None)
+        if reopen is not None:
+            try:
+                reopen()
+            except OSError as error:
+                self.stats.errors[f"reopen {type(error).__name__}"] += 1
+        for callback in self.on_recover:
+            callback()
+
+    def _write(self, write: Callable, *args) -> None:
+        policy = self.policy
+        stats = self.stats
+        stats.n_writes += 1
+        start = time.perf_counter_ns()
+        deadline = None if self.slot_ns is None else start + self.slot_ns
+        retry = 0
+        while True:
+            attempt = time.perf_counter_ns()
+            try:
+                write(*args)
+            except OSError as error:
+                typed = classify(error, "Error sending command")
+                if not isinstance(typed, BusError):
+                    stats.n_failed += 1
+                    raise
+                stats.errors[type(typed).__name__] += 1
+                self._n_failures += 1
+                if (
+                    policy.recover_after
+                    and self._n_failures % policy.recover_after == 0
+                ):
+                    self.recover()
+                now = time.perf_counter_ns()
+                backoff = policy.backoff(retry)
+                if retry < policy.max_retries and (
+                    deadline is None
+                    or now + backoff + (now - attempt) <= deadline
+                ):
+                    retry += 1
+                    stats.n_retries += 1
+                    if self.metrics is not None:
+                        self.metrics.record_retry()
+                    wait_until(now + backoff)
+                    continue
+                if deadline is not None:
+                    self._n_drops += 1
+                    if self._n_drops <= policy.max_consecutive_drops:
+                        stats.n_dropped += 1
+                        return
+                stats.n_failed += 1
+                raise typed from error
+            if retry:
+                stats.n_recovered += 1
+            self._n_failures = 0
+            self._n_drops = 0
+            return
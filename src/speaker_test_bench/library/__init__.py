@@ -9,6 +9,31 @@ Description of subpackage. (TBD)
 TBD
 
 """
+from .dds import DDSEngine, Tone, sine_table
+from .histogram import LatencyHistogram
+from .pcm import PCMFile
+from .realtime import (
+    JitterComparison,
+    RealtimeConfig,
+    RealtimeReport,
+    RealtimeSession,
+    compare_jitter,
+)
+from .scheduler import (
+    DeadlineScheduler,
+    LatePolicy,
+    SchedulerStats,
+    wait_until,
+)
+from .signals import (
+    Window,
+    multitone,
+    pink_noise,
+    tone_burst,
+    white_noise,
+)
+from .sweep import SineSweep, SweepMethod
+from .trace import SpanLog, Tracer
 from .util import (
     CustomEncoder,
     ExtendedEnum,
@@ -19,8 +44,31 @@ from .util import (
 
 __all__ = (
     "CustomEncoder",
+    "DDSEngine",
+    "DeadlineScheduler",
     "ExtendedEnum",
+    "JitterComparison",
+    "LatePolicy",
+    "LatencyHistogram",
+    "PCMFile",
+    "RealtimeConfig",
+    "RealtimeReport",
+    "RealtimeSession",
+    "SchedulerStats",
+    "SineSweep",
+    "SpanLog",
+    "SweepMethod",
+    "Tone",
+    "Tracer",
+    "Window",
     "check_timestamp_iso",
+    "compare_jitter",
     "copy_key_content",
     "flatten",
+    "multitone",
+    "pink_noise",
+    "sine_table",
+    "tone_burst",
+    "wait_until",
+    "white_noise",
 )
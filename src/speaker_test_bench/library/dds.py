@@ -0,0 +1,220 @@
+"""Script containing the direct digital synthesis (DDS) engine"""
+
+import functools
+import math
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_PHASE_BITS = 48
+DEFAULT_TABLE_BITS = 14
+DEFAULT_CHUNK_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=None)
+def sine_table(table_bits: int = DEFAULT_TABLE_BITS) -> np.ndarray:
+    """Build the sine lookup table shared by every oscillator.
+
+    Args:
+        table_bits (int): log2 of the number of entries over one period
+
+    Returns:
+        Read-only float64 array of one period of a unit sine
+    """
+    size = 1 << table_bits
+    table = np.sin(2.0 * np.pi * np.arange(size) / size)
+    table.flags.writeable = False
+    return table
+
+
+@dataclass(frozen=True)
+class Tone:
+    """One sinusoidal component of a DDS signal.
+
+    The amplitude is relative to full scale: the sum of the amplitudes of
+    the tones played together should not exceed 1 to avoid clipping.
+    """
+
+    frequency: float
+    amplitude: float = 1.0
+    phase: float = 0.0
+
+
+class DDSEngine:
+    """Fixed-point phase-accumulator synthesizer.
+
+    Each oscillator keeps an integer phase accumulator of ``phase_bits`` bits
+    and adds its tuning word every sample; the top ``table_bits`` bits index
+    the cached sine table. The realised frequency is
+    ``word * sample_rate / 2**phase_bits``, so with the default 48-bit
+    accumulator it is within ``sample_rate / 2**49`` Hz of the request and
+    exact whenever the request is a multiple of that step. Integer phase
+    never drifts, however long the signal.
+
+    Output is produced in chunks of at most ``chunk_size`` samples, so memory
+    use does not depend on the signal duration. State carries over between
+    chunks and between calls: successive segments are phase-continuous and
+    changing the tones only changes the tuning words, which gives clean
+    frequency steps.
+
+    Example:
+        engine = DDSEngine(48000)
+        engine.set_tones([Tone(1000, 0.5), Tone(1500, 0.25)])
+        for chunk in engine.chunks(48000):
+            ...
+    """
+
+    def __init__(
+        self,
+        sample_rate: float,
+        phase_bits: int = DEFAULT_PHASE_BITS,
+        table_bits: int = DEFAULT_TABLE_BITS,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """Create an engine with no tone, outputting silence.
+
+        Args:
+            sample_rate (float): output rate in samples per second
+            phase_bits (int): width of the phase accumulators, up to 64
+            table_bits (int): log2 of the sine table size
+            chunk_size (int): maximum number of samples per chunk
+        """
+        if sample_rate <= 0:
+            raise ValueError("Sample rate must be positive")
+        if not 1 <= table_bits <= phase_bits <= 64:
+            raise ValueError("Expected 1 <= table_bits <= phase_bits <= 64")
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1")
+        self.sample_rate = float(sample_rate)
+        self.phase_bits = phase_bits
+        self.table_bits = table_bits
+        self.chunk_size = chunk_size
+        self.table = sine_table(table_bits)
+        self._modulus = 1 << phase_bits
+        self._mask = np.uint64(self._modulus - 1)
+        self._shift = np.uint64(phase_bits - table_bits)
+        self._ramp = np.arange(chunk_size, dtype=np.uint64)
+        self._words: List[int] = []
+        self._amplitudes: List[float] = []
+        self._phases: List[int] = []
+
+    def tuning_word(self, frequency: float) -> int:
+        """Phase increment per sample for a frequency.
+
+        Args:
+            frequency (float): frequency in Hertz, from 0 to Nyquist
+
+        Returns:
+            The tuning word
+        """
+        if not 0 <= frequency <= self.sample_rate / 2:
+            raise ValueError(
+                f"Frequency {frequency} Hz is outside 0 to Nyquist"
+            )
+        return int(round(frequency * self._modulus / self.sample_rate))
+
+    def frequency(self, word: int) -> float:
+        """Frequency produced by a tuning word.
+
+        Args:
+            word (int): tuning word
+
+        Returns:
+            Frequency in Hertz
+        """
+        return word * self.sample_rate / self._modulus
+
+    @property
+    def frequencies(self) -> List[float]:
+        """Realised frequencies of the current tones."""
+        return [self.frequency(word) for word in self._words]
+
+    def set_tones(self, tones: Sequence[Tone]) -> None:
+        """Replace the current tones.
+
+        The oscillator of the i-th tone keeps the phase reached by the
+        previous i-th tone, so a change of frequency is phase-continuous.
+        The phase of a tone only applies when its oscillator is created.
+
+        Args:
+            tones (Sequence[Tone]): components of the signal
+        """
+        words = [self.tuning_word(tone.frequency) for tone in tones]
+        phases = self._phases[: len(tones)]
+        for tone in tones[len(phases) :]:
+            turns = (tone.phase / (2.0 * math.pi)) % 1.0
+            phases.append(int(round(turns * self._modulus)) % self._modulus)
+        self._words = words
+        self._amplitudes = [float(tone.amplitude) for tone in tones]
+        self._phases = phases
+
+    def reset(self) -> None:
+        """Remove every tone and reset the phase accumulators."""
+        self._words = []
+        self._amplitudes = []
+        self._phases = []
+
+    def render(self, n_samples: int) -> np.ndarray:
+        """Synthesize the next samples of the signal.
+
+        Args:
+            n_samples (int): number of samples, at most ``chunk_size``
+
+        Returns:
+            float64 array in [-1, 1] for amplitudes summing to at most 1
+        """
+        if n_samples > self.chunk_size:
+            raise ValueError(
+                f"Cannot render more than {self.chunk_size} samples at once"
+            )
+        out = np.zeros(n_samples)
+        ramp = self._ramp[:n_samples]
+        for i, (word, amplitude) in enumerate(
+            zip(self._words, self._amplitudes)
+        ):
+            phase = self._phases[i]
+            # uint64 arithmetic wraps modulo 2**64, a multiple of the
+            # accumulator modulus, so masking afterwards stays exact
+            phases = (np.uint64(phase) + np.uint64(word) * ramp) & self._mask
+            out += amplitude * self.table[phases >> self._shift]
+            self._phases[i] = (phase + word * n_samples) % self._modulus
+        return out
+
+    def chunks(self, n_samples: int) -> Iterator[np.ndarray]:
+        """Synthesize samples lazily, chunk by chunk.
+
+        Args:
+            n_samples (int): total number of samples
+
+        Yields:
+            Arrays of at most ``chunk_size`` samples
+        """
+        while n_samples > 0:
+            n_chunk = min(n_samples, self.chunk_size)
+            n_samples -= n_chunk
+            yield self.render(n_chunk)
+
+    def program(
+        self, segments: Iterable[Tuple[Sequence[Tone], float]]
+    ) -> Iterator[np.ndarray]:
+        """Synthesize a sequence of tone sets, e.g. a stepped sine.
+
+        Segment boundaries fall on the nearest sample of the cumulated
+        durations so rounding errors do not build up.
+
+        Args:
+            segments (Iterable[Tuple[Sequence[Tone], float]]): tones and
+                duration in seconds of each segment
+
+        Yields:
+            Arrays of at most ``chunk_size`` samples
+        """
+        elapsed = 0.0
+        n_done = 0
+        for tones, duration in segments:
+            elapsed += duration
+            n_end = int(round(elapsed * self.sample_rate))
+            self.set_tones(tones)
+            yield from self.chunks(n_end - n_done)
+            n_done = max(n_end, n_done)
@@ -0,0 +1,191 @@
+"""Script containing the fixed-memory latency histogram"""
+
+import math
+from typing import Dict, List, Sequence, Union
+
+DEFAULT_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """Log-linear histogram of non-negative integer values (HDR style).
+
+    Values below ``2**sub_bits`` are counted exactly. Above, every power of
+    two is split into ``2**(sub_bits - 1)`` linear buckets, so the relative
+    error of any reported value stays below ``2**(1 - sub_bits)``, 0.8 % with
+    the default 8 bits. Memory is fixed by ``sub_bits`` and ``max_bits``
+    whatever the number of values recorded; values of ``2**max_bits`` and
+    above land in the last bucket.
+
+    Example:
+        histogram = LatencyHistogram()
+        histogram.record(end_ns - start_ns)
+        histogram.percentile(99)
+    """
+
+    def __init__(self, sub_bits: int = 8, max_bits: int = 40) -> None:
+        """Create an empty histogram.
+
+        Args:
+            sub_bits (int): precision, log2 of the number of exact values
+            max_bits (int): range, log2 of the largest value tracked
+        """
+        if not 1 < sub_bits < max_bits:
+            raise ValueError("Expected 1 < sub_bits < max_bits")
+        self.sub_bits = sub_bits
+        self.max_bits = max_bits
+        self._sub_count = 1 << sub_bits
+        self._half = self._sub_count >> 1
+        self.counts: List[int] = [0] * (
+            self._sub_count + (max_bits - sub_bits) * self._half
+        )
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget every recorded value."""
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.n_values = 0
+        self.n_overflows = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def index(self, value: int) -> int:
+        """Bucket of a value.
+
+        Args:
+            value (int): non-negative value
+
+        Returns:
+            Index in ``counts``
+        """
+        if value < self._sub_count:
+            return value
+        shift = value.bit_length() - self.sub_bits
+        return (
+            self._sub_count
+            + (shift - 1) * self._half
+            + ((value >> shift) - self._half)
+        )
+
+    def bounds(self, index: int) -> tuple:
+        """Range of the values counted in a bucket.
+
+        Args:
+            index (int): index in ``counts``
+
+        Returns:
+            Lowest and highest value of the bucket
+        """
+        if index < self._sub_count:
+            return index, index
+        shift, sub = divmod(index - self._sub_count, self._half)
+        shift += 1
+        low = (sub + self._half) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value: Union[int, float]) -> None:
+        """Count one value.
+
+        Args:
+            value (Union[int, float]): value to count, negative values are
+                counted as 0
+        """
+        value = int(value) if value > 0 else 0
+        index = self.index(value)
+        if index >= len(self.counts):
+            index = len(self.counts) - 1
+            self.n_overflows += 1
+        self.counts[index] += 1
+        self.n_values += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add the values of another histogram of the same layout.
+
+        Args:
+            other (LatencyHistogram): histogram to add
+        """
+        if (other.sub_bits, other.max_bits) != (self.sub_bits, self.max_bits):
+            raise ValueError("Histograms have different layouts")
+        for i, count in enumerate(other.counts):
+            if count:
+                self.counts[i] += count
+        self.n_values += other.n_values
+        self.n_overflows += other.n_overflows
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        """Exact mean of the recorded values."""
+        return self.total / self.n_values if self.n_values else 0.0
+
+    @property
+    def stddev(self) -> float:
+        """Standard deviation, from the bucket midpoints."""
+        if self.n_values < 2:
+            return 0.0
+        mean = self.mean
+        m2 = 0.0
+        for i, count in enumerate(self.counts):
+            if count:
+                low, high = self.bounds(i)
+                m2 += count * ((low + high) / 2 - mean) ** 2
+        return math.sqrt(m2 / (self.n_values - 1))
+
+    def percentile(self, percentile: float) -> int:
+        """Value below which a share of the recorded values falls.
+
+        Args:
+            percentile (float): share in percent, from 0 to 100
+
+        Returns:
+            Highest value of the bucket reaching the share, capped to the
+            largest value recorded; 0 when empty
+        """
+        if not self.n_values:
+            return 0
+        rank = max(math.ceil(percentile / 100 * self.n_values), 1)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bounds(i)[1], self.max)
+        return self.max
+
+    def as_dict(
+        self, percentiles: Sequence[float] = DEFAULT_PERCENTILES
+    ) -> Dict[str, object]:
+        """Produce a serializable summary of the histogram.
+
+        Args:
+            percentiles (Sequence[float]): percentiles to report
+
+        Returns:
+            Dictionary of statistics, percentiles and non-empty buckets as
+            ``[lowest value, count]`` pairs
+        """
+        return {
+            "n_values": self.n_values,
+            "n_overflows": self.n_overflows,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "stddev": self.stddev,
+            "percentiles": {
+                f"p{p:g}": self.percentile(p) for p in percentiles
+            },
+            "buckets": [
+                [self.bounds(i)[0], count]
+                for i, count in enumerate(self.counts)
+                if count
+            ],
+        }
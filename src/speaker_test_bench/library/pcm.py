@@ -0,0 +1,233 @@
+"""Script containing the memory-mapped PCM file reader used for playback"""
+
+import os
+import struct
+from typing import Iterator, Union
+
+import numpy as np
+
+from .dds import DEFAULT_CHUNK_SIZE
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+PathLike = Union[str, os.PathLike]
+
+
+def _sample_dtype(format_tag: int, bits: int) -> np.dtype:
+    """Little-endian dtype of one stored sample.
+
+    24-bit samples have no NumPy type, they are read as 3 bytes and widened
+    chunk by chunk.
+    """
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        return np.dtype(f"<f{bits // 8}")
+    if format_tag == WAVE_FORMAT_PCM and bits in (8, 16, 24, 32):
+        if bits == 8:
+            return np.dtype("u1")
+        if bits == 24:
+            return np.dtype(("u1", 3))
+        return np.dtype(f"<i{bits // 8}")
+    raise ValueError(
+        f"Unsupported sample format {format_tag:#06x} with {bits} bits"
+    )
+
+
+class PCMFile:
+    """PCM samples of a WAV or raw file, memory-mapped.
+
+    Nothing is read until samples are requested: :meth:`chunks` slices the
+    mapping, converts one chunk to floats in [-1, 1] and optionally resamples
+    it, so memory use does not depend on the file length. Stereo files are
+    played on a single DAC, either one channel or the mix of all of them.
+
+    Example:
+        pcm = PCMFile.open("pink_noise.wav")
+        for chunk in pcm.chunks(sample_rate=8000):
+            ...
+    """
+
+    def __init__(
+        self,
+        path: PathLike,
+        sample_rate: float,
+        dtype: Union[np.dtype, str],
+        channels: int = 1,
+        offset: int = 0,
+        n_frames: Union[int, None] = None,
+    ) -> None:
+        """Map the samples of a file.
+
+        Args:
+            path (PathLike): file to read
+            sample_rate (float): rate of the samples in the file
+            dtype (Union[np.dtype, str]): type of one stored sample, e.g.
+                ``"<i2"``; ``("u1", 3)`` for packed 24-bit samples
+            channels (int): number of interleaved channels
+            offset (int): position of the first sample in the file, in bytes
+            n_frames (Union[int, None]): number of frames, by default every
+                whole frame up to the end of the file
+        """
+        if sample_rate <= 0 or channels < 1:
+            raise ValueError("Sample rate and channels must be positive")
+        self.path = os.fspath(path)
+        self.sample_rate = float(sample_rate)
+        self.dtype = np.dtype(dtype)
+        self.channels = channels
+        frame_bytes = self.dtype.itemsize * channels
+        available = (os.path.getsize(self.path) - offset) // frame_bytes
+        self.n_frames = (
+            available if n_frames is None else min(n_frames, available)
+        )
+        if self.n_frames > 0:
+            self._frames = np.memmap(
+                self.path,
+                dtype=self.dtype,
+                mode="r",
+                offset=offset,
+                shape=(self.n_frames, channels),
+            )
+        else:
+            self._frames = np.zeros((0, channels), dtype=self.dtype)
+
+    @classmethod
+    def open(cls, path: PathLike) -> "PCMFile":
+        """Map the samples of a WAV file, reading only its header.
+
+        Integer PCM (8, 16, 24 and 32 bits) and float (32 and 64 bits)
+        samples are supported, including the extensible format.
+
+        Args:
+            path (PathLike): WAV file
+
+        Returns:
+            The mapped file
+        """
+        with open(path, "rb") as file:
+            riff, _, wave = struct.unpack("<4sI4s", file.read(12))
+            if riff not in (b"RIFF", b"RF64") or wave != b"WAVE":
+                raise ValueError(f"{path} is not a WAV file")
+            fmt = None
+            while True:
+                header = file.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"{path} has no data chunk")
+                chunk_id, size = struct.unpack("<4sI", header)
+                if chunk_id == b"fmt ":
+                    fmt = file.read(size)
+                    file.seek(size & 1, os.SEEK_CUR)
+                elif chunk_id == b"data":
+                    break
+                else:
+                    file.seek(size + (size & 1), os.SEEK_CUR)
+            offset = file.tell()
+        if fmt is None:
+            raise ValueError(f"{path} has no fmt chunk")
+        format_tag, channels, sample_rate = struct.unpack("<HHI", fmt[:8])
+        bits = struct.unpack("<H", fmt[14:16])[0]
+        if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            format_tag = struct.unpack("<H", fmt[24:26])[0]
+        dtype = _sample_dtype(format_tag, bits)
+        # Streaming writers leave the size at 0 or 0xFFFFFFFF, in which
+        # case the data runs to the end of the file
+        n_frames = None
+        if 0 < size < 0xFFFFFFFF:
+            n_frames = size // (dtype.itemsize * channels)
+        return cls(path, sample_rate, dtype, channels, offset, n_frames)
+
+    @classmethod
+    def raw(
+        cls,
+        path: PathLike,
+        sample_rate: float,
+        dtype: Union[np.dtype, str] = "<i2",
+        channels: int = 1,
+        offset: int = 0,
+    ) -> "PCMFile":
+        """Map a headerless file of interleaved samples.
+
+        Args:
+            path (PathLike): raw file
+            sample_rate (float): rate of the samples in the file
+            dtype (Union[np.dtype, str]): type of one stored sample
+            channels (int): number of interleaved channels
+            offset (int): bytes to skip at the start of the file
+
+        Returns:
+            The mapped file
+        """
+        return cls(path, sample_rate, dtype, channels, offset)
+
+    @property
+    def duration(self) -> float:
+        """Duration of the file in seconds."""
+        return self.n_frames / self.sample_rate
+
+    def read(
+        self, start: int, stop: int, channel: Union[int, None] = 0
+    ) -> np.ndarray:
+        """Read a range of frames as floats.
+
+        Args:
+            start (int): index of the first frame
+            stop (int): index after the last frame, clipped to the file
+            channel (Union[int, None]): channel to read, None for the mix of
+                every channel
+
+        Returns:
+            float64 array in [-1, 1]
+        """
+        frames = self._frames[start : min(stop, self.n_frames)]
+        if channel is not None:
+            frames = frames[:, channel : channel + 1]
+        kind, size = self.dtype.base.kind, self.dtype.itemsize
+        if self.dtype.shape:
+            # Packed 24-bit, sign-extended through the top byte
+            b = frames.astype(np.int32)
+            samples = (b[..., 0] | (b[..., 1] << 8) | (b[..., 2] << 16)) << 8
+            samples = samples / float(1 << 31)
+        elif kind == "f":
+            samples = frames.astype(np.float64)
+        elif kind == "u":
+            half = float(1 << (8 * size - 1))
+            samples = (frames.astype(np.float64) - half) / half
+        else:
+            samples = frames / float(1 << (8 * size - 1))
+        return samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+
+    def chunks(
+        self,
+        sample_rate: Union[float, None] = None,
+        channel: Union[int, None] = 0,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Iterator[np.ndarray]:
+        """Read the file lazily, chunk by chunk, at the output rate.
+
+        Resampling uses linear interpolation evaluated at absolute positions
+        in the file, so chunk boundaries are seamless. It does not filter:
+        content above the output Nyquist frequency aliases when the rate is
+        lowered.
+
+        Args:
+            sample_rate (Union[float, None]): output rate, the file rate by
+                default
+            channel (Union[int, None]): channel to read, None for the mix of
+                every channel
+            chunk_size (int): maximum number of samples per chunk
+
+        Yields:
+            float64 arrays in [-1, 1] of at most ``chunk_size`` samples
+        """
+        if sample_rate is None or sample_rate == self.sample_rate:
+            for start in range(0, self.n_frames, chunk_size):
+                yield self.read(start, start + chunk_size, channel)
+            return
+        step = self.sample_rate / sample_rate
+        n_out = int((self.n_frames - 1) / step) + 1 if self.n_frames else 0
+        for start in range(0, n_out, chunk_size):
+            positions = np.arange(start, min(start + chunk_size, n_out)) * step
+            first = int(positions[0])
+            samples = self.read(first, int(positions[-1]) + 2, channel)
+            positions -= first
+            yield np.interp(positions, np.arange(len(samples)), samples)
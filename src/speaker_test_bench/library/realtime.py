@@ -0,0 +1,335 @@
+"""Script containing the opt-in real-time tuning of an output thread"""
+
+import ctypes
+import ctypes.util
+import gc
+import os
+import statistics
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Callable, List, Sequence, Union
+
+from .scheduler import SchedulerStats
+
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+
+class _ProcessSettings:
+    """Process-wide settings shared by the sessions of every thread.
+
+    The first session to change a setting records the state it found and
+    the last one to leave restores it, so that sessions nested or running
+    in other threads do not undo each other's settings.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.n_locked = 0
+        self.unlock_reason: Union[str, None] = None
+        self.n_gc = 0
+        self.gc_was_enabled = False
+
+
+_PROCESS = _ProcessSettings()
+
+
+def _locked_kib() -> Union[int, None]:
+    """Memory locked by the process, in KiB, None when unknown."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmLck:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+@dataclass(frozen=True)
+class RealtimeConfig:
+    """Real-time settings requested for an output thread.
+
+    Every setting is best effort: what the platform or the permissions do
+    not allow is skipped and reported, never raised.
+
+    Example:
+        config = RealtimeConfig(cpus=(3,), priority=80)
+        with dac.player(realtime=config) as player:
+            player.queue(waveform)
+    """
+
+    cpus: Union[Sequence[int], None] = None
+    """CPUs the thread is pinned to. Defaults to the last CPU it may run
+    on, an empty sequence keeps the current affinity."""
+    priority: int = 50
+    """``SCHED_FIFO`` priority, from 1 to 99, 0 to keep the policy."""
+    nice: int = -10
+    """Niceness used when ``SCHED_FIFO`` is refused, 0 to keep it."""
+    lock_memory: bool = True
+    """Lock the pages mapped so far, encoded waveforms included, in RAM."""
+    lock_future: bool = False
+    """Also lock the pages mapped later, e.g. waveforms queued afterwards."""
+    disable_gc: bool = True
+    """Disable the cyclic garbage collector, for the whole process."""
+
+
+@dataclass
+class RealtimeReport:
+    """What a real-time session actually applied."""
+
+    cpus: Union[List[int], None] = None
+    """CPUs the thread was pinned to, None if unchanged."""
+    policy: Union[str, None] = None
+    """``"SCHED_FIFO"`` or ``"nice"`` when the priority was raised."""
+    priority: Union[int, None] = None
+    """Real-time priority or niceness applied."""
+    memory_locked: bool = False
+    """Whether the memory was locked."""
+    gc_disabled: bool = False
+    """Whether the garbage collector was disabled by the session."""
+    warnings: List[str] = field(default_factory=list)
+    """Settings that could not be applied, and why."""
+
+    def as_dict(self) -> dict:
+        """Produce a serializable copy of the report."""
+        return asdict(self)
+
+
+class RealtimeSession:
+    """Apply a :class:`RealtimeConfig` to the calling thread, then undo it.
+
+    Affinity and scheduling apply to the calling thread only, memory
+    locking and the garbage collector to the whole process. Leaving the
+    session restores the previous state. The process-wide settings are
+    shared with the sessions of other threads and only restored by the last
+    one to leave, and memory already locked before the first session, e.g.
+    by the application, is left locked and reported in the warnings.
+
+    Example:
+        with RealtimeSession(RealtimeConfig()) as report:
+            scheduler.run(n_samples, emit)
+        print(report.warnings)
+    """
+
+    def __init__(self, config: Union[RealtimeConfig, None] = None) -> None:
+        """Principle class constructor.
+
+        Args:
+            config (RealtimeConfig): settings to apply, defaults when None
+        """
+        self.config = RealtimeConfig() if config is None else config
+        self.report = RealtimeReport()
+        self._affinity = None
+        self._scheduler = None
+        self._nice = None
+        self._tid = 0
+        self._gc = False
+
+    def __enter__(self) -> RealtimeReport:
+        config = self.config
+        self._tid = threading.get_native_id()
+        self._pin(config.cpus)
+        if config.priority:
+            self._raise_priority(config.priority, config.nice)
+        if config.lock_memory:
+            flags = MCL_CURRENT | (MCL_FUTURE if config.lock_future else 0)
+            self._lock_memory(flags)
+        if config.disable_gc:
+            with _PROCESS.lock:
+                if not _PROCESS.n_gc:
+                    _PROCESS.gc_was_enabled = gc.isenabled()
+                    gc.disable()
+                _PROCESS.n_gc += 1
+                self._gc = True
+                self.report.gc_disabled = _PROCESS.gc_was_enabled
+        return self.report
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        report = self.report
+        if self._gc:
+            self._gc = False
+            with _PROCESS.lock:
+                _PROCESS.n_gc -= 1
+                if not _PROCESS.n_gc and _PROCESS.gc_was_enabled:
+                    gc.enable()
+        if report.memory_locked:
+            with _PROCESS.lock:
+                _PROCESS.n_locked -= 1
+                if not _PROCESS.n_locked:
+                    if _PROCESS.unlock_reason is None:
+                        self._libc_call("munlockall")
+                    else:
+                        report.warnings.append(
+                            f"Memory left locked: {_PROCESS.unlock_reason}"
+                        )
+        try:
+            if self._scheduler is not None:
+                os.sched_setscheduler(0, *self._scheduler)
+            if self._nice is not None:
+                os.setpriority(os.PRIO_PROCESS, self._tid, self._nice)
+            if self._affinity is not None:
+                os.sched_setaffinity(0, self._affinity)
+        except OSError as error:
+            report.warnings.append(f"Failed to restore scheduling: {error}")
+
+    def _pin(self, cpus: Union[Sequence[int], None]) -> None:
+        if cpus is not None and not len(cpus):
+            return
+        try:
+            current = os.sched_getaffinity(0)
+            target = {max(current)} if cpus is None else set(cpus)
+            os.sched_setaffinity(0, target)
+        except (AttributeError, OSError, ValueError) as error:
+            self.report.warnings.append(f"CPU affinity not set: {error}")
+            return
+        self._affinity = current
+        self.report.cpus = sorted(target)
+
+    def _raise_priority(self, priority: int, nice: int) -> None:
+        try:
+            previous = (
+                os.sched_getscheduler(0),
+                os.sched_getparam(0),
+            )
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        except (AttributeError, OSError) as error:
+            self.report.warnings.append(f"SCHED_FIFO not set: {error}")
+        else:
+            self._scheduler = previous
+            self.report.policy = "SCHED_FIFO"
+            self.report.priority = priority
+            return
+        if not nice:
+            return
+        try:
+            # Per thread on Linux, where a thread is a process of its own
+            previous = os.getpriority(os.PRIO_PROCESS, self._tid)
+            os.setpriority(os.PRIO_PROCESS, self._tid, previous + nice)
+        except (AttributeError, OSError) as error:
+            self.report.warnings.append(f"Niceness not set: {error}")
+            return
+        self._nice = previous
+        self.report.policy = "nice"
+        self.report.priority = previous + nice
+
+    def _lock_memory(self, flags: int) -> None:
+        with _PROCESS.lock:
+            first = not _PROCESS.n_locked
+            locked = _locked_kib() if first else 0
+            if not self._libc_call("mlockall", flags):
+                return
+            if first:
+                if locked is None:
+                    reason = "memory locked before the session is unknown"
+                elif locked:
+                    reason = f"{locked} KiB were locked before the session"
+                else:
+                    reason = None
+                _PROCESS.unlock_reason = reason
+            _PROCESS.n_locked += 1
+            self.report.memory_locked = True
+
+    def _libc_call(self, name: str, *args) -> bool:
+        path = ctypes.util.find_library("c")
+        try:
+            libc = ctypes.CDLL(path, use_errno=True)
+            function = getattr(libc, name)
+        except (AttributeError, OSError) as error:
+            self.report.warnings.append(f"{name} unavailable: {error}")
+            return False
+        if function(*args) != 0:
+            error = ctypes.get_errno()
+            self.report.warnings.append(f"{name} failed: {os.strerror(error)}")
+            return False
+        return True
+
+
+@dataclass
+class JitterComparison:
+    """Timing of the same playback without and with real-time tuning."""
+
+    baseline: SchedulerStats
+    """Timing without tuning, of the trial with the median jitter."""
+    realtime: SchedulerStats
+    """Timing within a :class:`RealtimeSession`, of the trial with the
+    median jitter."""
+    report: RealtimeReport
+    """Settings the session applied."""
+    gains: List[float] = field(default_factory=list)
+    """Jitter gain of each trial."""
+
+    @property
+    def jitter_gain(self) -> float:
+        """Median of the baseline jitter over the real-time jitter of each
+        trial, above 1 when improved."""
+        if self.gains:
+            return statistics.median(self.gains)
+        return _jitter_gain(self.baseline, self.realtime)
+
+    def as_dict(self) -> dict:
+        """Produce a serializable summary of the comparison."""
+        return {
+            "baseline": self.baseline.as_dict(),
+            "realtime": self.realtime.as_dict(),
+            "jitter_gain": self.jitter_gain,
+            "gains": list(self.gains),
+            "report": self.report.as_dict(),
+        }
+
+
+def _jitter_gain(baseline: SchedulerStats, realtime: SchedulerStats) -> float:
+    if not realtime.jitter_ns:
+        return float("inf") if baseline.jitter_ns else 1.0
+    return baseline.jitter_ns / realtime.jitter_ns
+
+
+def _median_run(runs: List[SchedulerStats]) -> SchedulerStats:
+    return sorted(runs, key=lambda stats: stats.jitter_ns)[len(runs) // 2]
+
+
+def compare_jitter(
+    run: Callable[[], SchedulerStats],
+    config: Union[RealtimeConfig, None] = None,
+    n_trials: int = 5,
+) -> JitterComparison:
+    """Time a playback normally and in a real-time session, interleaved.
+
+    A first untimed run warms up the caches and the allocator. Each trial
+    then times one run of each mode, alternating which one goes first, so
+    that neither mode benefits from the order or from a slow drift of the
+    machine load. The gain is the median over the trials.
+
+    Args:
+        run (Callable): plays the same schedule on each call and returns
+         its timing, e.g. ``lambda: dac.play(waveform).timing`` on a
+         simulated bus
+        config (RealtimeConfig): settings of the real-time run
+        n_trials (int): pairs of timed runs
+
+    Returns:
+        Timing of the median runs, gain of every trial and the settings
+        applied
+    """
+    if n_trials < 1:
+        raise ValueError("At least one trial is needed")
+    run()
+    baselines, realtimes, gains = [], [], []
+    report = None
+    for trial in range(n_trials):
+        session = RealtimeSession(config)
+        if trial % 2:
+            with session:
+                realtime = run()
+            baseline = run()
+        else:
+            baseline = run()
+            with session:
+                realtime = run()
+        report = session.report
+        baselines.append(baseline)
+        realtimes.append(realtime)
+        gains.append(_jitter_gain(baseline, realtime))
+    return JitterComparison(
+        _median_run(baselines), _median_run(realtimes), report, gains
+    )
@@ -0,0 +1,214 @@
+"""Script containing the deadline scheduler used to pace sample output"""
+
+import math
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Union
+
+from .histogram import LatencyHistogram
+from .trace import Tracer
+from .util import ExtendedEnum
+
+NS_PER_S = 1_000_000_000
+
+
+class LatePolicy(ExtendedEnum):
+    """Behavior of the scheduler when a sample misses its deadline.
+
+    CATCH_UP emits late samples immediately, back to back, until the output
+    is on schedule again. DROP skips every sample whose slot has already
+    passed so that the following ones keep their original timing.
+    """
+
+    CATCH_UP = "catch_up"
+    DROP = "drop"
+
+
+@dataclass
+class SchedulerStats:
+    """Timing statistics gathered while running a schedule.
+
+    Lateness is the delay between the deadline of a sample and the moment it
+    is handed to the emit callback. Statistics are accumulated on the fly so
+    memory use does not depend on the schedule length.
+    """
+
+    sample_rate: float
+    n_scheduled: int = 0
+    n_emitted: int = 0
+    n_late: int = 0
+    n_dropped: int = 0
+    elapsed_ns: int = 0
+    mean_lateness_ns: float = 0.0
+    max_lateness_ns: int = 0
+    _m2: float = 0.0
+
+    def record(self, lateness_ns: int) -> None:
+        """Add the lateness of one emitted sample (Welford update).
+
+        Args:
+            lateness_ns (int): delay of the sample after its deadline
+        """
+        self.n_emitted += 1
+        delta = lateness_ns - self.mean_lateness_ns
+        self.mean_lateness_ns += delta / self.n_emitted
+        self._m2 += delta * (lateness_ns - self.mean_lateness_ns)
+        if lateness_ns > self.max_lateness_ns:
+            self.max_lateness_ns = lateness_ns
+
+    @property
+    def jitter_ns(self) -> float:
+        """Standard deviation of the lateness, in nanoseconds."""
+        if self.n_emitted < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self.n_emitted - 1))
+
+    @property
+    def achieved_rate(self) -> float:
+        """Emitted samples per second over the whole schedule."""
+        if not self.elapsed_ns:
+            return 0.0
+        return self.n_emitted * NS_PER_S / self.elapsed_ns
+
+    def as_dict(self) -> dict:
+        """Produce a serializable summary of the statistics.
+
+        Returns:
+            Dictionary of counters and timing figures
+        """
+        out = {k: v for k, v in asdict(self).items() if not k.startswith("_")}
+        out["jitter_ns"] = self.jitter_ns
+        out["achieved_rate"] = self.achieved_rate
+        return out
+
+
+def wait_until(deadline_ns: int, spin_threshold_ns: int = 200_000) -> int:
+    """Block until a deadline, sleeping first then spinning.
+
+    Args:
+        deadline_ns (int): absolute ``perf_counter_ns`` deadline
+        spin_threshold_ns (int): time before the deadline spent spinning
+         instead of sleeping
+
+    Returns:
+        The ``perf_counter_ns`` value observed when the wait ended
+    """
+    now = time.perf_counter_ns()
+    remaining = deadline_ns - now - spin_threshold_ns
+    if remaining > 0:
+        time.sleep(remaining / NS_PER_S)
+        now = time.perf_counter_ns()
+    while now < deadline_ns:
+        now = time.perf_counter_ns()
+    return now
+
+
+class DeadlineScheduler:
+    """Pace a callback at a fixed rate using absolute deadlines.
+
+    Deadlines are computed from the schedule start and the sample index with
+    ``time.perf_counter_ns``, so transaction latency and sleep overshoot do not
+    accumulate over long runs. Waiting is hybrid: the scheduler sleeps until
+    ``spin_threshold_ns`` before the deadline, then busy-waits.
+
+    Example:
+        scheduler = DeadlineScheduler(sample_rate=8000)
+        stats = scheduler.run(len(frames), lambda i: write(frames[i]))
+    """
+
+    def __init__(
+        self,
+        sample_rate: float,
+        policy: Union[LatePolicy, str] = LatePolicy.CATCH_UP,
+        spin_threshold_ns: int = 200_000,
+        late_tolerance_ns: Union[int, None] = None,
+        histogram: Union[LatencyHistogram, None] = None,
+        tracer: Union[Tracer, None] = None,
+    ):
+        """Principle class constructor.
+
+        Args:
+            sample_rate (float): number of samples emitted per second
+            policy (LatePolicy): behavior when a deadline is missed
+            spin_threshold_ns (int): time before a deadline spent spinning
+             instead of sleeping
+            late_tolerance_ns (int): lateness above which a sample counts as
+             late. Defaults to one sample period.
+            histogram (LatencyHistogram): histogram receiving the lateness
+             of every emitted sample, in addition to the statistics
+            tracer (Tracer): tracer recording a span around every wait
+        """
+        if sample_rate <= 0:
+            raise ValueError("Sample rate must be positive")
+        self.sample_rate = sample_rate
+        self.policy = LatePolicy(policy)
+        self.spin_threshold_ns = spin_threshold_ns
+        self.period_ns = NS_PER_S / sample_rate
+        self.late_tolerance_ns = (
+            int(self.period_ns)
+            if late_tolerance_ns is None
+            else late_tolerance_ns
+        )
+        self.histogram = histogram
+        if tracer is not None:
+            self.wait_until = tracer.wrap("scheduler.wait", self.wait_until)
+
+    def wait_until(self, deadline_ns: int) -> int:
+        """Block until the deadline using a sleep then spin strategy.
+
+        Args:
+            deadline_ns (int): absolute ``perf_counter_ns`` deadline
+
+        Returns:
+            The ``perf_counter_ns`` value observed when the wait ended
+        """
+        return wait_until(deadline_ns, self.spin_threshold_ns)
+
+    def run(
+        self,
+        n_samples: int,
+        emit: Callable[[int], None],
+        start_ns: Union[int, None] = None,
+        stop_event: Union[threading.Event, None] = None,
+    ) -> SchedulerStats:
+        """Call ``emit(i)`` for each sample index at its deadline.
+
+        Args:
+            n_samples (int): number of samples in the schedule
+            emit (Callable): callback receiving the sample index
+            start_ns (int): absolute ``perf_counter_ns`` deadline of the first
+             sample. Defaults to now.
+            stop_event (threading.Event): event checked before each sample,
+             the schedule ends early once it is set
+
+        Returns:
+            Timing statistics of the schedule
+        """
+        stats = SchedulerStats(sample_rate=self.sample_rate)
+        stats.n_scheduled = n_samples
+        period_ns = self.period_ns
+        tolerance_ns = self.late_tolerance_ns
+        drop = self.policy is LatePolicy.DROP
+        wait_until = self.wait_until
+        stopped = stop_event.is_set if stop_event is not None else None
+        record = self.histogram.record if self.histogram is not None else None
+        if start_ns is None:
+            start_ns = time.perf_counter_ns()
+        for i in range(n_samples):
+            if stopped is not None and stopped():
+                break
+            deadline = start_ns + int(i * period_ns)
+            now = wait_until(deadline)
+            lateness = now - deadline
+            if lateness > tolerance_ns:
+                stats.n_late += 1
+                if drop:
+                    stats.n_dropped += 1
+                    continue
+            emit(i)
+            stats.record(lateness)
+            if record is not None:
+                record(lateness)
+        stats.elapsed_ns = time.perf_counter_ns() - start_ns
+        return stats
@@ -0,0 +1,165 @@
+"""Script containing the test signal generators of the stimulus library"""
+
+from typing import Sequence, Union
+
+import numpy as np
+
+from .util import ExtendedEnum
+
+
+class Window(ExtendedEnum):
+    """Envelope applied to a tone burst."""
+
+    RECTANGULAR = "rectangular"
+    HANN = "hann"
+    HAMMING = "hamming"
+    BLACKMAN = "blackman"
+
+
+def _n_samples(duration: float, sample_rate: float) -> int:
+    if duration <= 0 or sample_rate <= 0:
+        raise ValueError("Duration and sample rate must be positive")
+    return max(int(round(duration * sample_rate)), 1)
+
+
+def _normalize(signal: np.ndarray, amplitude: float) -> np.ndarray:
+    peak = np.abs(signal).max()
+    if peak:
+        signal *= amplitude / peak
+    return signal
+
+
+def multitone(
+    frequencies: Sequence[float],
+    duration: float,
+    sample_rate: float,
+    amplitudes: Union[Sequence[float], None] = None,
+    phases: Union[Sequence[float], str, None] = "schroeder",
+    amplitude: float = 1.0,
+) -> np.ndarray:
+    """Sum of sines, scaled to a given peak.
+
+    Schroeder phases spread the tones in time and keep the crest factor low,
+    which leaves more amplitude for each tone than aligned phases.
+
+    Args:
+        frequencies (Sequence[float]): frequency of each tone in Hertz
+        duration (float): duration in seconds
+        sample_rate (float): rate in samples per second
+        amplitudes (Union[Sequence[float], None]): relative amplitude of each
+            tone, all equal by default
+        phases (Union[Sequence[float], str, None]): phase of each tone in
+            radians, ``"schroeder"``, or None for zero phases
+        amplitude (float): peak of the sum relative to full scale
+
+    Returns:
+        float64 array of samples in [-amplitude, amplitude]
+    """
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    n_tones = len(frequencies)
+    if not n_tones or frequencies.min() <= 0:
+        raise ValueError("Expected at least one positive frequency")
+    if frequencies.max() > sample_rate / 2:
+        raise ValueError("Frequencies must be below Nyquist")
+    if amplitudes is None:
+        amplitudes = np.ones(n_tones)
+    if phases is None:
+        phases = np.zeros(n_tones)
+    elif isinstance(phases, str):
+        if phases != "schroeder":
+            raise ValueError(f"Unknown phase law {phases}")
+        k = np.arange(1, n_tones + 1)
+        phases = -np.pi * k * (k - 1) / n_tones
+    t = np.arange(_n_samples(duration, sample_rate)) / sample_rate
+    signal = np.zeros(len(t))
+    # One tone at a time keeps the temporary at the size of the output
+    for frequency, tone_amplitude, phase in zip(
+        frequencies, amplitudes, phases
+    ):
+        signal += tone_amplitude * np.sin(2.0 * np.pi * frequency * t + phase)
+    return _normalize(signal, amplitude)
+
+
+def tone_burst(
+    frequency: float,
+    n_cycles: float,
+    sample_rate: float,
+    window: Union[Window, str] = Window.HANN,
+    amplitude: float = 1.0,
+) -> np.ndarray:
+    """Windowed sine of a whole number of cycles.
+
+    Args:
+        frequency (float): frequency in Hertz
+        n_cycles (float): length of the burst in cycles
+        sample_rate (float): rate in samples per second
+        window (Union[Window, str]): envelope of the burst
+        amplitude (float): peak of the carrier relative to full scale
+
+    Returns:
+        float64 array of samples in [-amplitude, amplitude]
+    """
+    window = Window(window)
+    if not 0 < frequency <= sample_rate / 2:
+        raise ValueError("Frequency must lie between 0 and Nyquist")
+    n = _n_samples(n_cycles / frequency, sample_rate)
+    signal = np.sin(2.0 * np.pi * frequency * np.arange(n) / sample_rate)
+    envelope = {
+        Window.RECTANGULAR: np.ones,
+        Window.HANN: np.hanning,
+        Window.HAMMING: np.hamming,
+        Window.BLACKMAN: np.blackman,
+    }[window](n)
+    signal *= amplitude * envelope
+    return signal
+
+
+def white_noise(
+    duration: float,
+    sample_rate: float,
+    seed: Union[int, None] = 0,
+    amplitude: float = 1.0,
+) -> np.ndarray:
+    """Gaussian white noise, reproducible for a given seed.
+
+    Args:
+        duration (float): duration in seconds
+        sample_rate (float): rate in samples per second
+        seed (Union[int, None]): seed of the generator, None for fresh noise
+        amplitude (float): peak relative to full scale
+
+    Returns:
+        float64 array of samples in [-amplitude, amplitude]
+    """
+    rng = np.random.default_rng(seed)
+    signal = rng.standard_normal(_n_samples(duration, sample_rate))
+    return _normalize(signal, amplitude)
+
+
+def pink_noise(
+    duration: float,
+    sample_rate: float,
+    seed: Union[int, None] = 0,
+    amplitude: float = 1.0,
+) -> np.ndarray:
+    """Pink noise, -3 dB per octave, reproducible for a given seed.
+
+    White Gaussian noise is shaped in the frequency domain by ``1/sqrt(f)``
+    in a single FFT round trip. The DC bin is removed.
+
+    Args:
+        duration (float): duration in seconds
+        sample_rate (float): rate in samples per second
+        seed (Union[int, None]): seed of the generator, None for fresh noise
+        amplitude (float): peak relative to full scale
+
+    Returns:
+        float64 array of samples in [-amplitude, amplitude]
+    """
+    n = _n_samples(duration, sample_rate)
+    rng = np.random.default_rng(seed)
+    spectrum = np.fft.rfft(rng.standard_normal(n))
+    scale = np.zeros(len(spectrum))
+    scale[1:] = 1.0 / np.sqrt(np.arange(1, len(spectrum)))
+    spectrum *= scale
+    return _normalize(np.fft.irfft(spectrum, n), amplitude)
@@ -0,0 +1,196 @@
+"""Script containing the sine sweep generator used for frequency responses"""
+
+import math
+from typing import Iterator, Union
+
+import numpy as np
+
+from .dds import DEFAULT_CHUNK_SIZE
+from .util import ExtendedEnum
+
+
+class SweepMethod(ExtendedEnum):
+    """Law followed by the instantaneous frequency of a sweep.
+
+    EXPONENTIAL spends the same time on every octave and puts out a pink
+    spectrum; its inverse filter also separates the harmonic distortion
+    products from the linear response. LINEAR spends the same time on every
+    Hertz and puts out a white spectrum.
+    """
+
+    EXPONENTIAL = "exponential"
+    LINEAR = "linear"
+
+
+class SineSweep:
+    """Sine sweep between two frequencies, rendered chunk by chunk.
+
+    The phase is evaluated in closed form from the absolute sample index, so
+    chunks can be rendered in any order and concatenate to the exact same
+    signal as a single render. Only one chunk is in memory at a time: a long
+    sweep starts playing as soon as the first chunk is ready.
+
+    Example:
+        sweep = SineSweep(20, 20000, 30, sample_rate=48000, fade=0.05)
+        dac.play_stream(dac.compile_stream(sweep.chunks(), 48000))
+        ...
+        impulse_response = sweep.deconvolve(recording)
+    """
+
+    def __init__(
+        self,
+        f_start: float,
+        f_stop: float,
+        duration: float,
+        sample_rate: float,
+        method: Union[SweepMethod, str] = SweepMethod.EXPONENTIAL,
+        amplitude: float = 1.0,
+        fade: float = 0.0,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """Describe the sweep, nothing is rendered yet.
+
+        Args:
+            f_start (float): start frequency in Hertz
+            f_stop (float): stop frequency in Hertz, below Nyquist
+            duration (float): sweep duration in seconds
+            sample_rate (float): output rate in samples per second
+            method (Union[SweepMethod, str]): frequency law
+            amplitude (float): peak amplitude relative to full scale
+            fade (float): raised-cosine fade in and out, in seconds
+            chunk_size (int): maximum number of samples per chunk
+        """
+        self.method = SweepMethod(method)
+        if duration <= 0 or sample_rate <= 0 or chunk_size < 1:
+            raise ValueError(
+                "Duration, sample rate and chunk size must be positive"
+            )
+        if not 0 < f_start < sample_rate / 2 or not 0 < f_stop <= (
+            sample_rate / 2
+        ):
+            raise ValueError("Frequencies must lie between 0 and Nyquist")
+        if self.method is SweepMethod.EXPONENTIAL and f_start == f_stop:
+            raise ValueError("An exponential sweep needs distinct frequencies")
+        self.f_start = float(f_start)
+        self.f_stop = float(f_stop)
+        self.sample_rate = float(sample_rate)
+        self.amplitude = amplitude
+        self.chunk_size = chunk_size
+        self.n_samples = max(int(round(duration * sample_rate)), 1)
+        self.n_fade = min(int(round(fade * sample_rate)), self.n_samples // 2)
+        self.duration = self.n_samples / self.sample_rate
+        self._rate = math.log(self.f_stop / self.f_start) / self.duration
+        if self.method is SweepMethod.LINEAR:
+            self._rate = (self.f_stop - self.f_start) / self.duration
+
+    def instantaneous_frequency(
+        self, t: Union[float, np.ndarray]
+    ) -> Union[float, np.ndarray]:
+        """Frequency of the sweep at a given time.
+
+        Args:
+            t (Union[float, np.ndarray]): time in seconds from the start
+
+        Returns:
+            Frequency in Hertz
+        """
+        if self.method is SweepMethod.EXPONENTIAL:
+            return self.f_start * np.exp(self._rate * t)
+        return self.f_start + self._rate * t
+
+    def phase(self, t: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """Phase of the sweep at a given time, integral of the frequency.
+
+        Args:
+            t (Union[float, np.ndarray]): time in seconds from the start
+
+        Returns:
+            Phase in radians
+        """
+        if self.method is SweepMethod.EXPONENTIAL:
+            return (2.0 * np.pi * self.f_start / self._rate) * np.expm1(
+                self._rate * t
+            )
+        return 2.0 * np.pi * (self.f_start * t + 0.5 * self._rate * t * t)
+
+    def render(self, start: int, stop: int) -> np.ndarray:
+        """Render a range of samples.
+
+        Args:
+            start (int): index of the first sample
+            stop (int): index after the last sample, clipped to the sweep
+
+        Returns:
+            float64 array of samples in [-amplitude, amplitude]
+        """
+        stop = min(stop, self.n_samples)
+        index = np.arange(start, stop, dtype=np.float64)
+        out = np.sin(self.phase(index / self.sample_rate))
+        out *= self.amplitude
+        if self.n_fade:
+            n_fade = self.n_fade
+            head = index < n_fade
+            out[head] *= 0.5 - 0.5 * np.cos(np.pi * index[head] / n_fade)
+            tail = index >= self.n_samples - n_fade
+            out[tail] *= 0.5 - 0.5 * np.cos(
+                np.pi * (self.n_samples - 1 - index[tail]) / n_fade
+            )
+        return out
+
+    def chunks(self) -> Iterator[np.ndarray]:
+        """Render the sweep lazily, chunk by chunk.
+
+        Yields:
+            Arrays of at most ``chunk_size`` samples
+        """
+        for start in range(0, self.n_samples, self.chunk_size):
+            yield self.render(start, start + self.chunk_size)
+
+    def inverse_filter(self) -> np.ndarray:
+        """Filter turning the recorded sweep into an impulse response.
+
+        The filter is the time-reversed sweep. For an exponential sweep its
+        amplitude decays by 6 dB per octave to compensate the pink spectrum
+        of the sweep. It is scaled so that the sweep convolved with its
+        inverse has a unit median gain over the swept band.
+
+        Returns:
+            float64 array of ``n_samples`` taps
+        """
+        sweep = np.concatenate(list(self.chunks()))
+        inverse = sweep[::-1].copy()
+        if self.method is SweepMethod.EXPONENTIAL:
+            inverse *= np.exp(
+                -self._rate * np.arange(self.n_samples) / self.sample_rate
+            )
+        n_fft = 1 << (2 * self.n_samples - 1).bit_length()
+        response = np.fft.rfft(sweep, n_fft) * np.fft.rfft(inverse, n_fft)
+        low, high = sorted((self.f_start, self.f_stop))
+        band = slice(
+            int(math.ceil(low * n_fft / self.sample_rate)),
+            int(high * n_fft / self.sample_rate) + 1,
+        )
+        gain = float(np.median(np.abs(response[band])))
+        return inverse / gain if gain else inverse
+
+    def deconvolve(self, recording: np.ndarray) -> np.ndarray:
+        """Recover the impulse response from a recording of the sweep.
+
+        The recording is convolved with :meth:`inverse_filter`. The linear
+        impulse response starts at index ``n_samples - 1``; for an
+        exponential sweep the harmonic distortion products land before it.
+
+        Args:
+            recording (np.ndarray): samples recorded while the sweep played,
+                at the same sample rate
+
+        Returns:
+            float64 array of ``len(recording) + n_samples - 1`` samples
+        """
+        recording = np.asarray(recording, dtype=np.float64)
+        n_out = len(recording) + self.n_samples - 1
+        n_fft = 1 << (n_out - 1).bit_length()
+        spectrum = np.fft.rfft(recording, n_fft) * np.fft.rfft(
+            self.inverse_filter(), n_fft
+        )
+        return np.fft.irfft(spectrum, n_fft)[:n_out]
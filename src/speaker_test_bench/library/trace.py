@@ -0,0 +1,305 @@
+"""Script containing the span tracer writing Chrome trace files"""
+
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, Tuple, Union
+
+import numpy as np
+
+DEFAULT_CAPACITY = 1 << 16
+DEFAULT_FLUSH_INTERVAL = 0.1
+
+
+class SpanLog:
+    """Preallocated ring of completed spans.
+
+    Recording a span fills one slot of fixed-size arrays, nothing is
+    allocated. Slots are claimed with an atomic counter so several threads
+    can record at once, and each slot is stamped with its sequence number
+    once written, so a reader only collects complete spans. When the reader
+    falls behind by more than the capacity, the oldest spans are overwritten
+    and counted as dropped.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """Allocate the log.
+
+        Args:
+            capacity (int): number of spans held until drained
+        """
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive")
+        self.capacity = capacity
+        self.names = array("H", bytes(2 * capacity))
+        self.starts = array("q", bytes(8 * capacity))
+        self.durations = array("q", bytes(8 * capacity))
+        self.threads = array("Q", bytes(8 * capacity))
+        self.sequence = array("q", bytes(8 * capacity))
+        self.n_drained = 0
+        self.n_dropped = 0
+        self._counter = itertools.count()
+
+    def record(self, name_id: int, start_ns: int, end_ns: int) -> None:
+        """Store a completed span.
+
+        Args:
+            name_id (int): index of the span name in the tracer
+            start_ns (int): ``perf_counter_ns`` at the start of the span
+            end_ns (int): ``perf_counter_ns`` at the end of the span
+        """
+        slot = next(self._counter)
+        i = slot % self.capacity
+        self.names[i] = name_id
+        self.starts[i] = start_ns
+        self.durations[i] = end_ns - start_ns
+        self.threads[i] = threading.get_ident()
+        self.sequence[i] = slot + 1
+
+    def drain(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Collect the spans recorded since the previous drain.
+
+        Must be called from a single thread at a time.
+
+        Returns:
+            Name indices, start times, durations and thread identifiers of
+            the spans, in recording order
+        """
+        sequence = np.frombuffer(self.sequence, dtype=np.int64)
+        latest = int(sequence.max())
+        if latest - self.n_drained > self.capacity:
+            # Lapped by the writers, skip what was overwritten
+            self.n_dropped += latest - self.capacity - self.n_drained
+            self.n_drained = latest - self.capacity
+        slots = self.n_drained + np.arange(self.capacity)
+        index = slots % self.capacity
+        stamps = sequence[index]
+        pending = np.flatnonzero(stamps <= slots)
+        n_ready = int(pending[0]) if len(pending) else self.capacity
+        index = index[:n_ready]
+        valid = stamps[:n_ready] == slots[:n_ready] + 1
+        self.n_dropped += int(n_ready - valid.sum())
+        self.n_drained += n_ready
+        index = index[valid]
+        return (
+            np.frombuffer(self.names, dtype=np.uint16)[index],
+            np.frombuffer(self.starts, dtype=np.int64)[index],
+            np.frombuffer(self.durations, dtype=np.int64)[index],
+            np.frombuffer(self.threads, dtype=np.uint64)[index],
+        )
+
+
+class Tracer:
+    """Record named spans and stream them to a Chrome trace file.
+
+    Functions are traced by wrapping them with :meth:`wrap`; code that is not
+    wrapped pays nothing. A background thread drains the span log into a
+    file in the Chrome trace event format, which ``chrome://tracing`` and
+    Perfetto open.
+
+    Example:
+        with Tracer("playback.trace.json") as tracer:
+            write = tracer.wrap("bus.write", bus.write_i2c_block_data)
+            with tracer.span("setup"):
+                ...
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike, None] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        """Principle class constructor.
+
+        Args:
+            path (str): trace file written by the background thread, spans
+             are only kept in the log when None
+            capacity (int): number of spans held until drained
+            flush_interval (float): seconds between two drains
+        """
+        self.path = None if path is None else os.fspath(path)
+        self.log = SpanLog(capacity)
+        self.flush_interval = flush_interval
+        self.names: List[str] = []
+        self.name_ids: Dict[str, int] = {}
+        self.origin_ns = time.perf_counter_ns()
+        self.n_written = 0
+        self._file = None
+        self._thread: Union[threading.Thread, None] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def name_id(self, name: str) -> int:
+        """Index of a span name, registered on first use.
+
+        Args:
+            name (str): span name
+
+        Returns:
+            Index stored in the log
+        """
+        with self._lock:
+            name_id = self.name_ids.get(name)
+            if name_id is None:
+                name_id = self.name_ids[name] = len(self.names)
+                self.names.append(name)
+            return name_id
+
+    def wrap(self, name: str, function: Callable) -> Callable:
+        """Trace every call of a function.
+
+        Args:
+            name (str): span name
+            function (Callable): function to trace
+
+        Returns:
+            Function recording a span around each call of ``function``
+        """
+        name_id = self.name_id(name)
+        record = self.log.record
+        clock = time.perf_counter_ns
+
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name_id, start, clock())
+
+        return traced
+
+    def span(self, name: str) -> "Span":
+        """Context manager recording a span around a block.
+
+        Args:
+            name (str): span name
+
+        Returns:
+            The context manager
+        """
+        return Span(self.log, self.name_id(name))
+
+    def events(self) -> List[dict]:
+        """Drain the log into Chrome trace events.
+
+        Returns:
+            Complete (``"X"``) events with times in microseconds since the
+            tracer creation
+        """
+        names, starts, durations, threads = self.log.drain()
+        pid = os.getpid()
+        starts_us = ((starts - self.origin_ns) / 1e3).tolist()
+        durations_us = (durations / 1e3).tolist()
+        return [
+            {
+                "name": self.names[name_id],
+                "ph": "X",
+                "ts": ts,
+                "dur": dur,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name_id, ts, dur, tid in zip(
+                names.tolist(), starts_us, durations_us, threads.tolist()
+            )
+        ]
+
+    def flush(self) -> int:
+        """Write the spans recorded so far to the trace file.
+
+        Returns:
+            Number of events written
+        """
+        if self._file is None:
+            raise RuntimeError("The tracer is not started")
+        events = self.events()
+        for event in events:
+            self._file.write(json.dumps(event) + ",\n")
+        self._file.flush()
+        self.n_written += len(events)
+        return len(events)
+
+    def start(self) -> "Tracer":
+        """Open the trace file and start the background drain.
+
+        Returns:
+            The tracer itself
+        """
+        if self.path is None:
+            raise ValueError("No trace file to write")
+        if self._thread is not None:
+            return self
+        self._file = open(self.path, "w")
+        self._file.write("[\n")
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._drain_loop, name="trace-writer", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Drain the remaining spans and close the trace file."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+        # Trailing metadata event so that the array is valid JSON
+        self._file.write(
+            json.dumps(
+                {
+                    "name": "trace_stats",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "args": {
+                        "n_written": self.n_written,
+                        "n_dropped": self.log.n_dropped,
+                    },
+                }
+            )
+            + "\n]\n"
+        )
+        self._file.close()
+        self._file = None
+
+    def _drain_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def __enter__(self) -> "Tracer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+
+class Span:
+    """Context manager recording one span into a log."""
+
+    __slots__ = ("_log", "_name_id", "_start")
+
+    def __init__(self, log: SpanLog, name_id: int) -> None:
+        """Principle class constructor.
+
+        Args:
+            log (SpanLog): log receiving the span
+            name_id (int): index of the span name in the tracer
+        """
+        self._log = log
+        self._name_id = name_id
+        self._start = 0
+
+    def __enter__(self) -> "Span":
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._log.record(self._name_id, self._start, time.perf_counter_ns())
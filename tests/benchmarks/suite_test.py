@@ -0,0 +1,87 @@
+"""
+Test benchmark suite.
+"""
+
+import importlib.util
+import json
+import pathlib
+
+import pytest
+
+SUITE_PATH = (
+    pathlib.Path(__file__).resolve().parents[2] / "benchmarks" / "suite.py"
+)
+
+
+@pytest.fixture(scope="module")
+def suite():
+    spec = importlib.util.spec_from_file_location("suite", SUITE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def result(
+    value, higher_is_better=True, tolerance=None, checked=True, floor=0.0
+):
+    return {
+        "value": value,
+        "unit": "x",
+        "higher_is_better": higher_is_better,
+        "tolerance": tolerance,
+        "checked": checked,
+        "floor": floor,
+    }
+
+
+def test_unit_compare_01(suite):
+    """Figures worse than their baseline beyond the tolerance are flagged"""
+    baseline = {"rate": result(100.0), "error": result(1.0, False)}
+    assert suite.compare({"rate": result(85.0)}, baseline) == []
+    assert suite.compare({"rate": result(75.0)}, baseline) == ["rate"]
+    assert suite.compare({"rate": result(150.0)}, baseline) == []
+    assert suite.compare({"error": result(1.1, False)}, baseline) == []
+    assert suite.compare({"error": result(1.5, False)}, baseline) == ["error"]
+    assert suite.compare({"error": result(0.5, False)}, baseline) == []
+    noisy = {"rate": result(40.0, tolerance=1.0)}
+    assert suite.compare(noisy, baseline) == []
+    assert suite.compare(noisy, baseline, tolerance=0.5) == []
+
+
+def test_unit_compare_02(suite):
+    """A rise from 0 is flagged beyond the absolute floor only"""
+    baseline = {"late": result(0.0, False), "rate": result(0.0)}
+    assert suite.compare({"late": result(0.0, False)}, baseline) == []
+    assert suite.compare({"late": result(0.1, False)}, baseline) == ["late"]
+    late = {"late": result(0.5, False, tolerance=1.0, floor=1.0)}
+    assert suite.compare(late, baseline) == []
+    late = {"late": result(2.0, False, tolerance=1.0, floor=1.0)}
+    assert suite.compare(late, baseline) == ["late"]
+    assert suite.compare({"rate": result(10.0)}, baseline) == []
+
+
+def test_unit_compare_03(suite):
+    """Unchecked and new figures are reported without being flagged"""
+    baseline = {"gain": result(4.0, checked=False)}
+    results = {
+        "gain": result(1.0, checked=False),
+        "new": result(1.0),
+    }
+    assert suite.compare(results, baseline) == []
+
+
+def test_unit_suite_main_01(suite, tmp_path, capsys, monkeypatch):
+    """A missing baseline is created by the first run, then compared"""
+    fixed = suite.Benchmark("fixed/figure", lambda quick: 100.0, "x")
+    monkeypatch.setattr(suite, "BENCHMARKS", [fixed])
+    path = tmp_path / "baseline.json"
+    argv = ["--quick", "-k", "fixed/*", "--baseline", str(path)]
+    assert suite.main(argv) == 0
+    saved = json.loads(path.read_text())
+    assert list(saved["results"]) == ["fixed/figure"]
+    assert saved["quick"]
+    assert suite.main(argv) == 0
+    assert "baseline" in capsys.readouterr().out
+    saved["results"]["fixed/figure"]["value"] *= 100
+    path.write_text(json.dumps(saved))
+    assert suite.main(argv) == 1
@@ -0,0 +1,242 @@
+"""
+Test ad5693 module.
+"""
+
+import numpy as np
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693, DAC_MAX_CODE
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.library.dds import DDSEngine, Tone
+
+
+@pytest.fixture
+def device():
+    return SimulatedAD5693(address=0x4C, v_ref=5)
+
+
+@pytest.fixture
+def dac(device):
+    return AD5693(device_address=0x4C, v_ref=5, bus=SimulatedBus([device]))
+
+
+def test_unit_convert_voltages_to_codes_01():
+    """Codes are rounded and clamped to the DAC range"""
+    codes = AD5693.convert_voltages_to_codes(
+        np.array([-1.0, 0.0, 2.5, 5.0, 6.0]), v_ref=5.0
+    )
+    assert codes.dtype == np.uint16
+    assert codes.tolist() == [0, 0, 32768, DAC_MAX_CODE, DAC_MAX_CODE]
+
+
+def test_unit_convert_analog_to_digital_01():
+    """Scalars are rounded and clamped without going through NumPy"""
+    convert = AD5693.convert_analog_to_digital
+    assert convert(2.5, v_ref=5.0) == 32768
+    assert type(convert(2.5, v_ref=5.0)) is int
+    assert convert(-0.1, v_ref=5.0) == 0
+    assert convert(7, v_ref=5.0) == DAC_MAX_CODE
+    voltages = np.linspace(-1, 6, 101)
+    assert convert(voltages, v_ref=5.0).tolist() == [
+        convert(float(v), v_ref=5.0) for v in voltages
+    ]
+
+
+def test_unit_convert_voltages_to_frames_01():
+    """Bulk conversion yields the packed big-endian frames"""
+    voltages = np.array([0.0, 2.5, 9.0])
+    frames = AD5693.convert_voltages_to_frames(voltages, v_ref=5.0)
+    assert frames.tobytes() == AD5693.pack_codes(
+        AD5693.convert_voltages_to_codes(voltages, v_ref=5.0)
+    )
+
+
+def test_unit_send_command_01(device):
+    """Commands reach the device unchanged"""
+    dac = AD5693(device_address=0x4C, v_ref=5, bus=SimulatedBus([device]))
+    dac.set_voltage(1.25)
+    assert device.dac_register == dac.convert_analog_to_digital(1.25, 5)
+    assert device.voltage == pytest.approx(1.25, abs=1e-4)
+
+
+def test_unit_pack_codes_01():
+    """Codes are packed as big-endian byte pairs"""
+    assert AD5693.pack_codes(np.array([0x1234, 0xABCD])) == bytes(
+        [0x12, 0x34, 0xAB, 0xCD]
+    )
+
+
+def test_unit_compile_sine_wave_01(dac):
+    """One period is compiled and repeated to cover the duration"""
+    waveform = dac.compile_sine_wave(
+        frequency=1000, duration=0.01, sample_rate=8000
+    )
+    assert len(waveform.codes) == 8
+    assert waveform.repeat == 10
+    assert waveform.n_samples == 80
+    assert waveform.frequency == 1000
+    assert waveform.codes[0] == 32768
+    assert waveform.codes.max() == DAC_MAX_CODE
+    assert waveform.pairs[0] == [0x80, 0x00]
+
+
+def test_unit_compile_sine_wave_02(dac):
+    """Whole duration is compiled at the exact frequency"""
+    waveform = dac.compile_sine_wave(
+        frequency=300, duration=0.01, sample_rate=8000, loop_period=False
+    )
+    assert len(waveform.codes) == 80
+    assert waveform.repeat == 1
+    assert waveform.frequency == 300
+
+
+def test_unit_play_01(dac, device):
+    """Playback sends every precomputed frame and reports its rate"""
+    waveform = dac.compile_sine_wave(
+        frequency=2000, duration=0.002, sample_rate=8000
+    )
+    device.clear_timeline()
+    report = dac.play(waveform)
+    codes = device.timeline["code"]
+    assert report.n_samples == len(codes) == 16
+    assert report.requested_rate == 8000
+    assert report.achieved_rate > 0
+    assert codes[:4].tolist() == waveform.codes.tolist()
+
+
+def test_robust_compile_sine_wave_01(dac):
+    with pytest.raises(ValueError):
+        dac.compile_sine_wave(frequency=0, duration=1)
+
+
+def test_unit_play_02(dac):
+    """Playback reports the timing statistics of its schedule"""
+    waveform = dac.compile_sine_wave(
+        frequency=1000, duration=0.005, sample_rate=4000
+    )
+    report = dac.play(waveform, policy="drop")
+    assert report.timing.n_scheduled == 20
+    assert report.n_samples == report.timing.n_emitted
+    assert report.elapsed >= 19 / 4000
+
+
+def test_unit_init_01(device):
+    """String addresses are parsed and the control register is written"""
+    bus = SimulatedBus([device])
+    dac = AD5693(device_address="0x4C", v_ref=5, bus=bus)
+    assert dac.device_address == 0x4C
+    assert bus.n_transactions == 2
+
+
+def test_unit_set_voltage_01(dac, device):
+    dac.set_voltage(2.5)
+    assert device.dac_register == 32768
+    assert device.voltage == pytest.approx(2.5, abs=1e-3)
+
+
+def test_robust_init_01():
+    """A missing device fails like a NACK on a real bus"""
+    with pytest.raises(Exception):
+        AD5693(device_address=0x4D, bus=SimulatedBus())
+
+
+@pytest.mark.parametrize("repeated", [False, True])
+def test_unit_play_03(dac, device, repeated):
+    """Batched playback sends every sample, wrapping around the loop"""
+    waveform = dac.compile_sine_wave(
+        frequency=1000, duration=0.01, sample_rate=8000
+    )
+    device.clear_timeline()
+    report = dac.play(waveform, batch_size=12, repeated=repeated)
+    assert report.n_samples == 80
+    assert report.timing.n_scheduled == 7
+    assert device.timeline["code"].tolist() == waveform.codes.tolist() * 10
+
+
+def test_unit_set_voltage_02(dac, device):
+    """Writing the voltage already on the output is skipped"""
+    bus = dac.bus
+    dac.set_voltage(1.0)
+    n_transactions = bus.n_transactions
+    dac.set_voltage(1.0)
+    assert bus.n_transactions == n_transactions
+    assert dac.shadow.n_skipped == 1
+    dac.set_voltage(1.0, force=True)
+    assert bus.n_transactions == n_transactions + 1
+
+
+def test_unit_stage_voltage_01(dac, device):
+    """Staging tracks the input register until the output is updated"""
+    dac.stage_voltage(1.0)
+    code = device.input_register
+    assert dac.shadow.input == code
+    assert dac.shadow.dac == 0
+    dac.update_output()
+    assert dac.shadow.dac == device.dac_register == code
+    n_transactions = dac.bus.n_transactions
+    dac.set_voltage(1.0)
+    assert dac.bus.n_transactions == n_transactions
+
+
+def test_unit_update_control_register_01(dac, device):
+    """Control changes are written without a reset, unchanged ones skipped"""
+    dac.set_voltage(1.0)
+    bus = dac.bus
+    n_transactions = bus.n_transactions
+    dac.update_control_register(mode=0, internal_ref=True, gain=True)
+    assert bus.n_transactions == n_transactions + 1
+    assert device.control_register & device.GAIN_BIT
+    assert device.dac_register == dac.shadow.dac != 0
+    dac.update_control_register(mode=0, internal_ref=True, gain=True)
+    assert bus.n_transactions == n_transactions + 1
+
+
+def test_unit_resync_01(dac, device):
+    """Resync writes the device state whatever the shadow copy holds"""
+    dac.set_voltage(1.0)
+    device.control_register = 0x1234 & device.CONTROL_MASK
+    dac.resync()
+    assert device.dac_register == 0
+    assert device.control_register == dac.shadow.control
+    assert dac.shadow.dac == 0
+
+
+def test_unit_play_04(dac, device):
+    """Playback invalidates the cached data registers"""
+    dac.set_voltage(0.0, force=True)
+    dac.play(dac.compile_sine_wave(frequency=2000, duration=0.001))
+    assert dac.shadow.dac is None
+    dac.set_voltage(0.0)
+    assert device.dac_register == 0
+
+
+def test_unit_play_stream_01(dac, device):
+    """DDS chunks are encoded lazily and played back to back"""
+    engine = DDSEngine(sample_rate=8000, chunk_size=16)
+    engine.set_tones([Tone(1000, 0.5)])
+    device.clear_timeline()
+    stats = dac.play_stream(dac.compile_stream(engine.chunks(40), 8000))
+    codes = device.timeline["code"]
+    assert stats.n_samples == len(codes) == 40
+    assert stats.n_segments == 3
+    assert codes[0] == 32768
+    assert codes[2] == dac.convert_analog_to_digital(3.75, 5)
+
+
+def test_unit_generate_sweep_01(dac, device):
+    """A sweep is streamed to the output chunk by chunk"""
+    device.clear_timeline()
+    sweep = dac.generate_sweep(100, 1000, 0.01, sample_rate=8000)
+    codes = device.timeline["code"]
+    assert len(codes) == sweep.n_samples == 80
+    assert codes[0] == 32768
+
+
+def test_unit_play_file_01(dac, device, tmp_path):
+    """Raw files are streamed to the output at the requested rate"""
+    path = tmp_path / "signal.raw"
+    path.write_bytes(np.array([0, 16384, -16384, 0], "<i2").tobytes())
+    device.clear_timeline()
+    stats = dac.play_file(path, raw={"sample_rate": 8000})
+    assert stats.n_samples == 4
+    assert device.timeline["code"].tolist() == [32768, 49151, 16384, 32768]
@@ -0,0 +1,106 @@
+"""
+Test aio module.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.aio import AsyncAD5693, bus_executor
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.features.instrumentation import (
+    Instrumentation,
+    InstrumentedBus,
+)
+
+
+@pytest.fixture
+def device():
+    return SimulatedAD5693(address=0x4C, v_ref=5)
+
+
+@pytest.fixture
+def dac(device):
+    return AD5693(device_address=0x4C, v_ref=5, bus=SimulatedBus([device]))
+
+
+def test_unit_bus_executor_01(dac):
+    """DACs sharing a bus share its executor"""
+    other = AD5693(device_address=0x4C, v_ref=5, bus=dac.bus)
+    assert AsyncAD5693(dac).executor is AsyncAD5693(other).executor
+    assert bus_executor(SimulatedBus()) is not bus_executor(dac.bus)
+
+
+def test_unit_bus_executor_02():
+    """Handles opened on the same adapter share its executor"""
+
+    class AdapterBus(SimulatedBus):
+        def __init__(self, bus_number):
+            super().__init__()
+            self.bus_number = bus_number
+
+    metrics = Instrumentation()
+    first = AdapterBus(7)
+    assert bus_executor(first) is bus_executor(AdapterBus(7))
+    assert bus_executor(InstrumentedBus(first, metrics)) is bus_executor(first)
+    assert bus_executor(AdapterBus(8)) is not bus_executor(first)
+
+
+def test_unit_async_ad5693_01(dac, device):
+    """Writes are awaitable"""
+
+    async def scenario():
+        async_dac = AsyncAD5693(dac)
+        await async_dac.set_voltage(2.5)
+        assert device.dac_register == 32768
+        await async_dac.reset()
+        assert device.dac_register == 0
+
+    asyncio.run(scenario())
+
+
+def test_unit_async_ad5693_02(dac):
+    """The event loop keeps running while a waveform plays"""
+
+    async def scenario():
+        async_dac = AsyncAD5693(dac)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.create_task(ticker())
+        report = await async_dac.generate_sine_wave(
+            1000, 0.1, sample_rate=4000
+        )
+        task.cancel()
+        return report, ticks
+
+    report, ticks = asyncio.run(scenario())
+    assert report.n_samples == 400
+    assert ticks > 10
+
+
+def test_unit_async_ad5693_03(dac, device):
+    """Cancelling a playback stops it and parks the output at mid-scale"""
+
+    async def scenario():
+        async_dac = AsyncAD5693(dac)
+        waveform = dac.compile_sine_wave(1000, 10, sample_rate=4000)
+        task = asyncio.create_task(async_dac.play(waveform))
+        await asyncio.sleep(0.05)
+        assert async_dac.playing
+        start = time.perf_counter()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert time.perf_counter() - start < 1
+        assert not async_dac.playing
+
+    asyncio.run(scenario())
+    assert device.dac_register == 32768
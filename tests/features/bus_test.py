@@ -0,0 +1,113 @@
+"""
+Test bus module.
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from speaker_test_bench.features.bus import (
+    BusBackend,
+    SimulatedAD5693,
+    SimulatedBus,
+    SMBusBackend,
+)
+
+
+@pytest.fixture
+def device():
+    return SimulatedAD5693(address=0x4C, v_ref=5)
+
+
+def test_unit_simulated_ad5693_01(device):
+    """Input register is only transferred to the output on update"""
+    device.handle(0x10, [0x80, 0x00])
+    assert device.input_register == 0x8000
+    assert device.dac_register == 0
+    device.handle(0x20, [0x00, 0x00])
+    assert device.dac_register == 0x8000
+    device.handle(0x30, [0xFF, 0xFF])
+    assert device.input_register == device.dac_register == 0xFFFF
+    assert device.timeline["code"].tolist() == [0x8000, 0xFFFF]
+    assert device.voltage == pytest.approx(5)
+
+
+def test_unit_simulated_ad5693_02(device):
+    """Control register sets the gain and the reset bit clears registers"""
+    device.handle(0x30, [0x80, 0x00])
+    device.handle(0x40, [0x08, 0x00])
+    assert device.voltage == pytest.approx(5, abs=1e-3)
+    device.handle(0x40, [0x60, 0x00])
+    assert device.voltage == 0
+    device.handle(0x40, [0x80, 0x00])
+    assert device.control_register == 0
+    assert device.dac_register == 0
+    assert device.timeline["code"].tolist() == [0x8000, 0]
+
+
+def test_unit_simulated_bus_01(device):
+    """Transactions cost the configured latency"""
+    bus = SimulatedBus([device], latency_s=1e-3)
+    start = time.perf_counter_ns()
+    for _ in range(5):
+        bus.write_i2c_block_data(0x4C, 0x30, [0x12, 0x34])
+    assert time.perf_counter_ns() - start >= 5_000_000
+    assert bus.n_transactions == 5
+    assert np.all(np.diff(device.timeline["time_ns"]) >= 1_000_000)
+
+
+def test_robust_simulated_bus_01(device):
+    bus = SimulatedBus([device])
+    with pytest.raises(OSError):
+        bus.write_i2c_block_data(0x4D, 0x30, [0x12, 0x34])
+    with pytest.raises(OSError):
+        bus.write_i2c_block_data(0x4C, 0x70, [0x12, 0x34])
+
+
+@pytest.mark.parametrize("repeated", [False, True])
+def test_unit_simulated_bus_write_frames_01(device, repeated):
+    """Batched frames are applied in order in few transactions"""
+    bus = SimulatedBus([device])
+    codes = np.arange(100, dtype=np.uint16) * 600
+    bus.write_frames(0x4C, 0x30, codes.astype(">u2").tobytes(), repeated)
+    assert device.timeline["code"].tolist() == codes.tolist()
+    assert bus.n_transactions == (1 if repeated else 3)
+
+
+@pytest.mark.parametrize("repeated", [False, True])
+def test_unit_bus_backend_write_frames_01(device, repeated):
+    """The generic fallback sends one block write per frame or 32 bytes"""
+    bus = SimulatedBus([device])
+    codes = np.arange(40, dtype=np.uint16)
+    data = memoryview(codes.astype(">u2").tobytes())
+    BusBackend.write_frames(bus, 0x4C, 0x30, data, repeated)
+    assert device.timeline["code"].tolist() == codes.tolist()
+    assert bus.n_transactions == (3 if repeated else 40)
+
+
+@pytest.mark.parametrize("repeated", [False, True])
+def test_unit_smbus_backend_write_frames_01(monkeypatch, repeated):
+    """I2C_RDWR messages point into the payload with the expected frames"""
+    smbus2 = pytest.importorskip("smbus2")
+    unopened = smbus2.SMBus()
+    monkeypatch.setattr(smbus2, "SMBus", lambda bus_number: unopened)
+    backend = SMBusBackend(1)
+    sent = []
+
+    def fake_ioctl(fd, request, ioctl_data):
+        for index in range(ioctl_data.nmsgs):
+            msg = ioctl_data.msgs[index]
+            sent.append((msg.addr, bytes(msg)))
+
+    backend._ioctl = fake_ioctl
+    codes = np.array([0x1234, 0xABCD, 0x00FF], dtype=">u2")
+    backend.write_frames(0x4C, 0x30, codes.tobytes(), repeated)
+    if repeated:
+        assert sent == [(0x4C, bytes.fromhex("301234abcd00ff"))]
+    else:
+        assert sent == [
+            (0x4C, bytes.fromhex("301234")),
+            (0x4C, bytes.fromhex("30abcd")),
+            (0x4C, bytes.fromhex("3000ff")),
+        ]
@@ -0,0 +1,95 @@
+"""
+Test calibration module.
+"""
+
+import numpy as np
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.features.calibration import (
+    Calibration,
+    CalibrationStore,
+)
+
+
+@pytest.fixture
+def device():
+    return SimulatedAD5693(address=0x4C, v_ref=5)
+
+
+def test_unit_calibration_01():
+    """Linear fits invert the gain and offset error"""
+    requested = np.linspace(0, 5, 11)
+    calibration = Calibration.fit(0x4C, requested, 0.98 * requested + 0.01)
+    assert calibration.gain == pytest.approx(0.98)
+    assert calibration.offset == pytest.approx(0.01)
+    assert calibration.correct(1.0) == pytest.approx(0.99 / 0.98)
+
+
+def test_unit_calibration_02():
+    """Tables interpolate between points and extrapolate past the ends"""
+    calibration = Calibration(
+        0x4C, requested=[0.0, 2.0, 4.0], measured=[0.1, 2.0, 4.2]
+    )
+    corrected = calibration.correct(np.array([0.1, 1.05, 3.1, 4.2, 4.4]))
+    np.testing.assert_allclose(corrected, [0, 1, 3, 4, 4 + 0.2 / 1.1])
+    assert isinstance(calibration.correct(2.0), float)
+
+
+def test_unit_ad5693_calibration_01(device):
+    """Scalar, bulk and baked conversions agree on the corrected codes"""
+    calibration = Calibration(0x4C, gain=0.99, offset=-0.02)
+    bus = SimulatedBus([device])
+    dac = AD5693(0x4C, v_ref=5, bus=bus, calibration=calibration)
+    baked = AD5693(
+        0x4C, v_ref=5, bus=bus, calibration=calibration, bake_calibration=True
+    )
+    voltages = np.linspace(0.1, 4.9, 97)
+    bulk = dac.voltages_to_frames(voltages).tolist()
+    assert bulk == [dac.voltage_to_code(float(v)) for v in voltages]
+    for v, code in zip(voltages, bulk):
+        assert abs(baked.voltage_to_code(float(v)) - code) <= 1
+    dac.set_voltage(2.0)
+    measured = 0.99 * device.voltage - 0.02
+    assert measured == pytest.approx(2.0, abs=1e-4)
+
+
+def test_unit_ad5693_calibration_02(device):
+    """Compiled waveforms carry the correction"""
+    calibration = Calibration(0x4C, gain=2.0)
+    dac = AD5693(
+        0x4C, v_ref=5, bus=SimulatedBus([device]), calibration=calibration
+    )
+    waveform = dac.compile_signal(np.array([-1.0, 0.0, 1.0]), 8000)
+    assert waveform.codes.tolist() == [0, 16384, 32768]
+
+
+def test_unit_calibration_store_01(tmp_path):
+    """Profiles round-trip through the file, matched by bus and address"""
+    path = tmp_path / "calibration.json"
+    store = CalibrationStore(path)
+    store.put(Calibration(0x4C, gain=1.01))
+    store.put(
+        Calibration(0x4C, bus_number=3, requested=[0, 5], measured=[0, 4.9])
+    )
+    store.save()
+    loaded = CalibrationStore(path)
+    assert len(loaded) == 2
+    assert loaded.get(0x4C).gain == 1.01
+    assert loaded.get(0x4C, bus_number=3).measured == (0, 4.9)
+    assert loaded.get(0x4C, bus_number=1).gain == 1.01
+    assert loaded.get(0x4D) is None
+
+
+def test_robust_calibration_01(device):
+    with pytest.raises(ValueError):
+        Calibration(0x4C, requested=[0, 1], measured=[1, 0])
+    with pytest.raises(ValueError):
+        AD5693(
+            0x4C,
+            bus=SimulatedBus([device]),
+            calibration=Calibration(0x4D),
+        )
+    with pytest.raises(ValueError):
+        AD5693(0x4C, bus=SimulatedBus([device]), bake_calibration=True)
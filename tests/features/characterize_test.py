@@ -0,0 +1,97 @@
+"""
+Test characterize module.
+"""
+
+import json
+
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.features.characterize import (
+    Strategy,
+    characterize,
+    main,
+    run,
+)
+
+STRATEGIES = (Strategy("single"), Strategy("batch-32", 32))
+
+
+class FlakyBus(SimulatedBus):
+    """Simulated bus failing every other single write once armed"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.n_calls = 0
+        self.armed = False
+
+    def write_i2c_block_data(self, address, register, data):
+        self.n_calls += 1
+        if self.armed and self.n_calls % 2 == 0:
+            raise OSError(5, "Input/output error")
+        super().write_i2c_block_data(address, register, data)
+
+
+@pytest.fixture
+def dac():
+    bus = SimulatedBus(
+        [SimulatedAD5693(0x4C)], latency_s=100e-6, byte_time_s=5e-6
+    )
+    return AD5693(0x4C, bus=bus)
+
+
+def test_unit_characterize_01(dac):
+    """Batching raises the throughput and the recommended rate"""
+    characterization = characterize(dac, duration=0.05, strategies=STRATEGIES)
+    single, batched = characterization.results
+    assert single.n_errors == 0 and single.reliable
+    assert batched.samples_per_s > 2 * single.samples_per_s
+    # One transaction costs at least the 100 us latency and 3 bytes
+    assert single.max_sample_rate < 0.8 * 1e6 / 115
+    assert characterization.best is batched
+    assert characterization.recommended_rate == batched.max_sample_rate
+
+
+def test_unit_characterize_02(tmp_path):
+    """The command runs on the simulated bus and writes JSON results"""
+    path = tmp_path / "bus.json"
+    characterization = run(
+        ["--simulated", "--duration", "0.02", "--json", str(path)]
+    )
+    data = json.loads(path.read_text())
+    assert data["recommended_rate"] == characterization.recommended_rate
+    assert data["recommended_strategy"]["batch_size"] > 1
+    assert len(data["results"]) == 6
+
+
+def test_unit_characterize_03(capsys):
+    """The console script exits with a success status"""
+    assert main(["--simulated", "--duration", "0.01"]) == 0
+    assert "Recommended sample rate" in capsys.readouterr().out
+
+
+def test_robust_characterize_01():
+    """Failing writes are counted and make the strategy unreliable"""
+    bus = FlakyBus([SimulatedAD5693(0x4C)])
+    dac = AD5693(0x4C, bus=bus)
+    bus.armed = True
+    characterization = characterize(
+        dac, duration=0.02, strategies=STRATEGIES[:1]
+    )
+    (result,) = characterization.results
+    assert result.error_rate == pytest.approx(0.5, abs=0.01)
+    assert not result.reliable
+    assert characterization.best is None
+    assert characterization.recommended_rate == 0.0
+
+
+def test_robust_characterize_02():
+    """A missing device stops the measurement early"""
+    dac = AD5693(0x4C, bus=SimulatedBus([SimulatedAD5693(0x4C)]))
+    dac.device_address = 0x4D
+    characterization = characterize(dac, duration=5, strategies=STRATEGIES[:1])
+    assert characterization.results[0].n_errors == 100
+    assert characterization.results[0].elapsed < 1
+    with pytest.raises(ValueError):
+        characterize(dac, headroom=0)
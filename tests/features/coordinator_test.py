@@ -0,0 +1,152 @@
+"""
+Test coordinator module.
+"""
+
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import (
+    NackError,
+    SimulatedAD5693,
+    SimulatedBus,
+)
+from speaker_test_bench.features.coordinator import MultiDACCoordinator
+from speaker_test_bench.features.readback import ReadbackPolicy
+from speaker_test_bench.features.transport import RetryPolicy
+
+
+@pytest.fixture
+def rack():
+    """Two DACs on a shared bus and one on a second bus"""
+    devices = [SimulatedAD5693(address=a) for a in (0x4C, 0x4D, 0x4C)]
+    shared = SimulatedBus(devices[:2])
+    other = SimulatedBus(devices[2:])
+    dacs = [
+        AD5693(0x4C, bus=shared),
+        AD5693(0x4D, bus=shared),
+        AD5693(0x4C, bus=other),
+    ]
+    for device in devices:
+        device.clear_timeline()
+    return dacs, devices
+
+
+def test_unit_coordinator_01(rack):
+    """DACs are grouped by bus"""
+    dacs, _ = rack
+    coordinator = MultiDACCoordinator(dacs)
+    assert sorted(coordinator.groups.values()) == [[0, 1], [2]]
+
+
+def test_unit_coordinator_02(rack):
+    """Each channel plays its own waveform from a shared start"""
+    dacs, devices = rack
+    tones = [
+        dacs[0].compile_sine_wave(1000, 0.02, sample_rate=4000),
+        dacs[1].compile_sine_wave(500, 0.01, sample_rate=4000),
+        dacs[2].compile_sine_wave(250, 0.02, sample_rate=2000),
+    ]
+    reports = MultiDACCoordinator(dacs).play(tones)
+    for tone, device, report in zip(tones, devices, reports):
+        codes = device.timeline["code"].tolist()
+        assert codes == tone.codes.tolist() * tone.repeat
+        assert report.n_samples == tone.n_samples
+    starts = [device.timeline["time_ns"][0] for device in devices]
+    assert max(starts) - min(starts) < 5_000_000
+
+
+def test_unit_coordinator_03(rack):
+    """Idle channels are left untouched"""
+    dacs, devices = rack
+    tone = dacs[0].compile_sine_wave(1000, 0.01, sample_rate=4000)
+    reports = MultiDACCoordinator(dacs).play([None, tone, None])
+    assert reports[0] is None and reports[2] is None
+    assert reports[1].n_samples == tone.n_samples
+    assert len(devices[0].timeline["code"]) == 0
+
+
+def test_unit_coordinator_04(rack):
+    """Coordinated playback records metrics, spans and readback checks"""
+    dacs, _ = rack
+    dacs[2] = AD5693(0x4C, bus=dacs[2].bus, readback=ReadbackPolicy(every=10))
+    metrics = dacs[0].instrument()
+    dacs[2].instrument(metrics=metrics)
+    tracer = dacs[1].profile()
+    tones = [
+        dac.compile_sine_wave(1000, 0.01, sample_rate=4000) for dac in dacs
+    ]
+    MultiDACCoordinator(dacs).play(tones)
+    assert metrics.n_scheduled == 2 * 40
+    assert metrics.lateness.n_values == 2 * 40
+    names = {event["name"] for event in tracer.events()}
+    assert "scheduler.wait" in names
+    assert dacs[2].readback.stats.n_reads == 40 // 10 + 1
+    assert dacs[2].readback.stats.n_mismatches == 0
+
+
+def test_robust_coordinator_01(rack):
+    dacs, _ = rack
+    coordinator = MultiDACCoordinator(dacs)
+    tone = dacs[0].compile_sine_wave(1000, 0.01, sample_rate=4000)
+    other = dacs[0].compile_sine_wave(1000, 0.01, sample_rate=8000)
+    with pytest.raises(ValueError):
+        coordinator.play([tone, other, None])
+    with pytest.raises(ValueError):
+        coordinator.play([tone])
+
+
+def test_unit_coordinator_staged_01(rack):
+    """Staged voltages only reach the outputs on commit"""
+    dacs, devices = rack
+    coordinator = MultiDACCoordinator(dacs)
+    coordinator.stage([1.0, 2.0, 3.0])
+    assert [d.dac_register for d in devices] == [0, 0, 0]
+    report = coordinator.commit()
+    assert report.n_channels == 3
+    assert [d.voltage for d in devices] == pytest.approx(
+        [1.0, 2.0, 3.0], abs=1e-3
+    )
+
+
+def test_unit_coordinator_staged_02(rack):
+    """Staged updates latch the channels of a bus closer together"""
+    dacs, devices = rack
+    for dac in dacs:
+        dac.bus.latency_ns = 200_000
+    coordinator = MultiDACCoordinator(dacs[:2])
+    comparison = coordinator.compare_skew([1.0, 2.0], n_trials=5)
+    assert comparison.staged_ns < comparison.sequential_ns
+    assert comparison.improvement > 1
+    devices[0].clear_timeline()
+    devices[1].clear_timeline()
+    coordinator.set_voltages([0.5, 4.5])
+    skew = (
+        devices[1].timeline["time_ns"][0] - devices[0].timeline["time_ns"][0]
+    )
+    assert 0 <= skew < 200_000
+
+
+def test_unit_coordinator_staged_03(rack):
+    """Updates go through the wrappers of each DAC"""
+    dacs, devices = rack
+    metrics = dacs[1].instrument()
+    coordinator = MultiDACCoordinator(dacs[:2])
+    coordinator.stage([1.0, 2.0])
+    n_staged = metrics.n_transactions
+    coordinator.commit()
+    assert metrics.n_transactions == n_staged + 1
+    assert [d.voltage for d in devices[:2]] == pytest.approx(
+        [1.0, 2.0], abs=1e-3
+    )
+
+
+def test_robust_coordinator_staged_01():
+    """Typed bus errors of an update are raised unchanged"""
+    bus = SimulatedBus([SimulatedAD5693(address=a) for a in (0x4C, 0x4D)])
+    retry = RetryPolicy(max_consecutive_drops=10)
+    dacs = [AD5693(a, bus=bus, retry=retry) for a in (0x4C, 0x4D)]
+    coordinator = MultiDACCoordinator(dacs)
+    coordinator.stage([1.0, 2.0])
+    bus.error_rate = 1.0
+    with pytest.raises(NackError):
+        coordinator.commit()
@@ -0,0 +1,118 @@
+"""
+Test disk_cache module.
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.features.disk_cache import WaveformDiskCache
+from speaker_test_bench.features.stimulus import StimulusCache
+
+
+@pytest.fixture
+def device():
+    return SimulatedAD5693(address=0x4C, v_ref=5)
+
+
+@pytest.fixture
+def dac(device):
+    return AD5693(device_address=0x4C, v_ref=5, bus=SimulatedBus([device]))
+
+
+def test_unit_waveform_disk_cache_01(tmp_path, dac, device):
+    """Stored waveforms come back memory-mapped and play unchanged"""
+    cache = WaveformDiskCache(tmp_path)
+    waveform = dac.compile_sine_wave(1000, 0.01, sample_rate=8000)
+    key = ("sine", 1000, 8000, dac.v_ref)
+    assert cache.get(key) is None
+    stored = cache.put(key, waveform)
+    loaded = cache.get(key)
+    assert isinstance(loaded.codes, np.memmap)
+    assert loaded.codes.tolist() == waveform.codes.tolist()
+    assert loaded.repeat == 10 and loaded.frequency == 1000
+    assert bytes(stored.frames) == waveform.frames
+    device.clear_timeline()
+    dac.play(loaded, batch_size=4)
+    assert device.timeline["code"].tolist() == waveform.codes.tolist() * 10
+    assert cache.stats.n_hits == 1 and cache.stats.n_misses == 1
+    assert not [n for n in os.listdir(tmp_path) if n.endswith(".tmp")]
+
+
+def test_unit_waveform_disk_cache_02(tmp_path, dac):
+    """Streams are written chunk by chunk into a single entry"""
+    cache = WaveformDiskCache(tmp_path)
+    chunks = [np.linspace(-1, 1, 5), np.zeros(3)]
+    stored = cache.put_stream(
+        "chunks", dac.compile_stream(chunks, 8000), sample_rate=8000
+    )
+    assert stored.n_samples == 8
+    assert stored.codes[-1] == 32768
+
+
+def test_unit_waveform_disk_cache_03(tmp_path, dac):
+    """The least recently used entries are evicted above the size limit"""
+    cache = WaveformDiskCache(tmp_path, max_bytes=3 * 200)
+    for i in range(3):
+        cache.put(i, dac.compile_signal(np.zeros(100), 8000))
+        os.utime(cache._path(cache.digest(i), ".u2"), (i, i))
+    cache.get(0)
+    cache.put(3, dac.compile_signal(np.zeros(100), 8000))
+    assert [cache.get(i) is not None for i in range(4)] == [
+        True,
+        False,
+        True,
+        True,
+    ]
+    assert cache.stats.n_evictions == 1
+    assert cache.n_bytes == 600
+    big = dac.compile_signal(np.zeros(1000), 8000)
+    assert cache.put("big", big) is big
+    cache.clear()
+    assert cache.entries() == []
+
+
+def _writer(directory, index):
+    device = SimulatedAD5693(address=0x4C, v_ref=5)
+    dac = AD5693(0x4C, v_ref=5, bus=SimulatedBus([device]))
+    cache = WaveformDiskCache(directory, max_bytes=8 * 2000)
+    for i in range(20):
+        key = ("shared", (index + i) % 12)
+        signal = np.full(1000, key[1] / 12)
+        cache.get_or_compile(key, lambda: dac.compile_signal(signal, 8000))
+
+
+def test_unit_waveform_disk_cache_04(tmp_path, dac):
+    """Several processes share a directory without corrupting entries"""
+    processes = [
+        multiprocessing.Process(target=_writer, args=(str(tmp_path), i))
+        for i in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+    cache = WaveformDiskCache(tmp_path, max_bytes=8 * 2000)
+    assert cache.n_bytes <= cache.max_bytes
+    for i in range(12):
+        waveform = cache.get(("shared", i))
+        if waveform is not None:
+            expected = dac.compile_signal(np.full(1000, i / 12), 8000)
+            assert waveform.codes.tolist() == expected.codes.tolist()
+
+
+def test_unit_stimulus_cache_disk_01(tmp_path, dac):
+    """A fresh memory cache finds stimuli synthesized by an earlier run"""
+    params = dict(duration=0.05, seed=7)
+    first = StimulusCache(disk=WaveformDiskCache(tmp_path))
+    waveform = first.get(dac, "pink_noise", 8000, **params)
+    second = StimulusCache(disk=WaveformDiskCache(tmp_path))
+    loaded = second.get(dac, "pink_noise", 8000, **params)
+    assert second.disk.stats.n_hits == 1
+    assert loaded.codes.tolist() == waveform.codes.tolist()
+    assert second.stats.n_bytes == 800
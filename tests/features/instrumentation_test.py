@@ -0,0 +1,137 @@
+"""
+Test instrumentation module.
+"""
+
+import json
+
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.features.instrumentation import (
+    Instrumentation,
+    InstrumentedBus,
+)
+from speaker_test_bench.library.util import CustomEncoder
+
+
+@pytest.fixture
+def bus():
+    return SimulatedBus([SimulatedAD5693(address=0x4C)], latency_s=1e-4)
+
+
+def test_unit_instrumentation_01(bus):
+    """Transactions are counted and timed through the DAC"""
+    dac = AD5693(0x4C, bus=bus)
+    metrics = dac.instrument()
+    assert isinstance(dac.bus, InstrumentedBus)
+    assert dac.bus.n_transactions == bus.n_transactions
+    for voltage in (1.0, 2.0, 3.0):
+        dac.set_voltage(voltage)
+    assert metrics.n_transactions == 3
+    assert metrics.n_samples == 3
+    assert metrics.n_bytes == 9
+    assert metrics.latency.min >= 100_000
+    assert metrics.throughput["transactions"] > 0
+
+
+def test_unit_instrumentation_02(bus):
+    """Playback records the lateness of every sample"""
+    dac = AD5693(0x4C, bus=bus)
+    metrics = dac.instrument()
+    waveform = dac.compile_sine_wave(100, 0.05, sample_rate=1000)
+    report = dac.play(waveform, batch_size=10)
+    assert metrics.n_scheduled == report.timing.n_scheduled == 5
+    assert metrics.lateness.n_values == report.timing.n_emitted
+    assert metrics.n_samples == 50
+    data = json.loads(json.dumps(metrics.as_dict(), cls=CustomEncoder))
+    assert data["timing"]["n_scheduled"] == 5
+    assert data["latency_ns"]["n_values"] == metrics.n_transactions
+
+
+def test_unit_instrumentation_03(bus):
+    """Disabling restores the raw bus and stops recording"""
+    dac = AD5693(0x4C, bus=bus)
+    metrics = dac.instrument()
+    assert dac.instrument() is metrics
+    assert dac.bus.bus is bus
+    assert dac.instrument(False) is None
+    assert dac.bus is bus and dac.metrics is None
+    dac.set_voltage(1.0)
+    assert metrics.n_transactions == 0
+
+
+def test_unit_instrumentation_04(bus):
+    """Buffers are passed through as given, iterators are counted"""
+    metrics = Instrumentation()
+    instrumented = InstrumentedBus(bus, metrics)
+    data = bytes([0x80, 0x00])
+    instrumented.write_i2c_block_data(0x4C, 0x30, data)
+    instrumented.write_i2c_block_data(0x4C, 0x30, iter(data))
+    assert metrics.n_bytes == 6
+    assert bus.devices[0x4C].dac_register == 0x8000
+
+
+def test_robust_instrumentation_01(bus):
+    """Errors are counted by type and re-raised"""
+    metrics = Instrumentation()
+    instrumented = InstrumentedBus(bus, metrics)
+    with pytest.raises(OSError):
+        instrumented.write_i2c_block_data(0x4D, 0x30, [0, 0])
+    metrics.record_retry()
+    assert metrics.n_errors == 1
+    assert metrics.errors == {"OSError": 1}
+    assert metrics.n_retries == 1
+    assert metrics.n_transactions == 0
+    metrics.reset()
+    assert metrics.as_dict()["errors"] == {}
+
+
+def test_unit_profile_01(bus):
+    """Profiling records nested spans from the DAC down to the bus"""
+    dac = AD5693(0x4C, bus=bus)
+    tracer = dac.profile()
+    dac.set_voltage(1.0)
+    dac.update_control_register(mode=0x01, internal_ref=True, gain=False)
+    names = [event["name"] for event in tracer.events()]
+    assert names == [
+        "ad5693.convert_analog_to_digital",
+        "bus.write",
+        "ad5693.send_command",
+        "bus.write",
+        "ad5693.send_command",
+        "ad5693.update_control_register",
+    ]
+    dac.play(dac.compile_sine_wave(100, 0.01, sample_rate=1000))
+    names = {event["name"] for event in tracer.events()}
+    assert names == {"scheduler.wait", "bus.write"}
+
+
+def test_unit_profile_02(bus):
+    """Disabling removes every wrapper, profiling and metrics compose"""
+    dac = AD5693(0x4C, bus=bus)
+    metrics = dac.instrument()
+    tracer = dac.profile()
+    assert dac.profile() is tracer
+    dac.instrument(False)
+    assert type(dac.bus).__name__ == "TracedBus" and dac.bus.bus is bus
+    dac.profile(False)
+    assert dac.bus is bus and dac.tracer is None
+    assert "send_command" not in vars(dac)
+    dac.set_voltage(2.0)
+    assert tracer.events() == [] and metrics.n_transactions == 0
+
+
+def test_unit_profile_03(bus):
+    """Metrics disabled under a profiled bus stop counting"""
+    dac = AD5693(0x4C, bus=bus)
+    metrics = dac.instrument()
+    tracer = dac.profile()
+    dac.set_voltage(1.0)
+    assert metrics.n_transactions == 1
+    dac.instrument(False)
+    dac.set_voltage(2.0)
+    dac.play(dac.compile_sine_wave(100, 0.01, sample_rate=1000))
+    assert metrics.n_transactions == 1
+    names = [event["name"] for event in tracer.events()]
+    assert names.count("bus.write") == 12
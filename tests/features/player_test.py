@@ -0,0 +1,91 @@
+"""
+Test player module.
+"""
+
+import time
+
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.features.player import FrameRing
+
+
+@pytest.fixture
+def device():
+    return SimulatedAD5693(address=0x4C, v_ref=5)
+
+
+@pytest.fixture
+def dac(device):
+    return AD5693(device_address=0x4C, v_ref=5, bus=SimulatedBus([device]))
+
+
+def test_unit_frame_ring_01():
+    """Ring keeps order and refuses items when full"""
+    ring = FrameRing(capacity=2)
+    assert ring.put("a", timeout=0)
+    assert ring.put("b", timeout=0)
+    assert not ring.put("c", timeout=0)
+    assert ring.get(timeout=0) == "a"
+    assert ring.put("c", timeout=0)
+    assert [ring.get(timeout=0) for _ in range(3)] == ["b", "c", None]
+
+
+def test_unit_waveform_player_01(dac, device):
+    """Queued waveforms play in order, gaplessly, without blocking"""
+    first = dac.compile_sine_wave(1000, 0.02, sample_rate=4000)
+    second = dac.compile_sine_wave(500, 0.02, sample_rate=4000)
+    device.clear_timeline()
+    with dac.player() as player:
+        start = time.perf_counter()
+        player.queue(first)
+        player.queue(second)
+        assert time.perf_counter() - start < 0.01
+        assert player.wait(timeout=5)
+    timeline = device.timeline
+    expected = first.codes.tolist() * first.repeat
+    expected += second.codes.tolist() * second.repeat
+    assert timeline["code"].tolist() == expected
+    elapsed_ns = timeline["time_ns"][-1] - timeline["time_ns"][0]
+    assert elapsed_ns < (len(expected) + 20) * 1e9 / 4000
+    assert player.stats.n_segments == 2
+    assert player.stats.n_samples == len(expected)
+    assert player.stats.n_underruns == 0
+
+
+def test_unit_waveform_player_02(dac):
+    """A segment queued too late is counted as an underrun"""
+    waveform = dac.compile_sine_wave(1000, 0.005, sample_rate=4000)
+    with dac.player() as player:
+        player.queue(waveform)
+        time.sleep(0.05)
+        player.queue(waveform)
+        player.wait(timeout=5)
+    assert player.stats.n_underruns == 1
+    assert player.stats.n_segments == 2
+
+
+def test_unit_waveform_player_03(dac):
+    """Stop interrupts playback and drops queued waveforms"""
+    waveform = dac.compile_sine_wave(1000, 10, sample_rate=4000)
+    player = dac.player().start()
+    player.queue(waveform)
+    player.queue(waveform)
+    time.sleep(0.02)
+    player.stop(timeout=5)
+    assert not player.running
+    assert player.stats.n_segments == 0
+    assert player.stats.n_samples < waveform.n_samples
+    assert player.wait(timeout=0)
+
+
+def test_robust_waveform_player_01(dac, device):
+    """Bus errors raised on the output thread are re-raised to the caller"""
+    waveform = dac.compile_sine_wave(1000, 0.005, sample_rate=4000)
+    dac.bus.devices.clear()
+    player = dac.player().start()
+    player.queue(waveform)
+    with pytest.raises(Exception):
+        player.wait(timeout=5)
+    player.stop()
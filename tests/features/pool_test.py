@@ -0,0 +1,158 @@
+"""
+Test pool module.
+"""
+
+import contextlib
+import threading
+import time
+
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.features.coordinator import bus_key
+from speaker_test_bench.features.pool import BusPool
+from speaker_test_bench.features.transport import RetryPolicy
+
+
+class TrackedBus(SimulatedBus):
+    """Simulated bus recording its closing and overlapping transactions"""
+
+    def __init__(self, bus_number):
+        super().__init__(
+            [SimulatedAD5693(address=0x4C), SimulatedAD5693(address=0x4D)]
+        )
+        self.bus_number = bus_number
+        self.closed = False
+        self.n_overlaps = 0
+        self.n_reopens = 0
+        self._busy = False
+
+    def write_i2c_block_data(self, address, register, data):
+        with self._exclusive():
+            super().write_i2c_block_data(address, register, data)
+
+    def reopen(self):
+        with self._exclusive():
+            self.n_reopens += 1
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        if self._busy:
+            self.n_overlaps += 1
+        self._busy = True
+        try:
+            time.sleep(0)
+            yield
+        finally:
+            self._busy = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool():
+    return BusPool(TrackedBus)
+
+
+def test_unit_pool_01(pool):
+    """DACs on the same bus number share one counted handle"""
+    left = AD5693(0x4C, bus_number=1, pool=pool)
+    right = AD5693(0x4D, bus_number=1, pool=pool)
+    other = AD5693(0x4C, bus_number=2, pool=pool)
+    backend = left.bus.bus
+    assert right.bus.bus is backend
+    assert other.bus.bus is not backend
+    assert len(pool) == 2
+    assert pool.n_leases(1) == 2
+    assert bus_key(left.bus) == bus_key(right.bus) == ("i2c", 1)
+    left.close()
+    left.close()
+    assert pool.n_leases(1) == 1
+    assert not backend.closed
+    with right:
+        right.set_voltage(1.0)
+    assert pool.n_leases(1) == 0
+    assert backend.closed
+    assert len(pool) == 1
+    pool.close_all()
+    assert other.bus.bus.closed
+    other.close()
+    assert len(pool) == 0
+
+
+def test_unit_pool_02(pool):
+    """A bus given to the constructor is left to its owner"""
+    bus = TrackedBus(3)
+    with AD5693(0x4C, bus=bus, pool=pool) as dac:
+        dac.set_voltage(1.0)
+    assert not bus.closed
+    assert len(pool) == 0
+
+
+def test_unit_pool_03(pool):
+    """Coalesced writes to a bus go out in one combined transfer"""
+    left = AD5693(0x4C, bus_number=1, pool=pool)
+    right = AD5693(0x4D, bus_number=1, pool=pool)
+    backend = left.bus.bus
+    n_transactions = backend.n_transactions
+    with left.coalesce():
+        left.set_voltage(1.0)
+        right.set_voltage(4.0)
+        assert backend.devices[0x4C].voltage == 0.0
+    assert backend.n_transactions == n_transactions + 1
+    assert backend.devices[0x4C].voltage == pytest.approx(1.0, abs=1e-3)
+    assert backend.devices[0x4D].voltage == pytest.approx(4.0, abs=1e-3)
+
+
+def test_unit_pool_04(pool):
+    """Threads sharing a bus never overlap their transactions"""
+    dacs = [
+        AD5693(address, bus_number=1, pool=pool)
+        for address in (0x4C, 0x4D, 0x4C, 0x4D)
+    ]
+    backend = dacs[0].bus.bus
+
+    def drive(dac):
+        for i in range(200):
+            dac.set_voltage(i % 5, force=True)
+
+    threads = [threading.Thread(target=drive, args=(dac,)) for dac in dacs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.n_overlaps == 0
+    assert backend.devices[0x4C].n_frames >= 400
+
+
+def test_unit_pool_05(pool):
+    """Recovery reopens a pooled bus under the lock of its leases"""
+    dacs = [
+        AD5693(address, bus_number=1, pool=pool, retry=RetryPolicy())
+        for address in (0x4C, 0x4D)
+    ]
+    backend = dacs[0].lease.bus
+
+    def drive(dac):
+        for i in range(200):
+            dac.set_voltage(i % 5, force=True)
+
+    thread = threading.Thread(target=drive, args=(dacs[1],))
+    thread.start()
+    for _ in range(50):
+        dacs[0].transport.recover()
+    thread.join()
+    assert backend.n_reopens == 50
+    assert backend.n_overlaps == 0
+    pool.reopen(2)
+    assert backend.n_reopens == 50
+
+
+def test_robust_pool_01(pool):
+    """A DAC failing to initialize gives its lease back"""
+    with pytest.raises(Exception, match="No device"):
+        AD5693(0x50, bus_number=1, pool=pool)
+    assert pool.n_leases(1) == 0
+    assert len(pool) == 0
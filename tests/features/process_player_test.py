@@ -0,0 +1,139 @@
+"""
+Test process_player module.
+"""
+
+import time
+
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import (
+    NackError,
+    SimulatedAD5693,
+    SimulatedBus,
+)
+from speaker_test_bench.features.process_player import ProcessWaveformPlayer
+from speaker_test_bench.features.transport import RetryPolicy
+
+
+def simulated_bus():
+    return SimulatedBus([SimulatedAD5693(address=0x4C, v_ref=5)])
+
+
+def slow_bus():
+    return SimulatedBus(
+        [SimulatedAD5693(address=0x4C, v_ref=5)], latency_s=0.0015
+    )
+
+
+def faulty_bus():
+    return SimulatedBus(
+        [SimulatedAD5693(address=0x4C, v_ref=5)], error_rate=1.0
+    )
+
+
+def empty_bus():
+    return SimulatedBus()
+
+
+@pytest.fixture
+def dac():
+    return AD5693(device_address=0x4C, v_ref=5, bus=simulated_bus())
+
+
+def test_unit_process_player_01(dac):
+    """Queued waveforms are played by the writer process"""
+    first = dac.compile_sine_wave(1000, 0.02, sample_rate=4000)
+    second = dac.compile_sine_wave(500, 0.02, sample_rate=4000)
+    with dac.player(process=True, bus_factory=simulated_bus) as player:
+        player.queue(first)
+        player.queue(second)
+        assert player.wait(timeout=10)
+    assert not player.running
+    assert player.stats.n_segments == 2
+    assert player.stats.n_samples == first.n_samples + second.n_samples
+    assert player.stats.n_handoffs == 2
+    assert player.stats.max_handoff_ns > 0
+
+
+def test_unit_process_player_02(dac):
+    """Waveforms larger than a slot are split over several slots"""
+    waveform = dac.compile_sine_wave(
+        100, 0.05, sample_rate=4000, loop_period=False
+    )
+    player = ProcessWaveformPlayer(
+        dac, slot_bytes=64, batch_size=8, bus_factory=simulated_bus
+    )
+    with player:
+        player.queue(waveform)
+        assert player.wait(timeout=10)
+    assert player.stats.n_segments == -(-waveform.n_samples * 2 // 64)
+    assert player.stats.n_samples == waveform.n_samples
+
+
+def test_unit_process_player_03(dac):
+    """Stop interrupts playback"""
+    waveform = dac.compile_sine_wave(1000, 10, sample_rate=4000)
+    player = dac.player(process=True, bus_factory=simulated_bus).start()
+    player.queue(waveform)
+    time.sleep(0.2)
+    player.stop(timeout=5)
+    assert not player.running
+    assert player.stats.n_segments == 0
+    assert 0 < player.stats.n_samples < waveform.n_samples
+
+
+def test_unit_process_player_04(dac):
+    """The schedule of the writer is recorded through the instrumentation"""
+    metrics = dac.instrument()
+    waveform = dac.compile_sine_wave(1000, 0.02, sample_rate=4000)
+    with dac.player(process=True, bus_factory=simulated_bus) as player:
+        player.queue(waveform)
+        player.queue(waveform)
+        assert player.wait(timeout=10)
+    assert metrics.n_scheduled == 2 * waveform.n_samples
+    assert metrics.lateness.n_values == 2 * waveform.n_samples
+
+
+def test_unit_process_player_05(dac):
+    """Segments overrunning their schedule are not counted as underruns"""
+    waveform = dac.compile_sine_wave(100, 0.02, sample_rate=1000)
+    with dac.player(process=True, bus_factory=slow_bus) as player:
+        for _ in range(3):
+            player.queue(waveform)
+        assert player.wait(timeout=10)
+    assert player.stats.n_segments == 3
+    assert player.stats.n_late > 0
+    assert player.stats.n_underruns == 0
+
+
+def test_robust_process_player_01(dac):
+    """Errors in the writer process are re-raised to the caller"""
+    waveform = dac.compile_sine_wave(1000, 0.005, sample_rate=4000)
+    player = dac.player(process=True, bus_factory=empty_bus).start()
+    player.queue(waveform)
+    with pytest.raises(Exception, match="No device"):
+        player.wait(timeout=10)
+    player.stop()
+
+
+def test_robust_process_player_02():
+    """Typed bus errors of the writer are re-raised with their type"""
+    dac = AD5693(
+        device_address=0x4C,
+        v_ref=5,
+        bus=simulated_bus(),
+        retry=RetryPolicy(max_consecutive_drops=10),
+    )
+    waveform = dac.compile_sine_wave(1000, 0.005, sample_rate=4000)
+    player = dac.player(process=True, bus_factory=faulty_bus).start()
+    player.queue(waveform)
+    with pytest.raises(NackError):
+        player.wait(timeout=10)
+    player.stop()
+
+
+def test_robust_process_player_03(dac):
+    """A bus factory is required for non-smbus backends"""
+    with pytest.raises(ValueError):
+        dac.player(process=True)
@@ -0,0 +1,166 @@
+"""
+Test readback module.
+"""
+
+import errno
+
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.features.readback import ReadbackPolicy
+from speaker_test_bench.features.transport import RetryPolicy
+
+
+@pytest.fixture
+def device():
+    return SimulatedAD5693(address=0x4C, v_ref=5)
+
+
+@pytest.fixture
+def bus(device):
+    return SimulatedBus([device])
+
+
+def test_unit_readback_01(bus, device):
+    """The simulated bus reads the registers selected by the command"""
+    dac = AD5693(0x4C, bus=bus)
+    dac.set_voltage(2.5)
+    dac.stage_voltage(1.0)
+    code = dac.voltage_to_code(1.0)
+    assert bus.read_i2c_block_data(0x4C, 0x10, 2) == list(
+        code.to_bytes(2, "big")
+    )
+    blocks = bus.read_transactions(
+        [(0x4C, 0x10, 2), (0x4C, 0x30, 2), (0x4C, 0x40, 2)]
+    )
+    assert [int.from_bytes(block, "big") for block in blocks] == [
+        code,
+        device.dac_register,
+        device.control_register,
+    ]
+    assert device.n_reads == 4
+
+
+def test_unit_readback_02(bus, device):
+    """Writes outside playback are checked every N samples"""
+    dac = AD5693(0x4C, bus=bus, readback=ReadbackPolicy(every=4))
+    metrics = dac.instrument()
+    for voltage in (1.0, 2.0, 3.0, 4.0) * 2:
+        dac.set_voltage(voltage)
+    stats = dac.readback.stats
+    assert stats.n_reads == 2
+    assert stats.n_checked == 6
+    assert stats.n_mismatches == 0
+    assert metrics.n_verified == 6
+    assert metrics.n_transactions == 8
+
+
+def test_unit_readback_03(bus, device):
+    """Mismatches are recorded through the instrumentation"""
+    dac = AD5693(0x4C, bus=bus, readback=ReadbackPolicy(every=1))
+    metrics = dac.instrument()
+    dac.set_voltage(1.0)
+    # Output changed behind the back of the driver, e.g. a glitch
+    device.dac_register = 0
+    dac.stage_voltage(2.0)
+    code = dac.voltage_to_code(1.0)
+    stats = dac.readback.stats
+    assert stats.n_reads == 2
+    assert stats.n_mismatches == 1
+    assert stats.last_mismatch == {
+        "register": "dac",
+        "expected": code,
+        "actual": 0,
+    }
+    assert metrics.n_mismatches == 1
+    readback = metrics.as_dict()["readback"]
+    assert readback["mismatches"] == {"dac": 1}
+    assert readback["last_mismatch"]["actual"] == 0
+
+
+@pytest.mark.parametrize("batch_size", [1, 32])
+def test_unit_readback_04(bus, batch_size):
+    """Playback is checked every N samples and at its end"""
+    dac = AD5693(0x4C, bus=bus, readback=ReadbackPolicy(every=256))
+    waveform = dac.compile_sine_wave(100, 0.25, sample_rate=4000)
+    report = dac.play(waveform, batch_size=batch_size)
+    stats = dac.readback.stats
+    assert report.n_samples == 1000
+    assert stats.n_reads == 1000 // 256 + 1
+    assert stats.n_checked == 3 * stats.n_reads
+    assert stats.n_mismatches == 0
+
+
+def test_unit_readback_05(bus):
+    """Segment boundaries alone cost one read per waveform"""
+    dac = AD5693(0x4C, bus=bus, readback=ReadbackPolicy(every=0))
+    waveform = dac.compile_sine_wave(100, 0.02, sample_rate=4000)
+    with dac.player() as player:
+        player.queue(waveform)
+        player.queue(waveform)
+        assert player.wait(timeout=5)
+    assert dac.readback.stats.n_reads == 2
+    assert dac.readback.stats.n_mismatches == 0
+
+
+def test_robust_readback_01(device):
+    """Failed reads are counted without interrupting the playback"""
+
+    class WriteOnlyBus(SimulatedBus):
+        def read_transactions(self, reads):
+            raise OSError(errno.EREMOTEIO, "Remote I/O error")
+
+    dac = AD5693(
+        0x4C, bus=WriteOnlyBus([device]), readback=ReadbackPolicy(every=100)
+    )
+    metrics = dac.instrument()
+    waveform = dac.compile_sine_wave(100, 0.1, sample_rate=4000)
+    report = dac.play(waveform)
+    assert report.n_samples == 400
+    assert dac.readback.stats.n_read_errors == 5
+    assert dac.readback.stats.n_checked == 0
+    assert metrics.errors["OSError"] == 5
+
+
+def test_robust_readback_03(device):
+    """A bus that cannot read disables the checks"""
+
+    class NoReadBus(SimulatedBus):
+        def read_transactions(self, reads):
+            raise NotImplementedError("No reads on this bus")
+
+    dac = AD5693(
+        0x4C, bus=NoReadBus([device]), readback=ReadbackPolicy(every=100)
+    )
+    waveform = dac.compile_sine_wave(100, 0.1, sample_rate=4000)
+    assert dac.play(waveform).n_samples == 400
+    assert not dac.readback.supported
+    dac.set_voltage(1.0)
+    assert dac.readback.stats.n_reads == 0
+    assert dac.readback.stats.n_read_errors == 0
+
+
+def test_robust_readback_04(device):
+    """Samples dropped by the transport are not expected in the registers"""
+    bus = SimulatedBus([device], seed=1)
+    dac = AD5693(
+        0x4C,
+        bus=bus,
+        retry=RetryPolicy(max_retries=0),
+        readback=ReadbackPolicy(every=1),
+    )
+    waveform = dac.compile_sine_wave(100, 0.1, sample_rate=2000)
+    bus.error_rate = 0.3
+    report = dac.play(waveform)
+    assert report.n_bus_dropped > 0
+    assert dac.readback.stats.n_checked > 0
+    assert dac.readback.stats.n_mismatches == 0
+
+
+def test_robust_readback_02():
+    """Unknown registers are refused"""
+    with pytest.raises(ValueError):
+        ReadbackPolicy(registers=("input", "status"))
+    with pytest.raises(ValueError):
+        ReadbackPolicy(every=-1)
@@ -0,0 +1,68 @@
+"""
+Test stimulus module.
+"""
+
+import numpy as np
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.features.stimulus import StimulusCache
+
+
+@pytest.fixture
+def dac():
+    device = SimulatedAD5693(address=0x4C, v_ref=5)
+    return AD5693(device_address=0x4C, v_ref=5, bus=SimulatedBus([device]))
+
+
+def test_unit_stimulus_cache_01(dac):
+    """Repeated requests reuse the encoded waveform"""
+    cache = StimulusCache()
+    first = cache.get(
+        dac, "multitone", 8000, frequencies=[100, 200], duration=0.1
+    )
+    second = cache.get(
+        dac, "multitone", 8000, frequencies=np.array([100, 200]), duration=0.1
+    )
+    assert second is first
+    assert first.n_samples == 800
+    assert cache.stats.n_hits == 1 and cache.stats.n_misses == 1
+    assert cache.stats.n_bytes == 2 * 2 * 800
+    other = cache.get(dac, "white_noise", 8000, duration=0.1, seed=2)
+    assert other is not first and len(cache) == 2
+
+
+def test_unit_stimulus_cache_02(dac):
+    """The least recently used waveforms are evicted under the memory cap"""
+    cache = StimulusCache(max_bytes=3 * 4 * 800)
+    for seed in range(3):
+        cache.get(dac, "white_noise", 8000, duration=0.1, seed=seed)
+    cache.get(dac, "white_noise", 8000, duration=0.1, seed=0)
+    cache.get(dac, "white_noise", 8000, duration=0.1, seed=3)
+    assert cache.stats.n_evictions == 1
+    assert cache.stats.n_bytes <= cache.max_bytes
+    keys = [
+        cache.key("white_noise", 8000, 5, duration=0.1, seed=seed)
+        for seed in range(4)
+    ]
+    assert [key in cache for key in keys] == [True, False, True, True]
+    cache.get(dac, "pink_noise", 8000, duration=1)
+    assert len(cache) == 3
+
+
+def test_unit_stimulus_cache_03(dac):
+    """The reference voltage is part of the key"""
+    cache = StimulusCache()
+    low = cache.get(dac, "tone_burst", 8000, frequency=500, n_cycles=4)
+    dac.v_ref = 2.5
+    assert (
+        cache.get(dac, "tone_burst", 8000, frequency=500, n_cycles=4)
+        is not low
+    )
+    assert cache.stats.n_misses == 2
+
+
+def test_robust_stimulus_cache_01(dac):
+    with pytest.raises(ValueError):
+        StimulusCache().get(dac, "square", 8000)
@@ -0,0 +1,171 @@
+"""
+Test transport module.
+"""
+
+import errno
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import (
+    BusBusyError,
+    BusTimeoutError,
+    NackError,
+    SimulatedAD5693,
+    SimulatedBus,
+    classify,
+)
+from speaker_test_bench.features.transport import ReliableBus, RetryPolicy
+
+
+@pytest.fixture
+def bus():
+    return SimulatedBus([SimulatedAD5693(address=0x4C)], seed=0)
+
+
+def test_unit_transport_01():
+    """Adapter errnos map to typed bus errors"""
+    assert isinstance(classify(OSError(errno.EREMOTEIO, "x")), NackError)
+    assert isinstance(classify(OSError(errno.ETIMEDOUT, "x")), BusTimeoutError)
+    assert isinstance(classify(OSError(errno.EBUSY, "x")), BusBusyError)
+    error = OSError(errno.EBADF, "x")
+    assert classify(error) is error
+    typed = classify(OSError(errno.EIO, "I/O error"), "Error sending command")
+    assert str(typed) == "[Errno 5] Error sending command: I/O error"
+
+
+def test_unit_transport_02(bus):
+    """Transient failures are retried until the write succeeds"""
+    dac = AD5693(0x4C, bus=bus, retry=RetryPolicy(max_retries=10))
+    bus.error_rate = 0.3
+    for voltage in (1.0, 2.0, 3.0, 4.0) * 10:
+        dac.set_voltage(voltage, force=True)
+    stats = dac.transport.stats
+    assert bus.n_faults > 0
+    assert stats.n_retries == bus.n_faults
+    assert stats.n_recovered > 0
+    assert stats.n_failed == 0
+    assert stats.errors["NackError"] == bus.n_faults
+    assert bus.devices[0x4C].voltage == pytest.approx(4.0, abs=1e-3)
+
+
+def test_unit_transport_03(bus):
+    """Retries are reported through the instrumentation"""
+    dac = AD5693(0x4C, bus=bus, retry=RetryPolicy(max_retries=10))
+    metrics = dac.instrument()
+    bus.error_rate = 0.3
+    for _ in range(20):
+        dac.set_voltage(1.0, force=True)
+    assert metrics.n_retries == dac.transport.stats.n_retries > 0
+    assert metrics.n_errors == 0
+
+
+def test_unit_transport_04(bus):
+    """Repeated failures run the recovery actions"""
+    dac = AD5693(0x4C, bus=bus, retry=RetryPolicy(recover_after=2))
+    dac.set_voltage(1.0)
+    assert dac.shadow.dac is not None
+    bus.error_rate = 1.0
+    with pytest.raises(NackError):
+        dac.set_voltage(2.0)
+    stats = dac.transport.stats
+    assert stats.n_retries == 3
+    assert stats.n_failed == 1
+    assert stats.n_recoveries == 2
+    assert dac.shadow.dac is None
+
+
+def test_unit_transport_05(bus):
+    """Samples whose retries miss their slot are dropped on schedule"""
+    bus.latency_ns = 100_000
+    dac = AD5693(
+        0x4C,
+        bus=bus,
+        retry=RetryPolicy(backoff_ns=200_000, max_backoff_ns=200_000),
+    )
+    waveform = dac.compile_sine_wave(50, 0.5, sample_rate=2000)
+    bus.error_rate = 0.2
+    n_frames = bus.devices[0x4C].n_frames
+    start = time.perf_counter()
+    report = dac.play(waveform)
+    elapsed = time.perf_counter() - start
+    assert report.n_bus_dropped > 0
+    assert report.n_bus_dropped == dac.transport.stats.n_dropped
+    assert report.n_samples + report.n_bus_dropped == 1000
+    assert bus.devices[0x4C].n_frames - n_frames == report.n_samples
+    assert elapsed < 0.75
+    assert dac.transport.slot_ns is None
+
+
+def test_unit_transport_06(bus):
+    """Only the thread of the playback drops samples in its slot"""
+    dac = AD5693(0x4C, bus=bus, retry=RetryPolicy(max_retries=1))
+    dac.transport.slot_ns = 10**9
+    bus.error_rate = 1.0
+    errors = []
+
+    def write():
+        try:
+            dac.set_voltage(1.0)
+        except NackError as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    thread.join()
+    assert len(errors) == 1
+    assert dac.transport.stats.n_dropped == 0
+    assert dac.shadow.dac is None
+    dac.transport.slot_ns = None
+
+
+def test_robust_transport_01(bus):
+    """Playback ends with a typed error when the bus is gone"""
+    dac = AD5693(0x4C, bus=bus, retry=RetryPolicy(max_consecutive_drops=10))
+    waveform = dac.compile_sine_wave(50, 0.5, sample_rate=2000)
+    bus.error_rate = 1.0
+    with pytest.raises(NackError):
+        dac.play(waveform)
+    assert dac.transport.stats.n_dropped == 10
+
+
+def test_robust_transport_02():
+    """Errors that are not transient are raised without retrying"""
+
+    class ClosedBus(SimulatedBus):
+        closed = False
+
+        def write_i2c_block_data(self, address, register, data):
+            if self.closed:
+                raise OSError(errno.EBADF, "Bad file descriptor")
+            super().write_i2c_block_data(address, register, data)
+
+    bus = ClosedBus([SimulatedAD5693(address=0x4C)])
+    reliable = ReliableBus(bus)
+    reliable.write_i2c_block_data(0x4C, 0x30, [0x80, 0x00])
+    bus.closed = True
+    with pytest.raises(OSError) as info:
+        reliable.write_i2c_block_data(0x4C, 0x30, [0x80, 0x00])
+    assert info.value.errno == errno.EBADF
+    assert reliable.stats.n_retries == 0
+    assert reliable.stats.n_failed == 1
+
+
+@pytest.mark.parametrize("generator", ["sine", "sweep", "file"])
+def test_robust_transport_03(bus, generator, tmp_path):
+    """Generators and file playback raise the typed transport error"""
+    dac = AD5693(0x4C, bus=bus, retry=RetryPolicy(max_consecutive_drops=10))
+    path = tmp_path / "signal.raw"
+    path.write_bytes(np.zeros(200, "<i2").tobytes())
+    bus.error_rate = 1.0
+    with pytest.raises(NackError) as info:
+        if generator == "sine":
+            dac.generate_sine_wave(100, 0.1, sample_rate=2000)
+        elif generator == "sweep":
+            dac.generate_sweep(100, 1000, 0.1, sample_rate=2000)
+        else:
+            dac.play_file(path, raw={"sample_rate": 2000})
+    assert "Error sending command" in str(info.value)
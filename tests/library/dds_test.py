@@ -0,0 +1,75 @@
+"""
+Test dds module.
+"""
+
+import numpy as np
+import pytest
+
+from speaker_test_bench.library.dds import DDSEngine, Tone, sine_table
+
+
+def test_unit_dds_engine_01():
+    """A table-aligned tone reproduces the sine exactly"""
+    engine = DDSEngine(sample_rate=8000, table_bits=12)
+    engine.set_tones([Tone(1000)])
+    signal = engine.render(64)
+    expected = np.sin(2 * np.pi * 1000 * np.arange(64) / 8000)
+    np.testing.assert_allclose(signal, expected, atol=1e-12)
+    assert engine.frequencies == [1000.0]
+
+
+def test_unit_dds_engine_02():
+    """Chunked output matches a single render, phase carrying over"""
+    tones = [Tone(440.3, 0.5), Tone(1234.5, 0.25, phase=np.pi / 2)]
+    engine = DDSEngine(sample_rate=48000, chunk_size=1000)
+    engine.set_tones(tones)
+    chunks = list(engine.chunks(2500))
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+    reference = DDSEngine(sample_rate=48000, chunk_size=2500)
+    reference.set_tones(tones)
+    np.testing.assert_array_equal(
+        np.concatenate(chunks), reference.render(2500)
+    )
+    assert np.abs(np.concatenate(chunks)).max() <= 0.75
+
+
+def test_unit_dds_engine_03():
+    """Frequencies are realised to the accumulator resolution"""
+    engine = DDSEngine(sample_rate=44100)
+    word = engine.tuning_word(997.0)
+    assert abs(engine.frequency(word) - 997.0) <= 44100 / 2**49
+    coarse = DDSEngine(sample_rate=8000, phase_bits=16, table_bits=8)
+    assert coarse.frequency(coarse.tuning_word(1000)) == 1000
+
+
+def test_unit_dds_engine_04():
+    """Frequency steps are phase-continuous and land on sample boundaries"""
+    engine = DDSEngine(sample_rate=8000, table_bits=16)
+    chunks = list(
+        engine.program([([Tone(500)], 0.001), ([Tone(1000)], 0.0015)])
+    )
+    signal = np.concatenate(chunks)
+    assert len(signal) == 20
+    # 8 samples at 500 Hz reach half a turn, then 1000 Hz from there
+    expected = np.sin(
+        2
+        * np.pi
+        * np.concatenate([np.arange(8) / 16, 0.5 + np.arange(12) / 8])
+    )
+    np.testing.assert_allclose(signal, expected, atol=1e-12)
+
+
+def test_unit_sine_table_01():
+    """The table is cached and read-only"""
+    table = sine_table(10)
+    assert table is sine_table(10)
+    assert len(table) == 1024
+    assert not table.flags.writeable
+
+
+def test_robust_dds_engine_01():
+    engine = DDSEngine(sample_rate=8000)
+    with pytest.raises(ValueError):
+        engine.set_tones([Tone(5000)])
+    with pytest.raises(ValueError):
+        DDSEngine(sample_rate=8000, phase_bits=8, table_bits=12)
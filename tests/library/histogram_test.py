@@ -0,0 +1,57 @@
+"""
+Test histogram module.
+"""
+
+import pytest
+
+from speaker_test_bench.library.histogram import LatencyHistogram
+
+
+def test_unit_latency_histogram_01():
+    """Small values are exact, larger ones stay within the bucket error"""
+    histogram = LatencyHistogram(sub_bits=8)
+    for value in (0, 1, 255, 256, 1000, 123_456_789):
+        low, high = histogram.bounds(histogram.index(value))
+        assert low <= value <= high
+        assert high - low <= max(value, 1) * 2**-7
+    assert histogram.bounds(histogram.index(200)) == (200, 200)
+
+
+def test_unit_latency_histogram_02():
+    """Percentiles, mean and extremes of a uniform distribution"""
+    histogram = LatencyHistogram()
+    for value in range(1, 10_001):
+        histogram.record(value)
+    assert histogram.n_values == 10_000
+    assert histogram.mean == pytest.approx(5000.5)
+    assert (histogram.min, histogram.max) == (1, 10_000)
+    assert histogram.percentile(50) == pytest.approx(5000, rel=0.01)
+    assert histogram.percentile(99) == pytest.approx(9900, rel=0.01)
+    assert histogram.percentile(100) == 10_000
+    assert histogram.stddev == pytest.approx(2886.9, rel=0.01)
+
+
+def test_unit_latency_histogram_03():
+    """Merging adds the counts of another histogram"""
+    first, second = LatencyHistogram(), LatencyHistogram()
+    first.record(10)
+    second.record(2000)
+    second.record(-5)
+    first.merge(second)
+    assert first.n_values == 3
+    assert (first.min, first.max) == (0, 2000)
+    assert first.as_dict()["buckets"][:2] == [[0, 1], [10, 1]]
+
+
+def test_robust_latency_histogram_01():
+    """Memory does not grow and out of range values are capped"""
+    histogram = LatencyHistogram(sub_bits=4, max_bits=10)
+    size = len(histogram.counts)
+    histogram.record(1 << 20)
+    assert len(histogram.counts) == size
+    assert histogram.n_overflows == 1
+    assert histogram.counts[-1] == 1
+    with pytest.raises(ValueError):
+        histogram.merge(LatencyHistogram())
+    with pytest.raises(ValueError):
+        LatencyHistogram(sub_bits=12, max_bits=10)
@@ -0,0 +1,82 @@
+"""
+Test pcm module.
+"""
+
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from speaker_test_bench.library.pcm import PCMFile
+
+
+def write_wav(path, samples, sample_rate=8000, sample_width=2):
+    samples = np.asarray(samples)
+    with wave.open(str(path), "wb") as file:
+        file.setnchannels(samples.shape[1] if samples.ndim > 1 else 1)
+        file.setsampwidth(sample_width)
+        file.setframerate(sample_rate)
+        if sample_width == 3:
+            data = samples.astype("<i4").tobytes()
+            data = b"".join(data[i : i + 3] for i in range(0, len(data), 4))
+        else:
+            data = samples.astype(f"<i{sample_width}").tobytes()
+        file.writeframes(data)
+
+
+def test_unit_pcm_file_01(tmp_path):
+    """16-bit WAV samples are mapped and scaled to [-1, 1]"""
+    path = tmp_path / "tone.wav"
+    write_wav(path, [0, 16384, -32768, 32767])
+    pcm = PCMFile.open(path)
+    assert pcm.sample_rate == 8000
+    assert pcm.n_frames == 4
+    assert isinstance(pcm._frames, np.memmap)
+    np.testing.assert_allclose(pcm.read(0, 10), [0, 0.5, -1, 32767 / 32768])
+
+
+def test_unit_pcm_file_02(tmp_path):
+    """24-bit stereo frames are widened and mixed"""
+    path = tmp_path / "stereo.wav"
+    write_wav(path, [[1 << 22, -(1 << 22)], [-(1 << 23), 0]], sample_width=3)
+    pcm = PCMFile.open(path)
+    np.testing.assert_allclose(pcm.read(0, 2, channel=0), [0.5, -1])
+    np.testing.assert_allclose(pcm.read(0, 2, channel=None), [0, -0.5])
+
+
+def test_unit_pcm_file_03(tmp_path):
+    """Float WAV and headerless files are supported"""
+    path = tmp_path / "float.wav"
+    data = np.array([0.25, -0.5], dtype="<f4").tobytes()
+    fmt = struct.pack("<HHIIHH", 3, 1, 48000, 192000, 4, 32)
+    with open(path, "wb") as file:
+        file.write(b"RIFF" + struct.pack("<I", 36 + len(data)) + b"WAVE")
+        file.write(b"fmt " + struct.pack("<I", len(fmt)) + fmt)
+        file.write(b"data" + struct.pack("<I", len(data)) + data)
+    np.testing.assert_allclose(PCMFile.open(path).read(0, 2), [0.25, -0.5])
+    raw = tmp_path / "signal.raw"
+    raw.write_bytes(b"\x00" * 4 + np.array([0, -16384], "<i2").tobytes())
+    pcm = PCMFile.raw(raw, sample_rate=8000, offset=4)
+    np.testing.assert_allclose(pcm.read(0, 2), [0, -0.5])
+
+
+def test_unit_pcm_file_04(tmp_path):
+    """Resampled chunks interpolate seamlessly across boundaries"""
+    path = tmp_path / "ramp.wav"
+    write_wav(path, np.arange(100) * 100, sample_rate=16000)
+    pcm = PCMFile.open(path)
+    chunks = list(pcm.chunks(sample_rate=6000, chunk_size=8))
+    assert max(len(chunk) for chunk in chunks) == 8
+    signal = np.concatenate(chunks)
+    expected = np.arange(0, 99.001, 16 / 6) * 100 / 32768
+    np.testing.assert_allclose(signal, expected, atol=1e-12)
+    same_rate = np.concatenate(list(pcm.chunks(chunk_size=7)))
+    np.testing.assert_allclose(same_rate, np.arange(100) * 100 / 32768)
+
+
+def test_robust_pcm_file_01(tmp_path):
+    path = tmp_path / "text.wav"
+    path.write_bytes(b"not a wav file at all")
+    with pytest.raises(ValueError):
+        PCMFile.open(path)
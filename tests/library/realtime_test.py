@@ -0,0 +1,148 @@
+"""
+Test realtime module.
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import json
+import os
+
+import pytest
+
+from speaker_test_bench.features.ad5693 import AD5693
+from speaker_test_bench.features.bus import SimulatedAD5693, SimulatedBus
+from speaker_test_bench.library.realtime import (
+    RealtimeConfig,
+    RealtimeSession,
+    compare_jitter,
+)
+from speaker_test_bench.library.util import CustomEncoder
+
+
+def scheduling():
+    return os.sched_getaffinity(0), os.sched_getscheduler(0)
+
+
+def locked_kib():
+    with open("/proc/self/status", encoding="ascii") as status:
+        for line in status:
+            if line.startswith("VmLck:"):
+                return int(line.split()[1])
+    return 0
+
+
+QUIET = RealtimeConfig(cpus=(), priority=0)
+
+
+def test_unit_realtime_session_01():
+    """Settings are applied or reported, then restored on exit"""
+    before = scheduling()
+    config = RealtimeConfig(lock_memory=False)
+    with RealtimeSession(config) as report:
+        assert not gc.isenabled()
+        assert report.gc_disabled
+        assert report.cpus == [max(before[0])]
+        assert os.sched_getaffinity(0) == {max(before[0])}
+        if report.policy == "SCHED_FIFO":
+            assert os.sched_getscheduler(0) == os.SCHED_FIFO
+        else:
+            assert report.warnings
+    assert gc.isenabled()
+    assert scheduling() == before
+
+
+def test_unit_realtime_session_02():
+    """Disabled settings leave the thread untouched"""
+    before = scheduling()
+    config = RealtimeConfig(
+        cpus=(), priority=0, lock_memory=False, disable_gc=False
+    )
+    with RealtimeSession(config) as report:
+        assert scheduling() == before
+        assert gc.isenabled()
+    assert report.as_dict() == {
+        "cpus": None,
+        "policy": None,
+        "priority": None,
+        "memory_locked": False,
+        "gc_disabled": False,
+        "warnings": [],
+    }
+
+
+def test_unit_realtime_session_03():
+    """Process-wide settings are only restored by the last session"""
+    with RealtimeSession(QUIET) as outer:
+        if not outer.memory_locked:
+            pytest.skip("mlockall not permitted")
+        with RealtimeSession(QUIET) as inner:
+            assert inner.memory_locked
+        assert not gc.isenabled()
+        assert locked_kib() > 0
+    assert gc.isenabled()
+    assert locked_kib() == 0
+    assert not outer.warnings and not inner.warnings
+
+
+def test_unit_realtime_session_04():
+    """Memory and collector states found on entry are left as they were"""
+    libc = ctypes.CDLL(ctypes.util.find_library("c"))
+    if libc.mlockall(1) != 0:
+        pytest.skip("mlockall not permitted")
+    gc.disable()
+    try:
+        with RealtimeSession(QUIET) as report:
+            assert not report.gc_disabled
+        assert not gc.isenabled()
+        assert locked_kib() > 0
+        assert any("left locked" in warning for warning in report.warnings)
+    finally:
+        libc.munlockall()
+        gc.enable()
+
+
+def test_unit_compare_jitter_01():
+    """A warm-up run, then interleaved trials of both playbacks"""
+    bus = SimulatedBus([SimulatedAD5693(0x4C)], latency_s=20e-6)
+    dac = AD5693(0x4C, bus=bus)
+    waveform = dac.compile_sine_wave(100, 0.05, sample_rate=2000)
+    n_runs = []
+
+    def run():
+        n_runs.append(1)
+        return dac.play(waveform).timing
+
+    comparison = compare_jitter(run, n_trials=3)
+    assert len(n_runs) == 1 + 2 * 3
+    assert comparison.baseline.n_emitted == comparison.realtime.n_emitted
+    assert len(comparison.gains) == 3
+    assert comparison.jitter_gain == sorted(comparison.gains)[1]
+    data = json.loads(json.dumps(comparison.as_dict(), cls=CustomEncoder))
+    assert data["report"]["gc_disabled"]
+
+
+def test_unit_realtime_playback_01():
+    """Playback and players report the settings applied"""
+    bus = SimulatedBus([SimulatedAD5693(0x4C)])
+    dac = AD5693(0x4C, bus=bus)
+    waveform = dac.compile_sine_wave(100, 0.02, sample_rate=2000)
+    config = RealtimeConfig(lock_memory=False)
+    assert dac.play(waveform).realtime is None
+    assert dac.play(waveform, realtime=config).realtime.gc_disabled
+    with dac.player(realtime=config) as player:
+        player.queue(waveform)
+        assert player.wait(timeout=5)
+    assert player.realtime_report.cpus is not None
+    assert gc.isenabled()
+
+
+def test_robust_realtime_session_01():
+    """Invalid settings are reported instead of raised"""
+    before = scheduling()
+    config = RealtimeConfig(cpus=(4096,), priority=500, lock_memory=False)
+    with RealtimeSession(config) as report:
+        assert report.cpus is None
+        assert report.policy != "SCHED_FIFO"
+        assert any("affinity" in warning for warning in report.warnings)
+    assert scheduling() == before
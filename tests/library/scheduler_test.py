@@ -0,0 +1,76 @@
+"""
+Test scheduler module.
+"""
+
+import time
+
+import pytest
+
+from speaker_test_bench.library.scheduler import (
+    DeadlineScheduler,
+    LatePolicy,
+    SchedulerStats,
+)
+
+
+def test_unit_deadline_scheduler_01():
+    """Samples are emitted in order and no earlier than their deadline"""
+    scheduler = DeadlineScheduler(sample_rate=2000)
+    emitted = []
+    start = time.perf_counter_ns()
+    stats = scheduler.run(
+        20, lambda i: emitted.append((i, time.perf_counter_ns())), start
+    )
+    assert [i for i, _ in emitted] == list(range(20))
+    for i, t in emitted:
+        assert t >= start + int(i * scheduler.period_ns)
+    assert stats.n_emitted == 20
+    assert stats.n_dropped == 0
+    assert stats.elapsed_ns >= 19 * scheduler.period_ns
+
+
+def test_unit_deadline_scheduler_02():
+    """Late samples are dropped without shifting the following ones"""
+    scheduler = DeadlineScheduler(sample_rate=100, policy="drop")
+    emitted = []
+
+    def slow_emit(index):
+        emitted.append(index)
+        if index == 0:
+            time.sleep(0.055)
+
+    stats = scheduler.run(10, slow_emit)
+    assert stats.n_dropped >= 4
+    assert stats.n_late == stats.n_dropped
+    assert stats.n_emitted + stats.n_dropped == 10
+    assert emitted[-1] == 9
+
+
+def test_unit_deadline_scheduler_03():
+    """Late samples are caught up with the catch-up policy"""
+    scheduler = DeadlineScheduler(sample_rate=100)
+    stats = scheduler.run(10, lambda i: time.sleep(0.055) if i == 0 else None)
+    assert stats.n_emitted == 10
+    assert stats.n_late >= 4
+    assert stats.n_dropped == 0
+    assert stats.max_lateness_ns >= 40_000_000
+
+
+def test_unit_scheduler_stats_01():
+    """Jitter is the standard deviation of the recorded lateness"""
+    stats = SchedulerStats(sample_rate=1000)
+    for lateness in (10, 20, 30):
+        stats.record(lateness)
+    assert stats.mean_lateness_ns == pytest.approx(20)
+    assert stats.jitter_ns == pytest.approx(10)
+    assert stats.max_lateness_ns == 30
+    summary = stats.as_dict()
+    assert "_m2" not in summary
+    assert summary["jitter_ns"] == pytest.approx(10)
+
+
+def test_robust_deadline_scheduler_01():
+    with pytest.raises(ValueError):
+        DeadlineScheduler(sample_rate=1000, policy="tagada")
+    with pytest.raises(ValueError):
+        DeadlineScheduler(sample_rate=0)
@@ -0,0 +1,70 @@
+"""
+Test signals module.
+"""
+
+import numpy as np
+import pytest
+
+from speaker_test_bench.library.signals import (
+    multitone,
+    pink_noise,
+    tone_burst,
+    white_noise,
+)
+
+
+def test_unit_multitone_01():
+    """Tones land on their bins and the sum is scaled to the peak"""
+    signal = multitone([100, 250, 1000], duration=1, sample_rate=8000)
+    assert len(signal) == 8000
+    assert np.abs(signal).max() == pytest.approx(1)
+    spectrum = np.abs(np.fft.rfft(signal))
+    assert sorted(np.argsort(spectrum)[-3:].tolist()) == [100, 250, 1000]
+
+
+def test_unit_multitone_02():
+    """Schroeder phases lower the crest factor of aligned phases"""
+    frequencies = np.arange(1, 33) * 100
+    aligned = multitone(frequencies, 0.1, 8000, phases=None)
+    schroeder = multitone(frequencies, 0.1, 8000)
+
+    def crest(x):
+        return np.abs(x).max() / np.sqrt(np.mean(x**2))
+
+    assert crest(schroeder) < crest(aligned) / 2
+
+
+def test_unit_tone_burst_01():
+    """Bursts span whole cycles and fade to zero at both ends"""
+    burst = tone_burst(1000, n_cycles=5, sample_rate=48000, amplitude=0.5)
+    assert len(burst) == 240
+    assert burst[0] == 0 and abs(burst[-1]) < 1e-3
+    assert np.abs(burst).max() <= 0.5
+    assert np.abs(tone_burst(1000, 5, 48000, window="rectangular")).max() == (
+        pytest.approx(1)
+    )
+
+
+def test_unit_noise_01():
+    """Noise is reproducible for a seed and pink noise tilts down"""
+    np.testing.assert_array_equal(
+        white_noise(0.1, 8000, seed=3), white_noise(0.1, 8000, seed=3)
+    )
+    assert not np.array_equal(
+        white_noise(0.1, 8000, seed=3), white_noise(0.1, 8000, seed=4)
+    )
+    pink = pink_noise(4, 8000, seed=1)
+    assert np.abs(pink).max() == pytest.approx(1)
+    power = np.abs(np.fft.rfft(pink)) ** 2
+    # Equal power per octave: 100-200 Hz vs 1600-3200 Hz, 4 bins per Hz
+    low, high = power[400:800].sum(), power[6400:12800].sum()
+    assert 0.5 < low / high < 2
+
+
+def test_robust_signals_01():
+    with pytest.raises(ValueError):
+        multitone([5000], 1, 8000)
+    with pytest.raises(ValueError):
+        tone_burst(1000, 5, 8000, window="triangle")
+    with pytest.raises(ValueError):
+        white_noise(0, 8000)
@@ -0,0 +1,67 @@
+"""
+Test sweep module.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from speaker_test_bench.library.sweep import SineSweep, SweepMethod
+
+
+@pytest.mark.parametrize("method", ["exponential", "linear"])
+def test_unit_sine_sweep_01(method):
+    """Chunks concatenate to a single render of the whole sweep"""
+    sweep = SineSweep(
+        50, 4000, 0.5, sample_rate=16000, method=method, chunk_size=1000
+    )
+    chunks = list(sweep.chunks())
+    assert sweep.n_samples == 8000
+    assert max(len(chunk) for chunk in chunks) == 1000
+    np.testing.assert_allclose(
+        np.concatenate(chunks), sweep.render(0, sweep.n_samples), atol=1e-12
+    )
+
+
+def test_unit_sine_sweep_02():
+    """Frequency follows the requested law"""
+    sweep = SineSweep(20, 20000, 30, sample_rate=48000)
+    assert sweep.instantaneous_frequency(0) == pytest.approx(20)
+    assert sweep.instantaneous_frequency(15) == pytest.approx(
+        math.sqrt(20 * 20000)
+    )
+    assert sweep.instantaneous_frequency(30) == pytest.approx(20000)
+    linear = SineSweep(100, 1100, 2, sample_rate=8000, method="linear")
+    assert linear.instantaneous_frequency(1) == pytest.approx(600)
+    assert linear.method is SweepMethod.LINEAR
+
+
+def test_unit_sine_sweep_03():
+    """Fades start and end the sweep at zero"""
+    sweep = SineSweep(100, 2000, 0.2, sample_rate=8000, fade=0.01)
+    signal = sweep.render(0, sweep.n_samples)
+    assert signal[0] == 0
+    assert abs(signal[-1]) < 1e-12
+    assert np.abs(signal).max() <= 1
+
+
+def test_unit_sine_sweep_04():
+    """Deconvolving the sweep itself gives a flat band-limited impulse"""
+    sweep = SineSweep(100, 3000, 0.25, sample_rate=8000, fade=0.005)
+    impulse = sweep.deconvolve(sweep.render(0, sweep.n_samples))
+    peak = int(np.argmax(np.abs(impulse)))
+    assert peak == sweep.n_samples - 1
+    # 2000 samples around the peak, 4 Hz per bin
+    gain = np.abs(np.fft.rfft(impulse[peak - 1000 : peak + 1000]))
+    assert gain[[75, 250, 500]] == pytest.approx(1, abs=0.1)
+    assert len(sweep.inverse_filter()) == sweep.n_samples
+
+
+def test_robust_sine_sweep_01():
+    with pytest.raises(ValueError):
+        SineSweep(100, 5000, 1, sample_rate=8000)
+    with pytest.raises(ValueError):
+        SineSweep(100, 100, 1, sample_rate=8000)
+    with pytest.raises(ValueError):
+        SineSweep(100, 1000, 1, sample_rate=8000, method="cubic")
@@ -0,0 +1,77 @@
+"""
+Test trace module.
+"""
+
+import json
+import threading
+
+import pytest
+
+from speaker_test_bench.library.trace import SpanLog, Tracer
+
+
+def test_unit_span_log_01():
+    """Spans are drained once, in recording order"""
+    log = SpanLog(capacity=8)
+    for i in range(5):
+        log.record(i, 100 * i, 100 * i + 10)
+    names, starts, durations, _ = log.drain()
+    assert names.tolist() == [0, 1, 2, 3, 4]
+    assert starts.tolist() == [0, 100, 200, 300, 400]
+    assert durations.tolist() == [10] * 5
+    assert len(log.drain()[0]) == 0
+    assert log.n_drained == 5 and log.n_dropped == 0
+
+
+def test_unit_tracer_01(tmp_path):
+    """Wrapped calls and blocks end up in a valid Chrome trace file"""
+    path = tmp_path / "trace.json"
+    with Tracer(path, flush_interval=0.01) as tracer:
+        square = tracer.wrap("square", lambda x: x * x)
+        assert square(3) == 9
+        with tracer.span("block"):
+            square(2)
+    events = json.loads(path.read_text())
+    spans = [event for event in events if event["ph"] == "X"]
+    assert [span["name"] for span in spans] == ["square", "square", "block"]
+    assert spans[2]["dur"] >= spans[1]["dur"]
+    assert events[-1]["args"] == {"n_written": 3, "n_dropped": 0}
+
+
+def test_unit_tracer_02():
+    """Threads record concurrently without losing spans"""
+    tracer = Tracer(capacity=4096)
+    noop = tracer.wrap("noop", lambda: None)
+    barrier = threading.Barrier(4)
+
+    def work():
+        barrier.wait()
+        for _ in range(500):
+            noop()
+        # Keep the thread alive so that its identifier is not reused
+        barrier.wait()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    events = tracer.events()
+    assert len(events) == 2000
+    assert len({event["tid"] for event in events}) == 4
+
+
+def test_robust_span_log_01():
+    """A lapped log drops the oldest spans and keeps the newest"""
+    log = SpanLog(capacity=4)
+    for i in range(10):
+        log.record(i, i, i + 1)
+    names, _, _, _ = log.drain()
+    assert names.tolist() == [6, 7, 8, 9]
+    assert log.n_dropped == 6
+    with pytest.raises(ValueError):
+        SpanLog(capacity=0)
+    with pytest.raises(ValueError):
+        Tracer().start()
+    with pytest.raises(RuntimeError):
+        Tracer().flush()